@@ -0,0 +1,92 @@
+.globl	_sum
+_sum:
+pushq %rbp
+movq %rsp, %rbp
+subq $12, %rsp
+		 # Moving parameters out of registers
+movl %r8d, -4(%rbp)
+movl %r9d, -8(%rbp)
+_L1:
+		 # Math expression a + b
+movl -4(%rbp), %eax
+addl -8(%rbp), %eax
+movl %eax, -12(%rbp)
+		 # Return r1
+movl -12(%rbp), %eax
+addq $12, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $12, %rsp
+popq %rbp
+retq
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $40, %rsp
+_L3:
+		 # Moving arguments into registers
+movl $4, %r8d
+movl $2, %r9d
+callq _sum
+		 # Saving the return value
+movl %eax, -4(%rbp)
+		 # Moving r2 into i
+movl -4(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Moving arguments into registers
+movl $2, %r8d
+movl $4, %r9d
+callq _sum
+		 # Saving the return value
+movl %eax, -12(%rbp)
+		 # Moving r3 into r8
+movl -12(%rbp), %eax
+movl %eax, -16(%rbp)
+		 # Moving r8 into i
+movl -16(%rbp), %eax
+movl %eax, -8(%rbp)
+movl $2, -20(%rbp)
+		 # Moving r9 into i
+movl -20(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Moving arguments into registers
+movl $5, %r8d
+movl -8(%rbp), %r9d
+callq _sum
+		 # Saving the return value
+movl %eax, -24(%rbp)
+		 # Moving arguments into registers
+movl $1, %r8d
+movl $2, %r9d
+callq _sum
+		 # Saving the return value
+movl %eax, -28(%rbp)
+		 # Moving arguments into registers
+movl $3, %r8d
+movl $4, %r9d
+callq _sum
+		 # Saving the return value
+movl %eax, -32(%rbp)
+		 # Math expression r5 + r6
+movl -28(%rbp), %eax
+addl -32(%rbp), %eax
+movl %eax, -36(%rbp)
+		 # Moving r7 into r10
+movl -36(%rbp), %eax
+movl %eax, -40(%rbp)
+		 # Moving r10 into i
+movl -40(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Return i
+movl -8(%rbp), %eax
+addq $40, %rsp
+popq %rbp
+retq
+_L4:
+movl $0, %eax
+addq $40, %rsp
+popq %rbp
+retq
\ No newline at end of file
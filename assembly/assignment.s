@@ -0,0 +1,31 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $20, %rsp
+_L1:
+		 # Precalculated 2 + 2 = 4
+movl $4, -4(%rbp)
+		 # Moving r1 into x
+movl -4(%rbp), %eax
+movl %eax, -8(%rbp)
+movl $5, -12(%rbp)
+		 # Moving y into z
+movl -12(%rbp), %eax
+movl %eax, -16(%rbp)
+		 # Moving y into r2
+movl -12(%rbp), %eax
+movl %eax, -20(%rbp)
+		 # Moving r2 into x
+movl -20(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Return x
+movl -8(%rbp), %eax
+addq $20, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $20, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,52 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $24, %rsp
+_L1:
+movl $0, -4(%rbp)
+		 # Math expression i + 1
+movl -4(%rbp), %eax
+addl $1, %eax
+movl %eax, -8(%rbp)
+		 # Moving r1 into i
+movl -8(%rbp), %eax
+movl %eax, -4(%rbp)
+		 # Math expression i - 1
+movl -4(%rbp), %eax
+subl $1, %eax
+movl %eax, -12(%rbp)
+		 # Moving r2 into i
+movl -12(%rbp), %eax
+movl %eax, -4(%rbp)
+		 # Math expression i + 2
+movl -4(%rbp), %eax
+addl $2, %eax
+movl %eax, -16(%rbp)
+		 # Moving r3 into i
+movl -16(%rbp), %eax
+movl %eax, -4(%rbp)
+		 # Math expression i - 2
+movl -4(%rbp), %eax
+subl $2, %eax
+movl %eax, -20(%rbp)
+		 # Moving r4 into i
+movl -20(%rbp), %eax
+movl %eax, -4(%rbp)
+		 # Math expression i + i
+movl -4(%rbp), %eax
+addl -4(%rbp), %eax
+movl %eax, -24(%rbp)
+		 # Moving r5 into i
+movl -24(%rbp), %eax
+movl %eax, -4(%rbp)
+		 # Return i
+movl -4(%rbp), %eax
+addq $24, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $24, %rsp
+popq %rbp
+retq
\ No newline at end of file
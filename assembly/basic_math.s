@@ -0,0 +1,16 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+_L1:
+		 # Precalculated 2 + 2 = 4
+movl $4, -4(%rbp)
+		 # Return r1
+movl -4(%rbp), %eax
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $4, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,39 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $32, %rsp
+_L1:
+movl $1, -4(%rbp)
+movl $0, -8(%rbp)
+		 # Math expression a & b
+movl -4(%rbp), %eax
+andl -8(%rbp), %eax
+movl %eax, -12(%rbp)
+		 # Moving r1 into c
+movl -12(%rbp), %eax
+movl %eax, -16(%rbp)
+		 # Math expression a | b
+movl -4(%rbp), %eax
+orl -8(%rbp), %eax
+movl %eax, -20(%rbp)
+		 # Moving r2 into d
+movl -20(%rbp), %eax
+movl %eax, -24(%rbp)
+		 # Math expression a ^ b
+movl -4(%rbp), %eax
+xorl -8(%rbp), %eax
+movl %eax, -28(%rbp)
+		 # Moving r3 into e
+movl -28(%rbp), %eax
+movl %eax, -32(%rbp)
+		 # Return e
+movl -32(%rbp), %eax
+addq $32, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $32, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,31 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $24, %rsp
+_L1:
+		 # Precalculated 1 and 1 = 1
+movl $1, -4(%rbp)
+		 # Moving r1 into a
+movl -4(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Precalculated 1 or 1 = 1
+movl $1, -12(%rbp)
+		 # Moving r2 into b
+movl -12(%rbp), %eax
+movl %eax, -16(%rbp)
+		 # Not expression !1
+movl $0, -20(%rbp)
+		 # Moving r3 into c
+movl -20(%rbp), %eax
+movl %eax, -24(%rbp)
+		 # Return c
+movl -24(%rbp), %eax
+addq $24, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $24, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,47 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $16, %rsp
+_L1:
+movl $10, -4(%rbp)
+_L2:
+movl -4(%rbp), %eax
+cmpl $0, %eax
+setg %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -8(%rbp)
+cmpl $0, -8(%rbp)
+je _L6
+_L3:
+movl -4(%rbp), %eax
+cmpl $2, %eax
+sete %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -12(%rbp)
+cmpl $0, -12(%rbp)
+je _L5
+_L4:
+jmp _L6
+_L5:
+		 # Math expression i - 1
+movl -4(%rbp), %eax
+subl $1, %eax
+movl %eax, -16(%rbp)
+		 # Moving r3 into i
+movl -16(%rbp), %eax
+movl %eax, -4(%rbp)
+jmp _L2
+_L6:
+		 # Return i
+movl -4(%rbp), %eax
+addq $16, %rsp
+popq %rbp
+retq
+_L7:
+movl $0, %eax
+addq $16, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,50 @@
+.globl	_sum
+_sum:
+pushq %rbp
+movq %rsp, %rbp
+subq $12, %rsp
+		 # Moving parameters out of registers
+movl %r8d, -4(%rbp)
+movl %r9d, -8(%rbp)
+_L1:
+		 # Math expression x + y
+movl -4(%rbp), %eax
+addl -8(%rbp), %eax
+movl %eax, -12(%rbp)
+		 # Return r1
+movl -12(%rbp), %eax
+addq $12, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $12, %rsp
+popq %rbp
+retq
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $16, %rsp
+_L3:
+movl $2, -4(%rbp)
+movl $3, -8(%rbp)
+		 # Moving arguments into registers
+movl -4(%rbp), %r8d
+movl -8(%rbp), %r9d
+callq _sum
+		 # Saving the return value
+movl %eax, -12(%rbp)
+		 # Moving r2 into c
+movl -12(%rbp), %eax
+movl %eax, -16(%rbp)
+		 # Return c
+movl -16(%rbp), %eax
+addq $16, %rsp
+popq %rbp
+retq
+_L4:
+movl $0, %eax
+addq $16, %rsp
+popq %rbp
+retq
\ No newline at end of file
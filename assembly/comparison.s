@@ -0,0 +1,27 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $16, %rsp
+_L1:
+movl $0, -4(%rbp)
+movl $1, -8(%rbp)
+movl -4(%rbp), %eax
+cmpl -8(%rbp), %eax
+setne %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -12(%rbp)
+		 # Moving r1 into c
+movl -12(%rbp), %eax
+movl %eax, -16(%rbp)
+		 # Return c
+movl -16(%rbp), %eax
+addq $16, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $16, %rsp
+popq %rbp
+retq
\ No newline at end of file
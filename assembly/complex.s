@@ -0,0 +1,297 @@
+.globl	_mult
+_mult:
+pushq %rbp
+movq %rsp, %rbp
+subq $12, %rsp
+		 # Moving parameters out of registers
+movl %r8d, -4(%rbp)
+movl %r9d, -8(%rbp)
+_L1:
+		 # Math expression a * b
+movl -4(%rbp), %eax
+imull -8(%rbp), %eax
+movl %eax, -12(%rbp)
+		 # Return r1
+movl -12(%rbp), %eax
+addq $12, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $12, %rsp
+popq %rbp
+retq
+.globl	_sub
+_sub:
+pushq %rbp
+movq %rsp, %rbp
+subq $12, %rsp
+		 # Moving parameters out of registers
+movl %r8d, -4(%rbp)
+movl %r9d, -8(%rbp)
+_L3:
+		 # Math expression a - b
+movl -4(%rbp), %eax
+subl -8(%rbp), %eax
+movl %eax, -12(%rbp)
+		 # Return r2
+movl -12(%rbp), %eax
+addq $12, %rsp
+popq %rbp
+retq
+_L4:
+movl $0, %eax
+addq $12, %rsp
+popq %rbp
+retq
+.globl	_sum
+_sum:
+pushq %rbp
+movq %rsp, %rbp
+subq $40, %rsp
+		 # Moving parameters out of registers
+movl %r8d, -4(%rbp)
+movl %r9d, -8(%rbp)
+_L5:
+		 # Moving arguments into registers
+movl $-1, %r8d
+movl -8(%rbp), %r9d
+callq _mult
+		 # Saving the return value
+movl %eax, -12(%rbp)
+		 # Moving r3 into r15
+movl -12(%rbp), %eax
+movl %eax, -16(%rbp)
+		 # Moving r15 into b
+movl -16(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Moving arguments into registers
+movl -8(%rbp), %r8d
+movl $-1, %r9d
+callq _mult
+		 # Saving the return value
+movl %eax, -20(%rbp)
+		 # Moving r4 into r16
+movl -20(%rbp), %eax
+movl %eax, -24(%rbp)
+		 # Moving r16 into b
+movl -24(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Moving arguments into registers
+movl $-1, %r8d
+movl -8(%rbp), %r9d
+callq _mult
+		 # Saving the return value
+movl %eax, -28(%rbp)
+		 # Moving r5 into r17
+movl -28(%rbp), %eax
+movl %eax, -32(%rbp)
+		 # Moving r17 into b
+movl -32(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Moving arguments into registers
+movl -4(%rbp), %r8d
+movl -8(%rbp), %r9d
+callq _sub
+		 # Saving the return value
+movl %eax, -36(%rbp)
+		 # Moving r6 into c
+movl -36(%rbp), %eax
+movl %eax, -40(%rbp)
+		 # Return c
+movl -40(%rbp), %eax
+addq $40, %rsp
+popq %rbp
+retq
+_L6:
+movl $0, %eax
+addq $40, %rsp
+popq %rbp
+retq
+.globl	_mult2
+_mult2:
+pushq %rbp
+movq %rsp, %rbp
+subq $28, %rsp
+		 # Moving parameters out of registers
+movl %r8d, -4(%rbp)
+movl %r9d, -8(%rbp)
+_L7:
+movl $0, -12(%rbp)
+		 # Moving a into add
+movl -4(%rbp), %eax
+movl %eax, -16(%rbp)
+_L8:
+movl -8(%rbp), %eax
+cmpl $0, %eax
+setg %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -20(%rbp)
+cmpl $0, -20(%rbp)
+je _L10
+_L9:
+		 # Math expression sum + add
+movl -12(%rbp), %eax
+addl -16(%rbp), %eax
+movl %eax, -24(%rbp)
+		 # Moving r18 into sum
+movl -24(%rbp), %eax
+movl %eax, -12(%rbp)
+		 # Math expression b - 1
+movl -8(%rbp), %eax
+subl $1, %eax
+movl %eax, -28(%rbp)
+		 # Moving r19 into b
+movl -28(%rbp), %eax
+movl %eax, -8(%rbp)
+jmp _L8
+_L10:
+		 # Return sum
+movl -12(%rbp), %eax
+addq $28, %rsp
+popq %rbp
+retq
+_L11:
+movl $0, %eax
+addq $28, %rsp
+popq %rbp
+retq
+.globl	_div
+_div:
+pushq %rbp
+movq %rsp, %rbp
+subq $12, %rsp
+		 # Moving parameters out of registers
+movl %r8d, -4(%rbp)
+movl %r9d, -8(%rbp)
+_L12:
+		 # Division expression -4(%rbp) / -8(%rbp)
+movl -4(%rbp), %eax
+movl -8(%rbp), %ecx
+cltd
+idivl %ecx
+movl %eax, -12(%rbp)
+		 # Return r8
+movl -12(%rbp), %eax
+addq $12, %rsp
+popq %rbp
+retq
+_L13:
+movl $0, %eax
+addq $12, %rsp
+popq %rbp
+retq
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $60, %rsp
+_L14:
+		 # Moving arguments into registers
+movl $3, %r8d
+movl $2, %r9d
+callq _sum
+		 # Saving the return value
+movl %eax, -4(%rbp)
+		 # Moving r9 into a
+movl -4(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Moving a into b
+movl -8(%rbp), %eax
+movl %eax, -12(%rbp)
+_L15:
+movl -12(%rbp), %eax
+cmpl $4, %eax
+sete %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -16(%rbp)
+cmpl $0, -16(%rbp)
+je _L17
+_L16:
+movl $20, -20(%rbp)
+		 # Moving r20 into b
+movl -20(%rbp), %eax
+movl %eax, -12(%rbp)
+jmp _L18
+_L17:
+movl $30, -24(%rbp)
+		 # Moving r21 into b
+movl -24(%rbp), %eax
+movl %eax, -12(%rbp)
+_L18:
+		 # Moving arguments into registers
+movl -12(%rbp), %r8d
+movl $10, %r9d
+callq _div
+		 # Saving the return value
+movl %eax, -28(%rbp)
+		 # Moving r11 into c
+movl -28(%rbp), %eax
+movl %eax, -32(%rbp)
+movl $100, -36(%rbp)
+_L19:
+movl -32(%rbp), %eax
+cmpl $0, %eax
+setg %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -40(%rbp)
+cmpl $0, -40(%rbp)
+je _L21
+_L20:
+		 # Math expression d + 1
+movl -36(%rbp), %eax
+addl $1, %eax
+movl %eax, -44(%rbp)
+		 # Moving r22 into d
+movl -44(%rbp), %eax
+movl %eax, -36(%rbp)
+		 # Math expression c - 1
+movl -32(%rbp), %eax
+subl $1, %eax
+movl %eax, -48(%rbp)
+		 # Moving r23 into c
+movl -48(%rbp), %eax
+movl %eax, -32(%rbp)
+jmp _L19
+_L21:
+		 # Moving arguments into registers
+movl -36(%rbp), %r8d
+movl $2, %r9d
+callq _mult2
+		 # Saving the return value
+movl %eax, -52(%rbp)
+		 # Moving r13 into e
+movl -52(%rbp), %eax
+movl %eax, -56(%rbp)
+_L22:
+movl -56(%rbp), %eax
+cmpl $206, %eax
+sete %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -60(%rbp)
+cmpl $0, -60(%rbp)
+je _L24
+_L23:
+jmp cleanup
+_L24:
+		 # Return 2
+movl $2, %eax
+addq $60, %rsp
+popq %rbp
+retq
+_L25:
+cleanup:
+		 # Return 11
+movl $11, %eax
+addq $60, %rsp
+popq %rbp
+retq
+_L26:
+movl $0, %eax
+addq $60, %rsp
+popq %rbp
+retq
\ No newline at end of file
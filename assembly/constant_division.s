@@ -0,0 +1,126 @@
+.globl	_digitSum
+_digitSum:
+pushq %rbp
+movq %rsp, %rbp
+subq $52, %rsp
+		 # Moving parameters out of registers
+movl %r8d, -4(%rbp)
+_L1:
+movl $0, -8(%rbp)
+movl $0, -12(%rbp)
+_L2:
+movl -12(%rbp), %eax
+cmpl -4(%rbp), %eax
+setl %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -16(%rbp)
+cmpl $0, -16(%rbp)
+je _L7
+_L3:
+		 # Moving i into n
+movl -12(%rbp), %eax
+movl %eax, -20(%rbp)
+_L4:
+movl -20(%rbp), %eax
+cmpl $0, %eax
+setg %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -24(%rbp)
+cmpl $0, -24(%rbp)
+je _L6
+_L5:
+		 # Modulo expression n % 10 by multiplication
+movl -20(%rbp), %ecx
+movl $1717986919, %eax
+imull %ecx
+sarl $2, %edx
+movl %edx, %eax
+shrl $31, %eax
+addl %eax, %edx
+imull $10, %edx, %edx
+movl %ecx, %eax
+subl %edx, %eax
+movl %eax, -28(%rbp)
+		 # Math expression sum + r3
+movl -8(%rbp), %eax
+addl -28(%rbp), %eax
+movl %eax, -32(%rbp)
+		 # Moving r4 into r9
+movl -32(%rbp), %eax
+movl %eax, -36(%rbp)
+		 # Moving r9 into sum
+movl -36(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Division expression n / 10 by multiplication
+movl -20(%rbp), %ecx
+movl $1717986919, %eax
+imull %ecx
+sarl $2, %edx
+movl %edx, %eax
+shrl $31, %eax
+addl %eax, %edx
+movl %edx, -40(%rbp)
+		 # Moving r5 into r10
+movl -40(%rbp), %eax
+movl %eax, -44(%rbp)
+		 # Moving r10 into n
+movl -44(%rbp), %eax
+movl %eax, -20(%rbp)
+jmp _L4
+_L6:
+		 # Math expression i + 1
+movl -12(%rbp), %eax
+addl $1, %eax
+movl %eax, -48(%rbp)
+		 # Moving r6 into r11
+movl -48(%rbp), %eax
+movl %eax, -52(%rbp)
+		 # Moving r11 into i
+movl -52(%rbp), %eax
+movl %eax, -12(%rbp)
+jmp _L2
+_L7:
+		 # Return sum
+movl -8(%rbp), %eax
+addq $52, %rsp
+popq %rbp
+retq
+_L8:
+movl $0, %eax
+addq $52, %rsp
+popq %rbp
+retq
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+_L9:
+		 # Moving arguments into registers
+movl $5000000, %r8d
+callq _digitSum
+		 # Saving the return value
+movl %eax, -4(%rbp)
+		 # Modulo expression r7 % 251 by multiplication
+movl -4(%rbp), %ecx
+movl $-2104705089, %eax
+imull %ecx
+addl %ecx, %edx
+sarl $7, %edx
+movl %edx, %eax
+shrl $31, %eax
+addl %eax, %edx
+imull $251, %edx, %edx
+movl %ecx, %eax
+subl %edx, %eax
+movl %eax, -8(%rbp)
+		 # Return r8
+movl -8(%rbp), %eax
+popq %rbp
+retq
+_L10:
+movl $0, %eax
+addq $8, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,52 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $24, %rsp
+_L1:
+movl $0, -4(%rbp)
+movl $0, -8(%rbp)
+_L2:
+movl -4(%rbp), %eax
+cmpl $10, %eax
+setl %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -12(%rbp)
+cmpl $0, -12(%rbp)
+je _L6
+_L3:
+movl -4(%rbp), %eax
+cmpl $5, %eax
+sete %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -16(%rbp)
+cmpl $0, -16(%rbp)
+je _L5
+_L4:
+movl $11, -20(%rbp)
+		 # Moving r3 into i
+movl -20(%rbp), %eax
+movl %eax, -4(%rbp)
+jmp _L2
+_L5:
+		 # Math expression i + 1
+movl -4(%rbp), %eax
+addl $1, %eax
+movl %eax, -24(%rbp)
+		 # Moving r4 into i
+movl -24(%rbp), %eax
+movl %eax, -4(%rbp)
+jmp _L2
+_L6:
+		 # Return i
+movl -4(%rbp), %eax
+addq $24, %rsp
+popq %rbp
+retq
+_L7:
+movl $0, %eax
+addq $24, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,52 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $12, %rsp
+_L1:
+movl $2, -4(%rbp)
+_L2:
+		 # Modulo expression -4(%rbp) % $2
+movl -4(%rbp), %eax
+cltd
+movl $2, %ecx
+idivl %ecx
+movl %edx, -8(%rbp)
+movl -8(%rbp), %eax
+cmpl $0, %eax
+sete %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -12(%rbp)
+cmpl $0, -12(%rbp)
+je _L4
+_L3:
+jmp even
+jmp _L5
+_L4:
+jmp odd
+_L5:
+		 # Return 0
+movl $0, %eax
+addq $12, %rsp
+popq %rbp
+retq
+_L6:
+even:
+		 # Return 1
+movl $1, %eax
+addq $12, %rsp
+popq %rbp
+retq
+_L7:
+odd:
+		 # Return 2
+movl $2, %eax
+addq $12, %rsp
+popq %rbp
+retq
+_L8:
+movl $0, %eax
+addq $12, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,38 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $16, %rsp
+_L1:
+movl $0, -4(%rbp)
+_L2:
+movl -4(%rbp), %eax
+cmpl $0, %eax
+sete %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -8(%rbp)
+cmpl $0, -8(%rbp)
+je _L4
+_L3:
+movl $1, -12(%rbp)
+		 # Moving r2 into number
+movl -12(%rbp), %eax
+movl %eax, -4(%rbp)
+jmp _L5
+_L4:
+movl $2, -16(%rbp)
+		 # Moving r3 into number
+movl -16(%rbp), %eax
+movl %eax, -4(%rbp)
+_L5:
+		 # Return number
+movl -4(%rbp), %eax
+addq $16, %rsp
+popq %rbp
+retq
+_L6:
+movl $0, %eax
+addq $16, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,14 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+_L1:
+		 # Return 0
+movl $0, %eax
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $0, %rsp
+popq %rbp
+retq
\ No newline at end of file
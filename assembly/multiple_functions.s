@@ -0,0 +1,70 @@
+.globl	_foo
+_foo:
+pushq %rbp
+movq %rsp, %rbp
+_L1:
+		 # Return 0
+movl $0, %eax
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $0, %rsp
+popq %rbp
+retq
+.globl	_bar
+_bar:
+pushq %rbp
+movq %rsp, %rbp
+_L3:
+		 # Return 0
+movl $0, %eax
+popq %rbp
+retq
+_L4:
+movl $0, %eax
+addq $0, %rsp
+popq %rbp
+retq
+.globl	_foobar
+_foobar:
+pushq %rbp
+movq %rsp, %rbp
+_L5:
+		 # Return 0
+movl $0, %eax
+popq %rbp
+retq
+_L6:
+movl $0, %eax
+addq $0, %rsp
+popq %rbp
+retq
+.globl	_foobiz
+_foobiz:
+pushq %rbp
+movq %rsp, %rbp
+_L7:
+		 # Return 0
+movl $0, %eax
+popq %rbp
+retq
+_L8:
+movl $0, %eax
+addq $0, %rsp
+popq %rbp
+retq
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+_L9:
+		 # Return 0
+movl $0, %eax
+popq %rbp
+retq
+_L10:
+movl $0, %eax
+addq $0, %rsp
+popq %rbp
+retq
\ No newline at end of file
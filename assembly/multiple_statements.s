@@ -0,0 +1,64 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $32, %rsp
+_L1:
+movl $2, -4(%rbp)
+		 # Moving r2 into x
+movl -4(%rbp), %eax
+movl %eax, -8(%rbp)
+movl $2, -12(%rbp)
+		 # Moving r3 into y
+movl -12(%rbp), %eax
+movl %eax, -16(%rbp)
+movl $2, -20(%rbp)
+		 # Moving r4 into z
+movl -20(%rbp), %eax
+movl %eax, -24(%rbp)
+		 # Precalculated 2 + 2 = 4
+movl $4, -28(%rbp)
+		 # Moving r1 into r5
+movl -28(%rbp), %eax
+movl %eax, -32(%rbp)
+		 # Moving r5 into x
+movl -32(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Return x
+movl -8(%rbp), %eax
+addq $32, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $32, %rsp
+popq %rbp
+retq
+.globl	_foo
+_foo:
+pushq %rbp
+movq %rsp, %rbp
+_L3:
+		 # Return 0
+movl $0, %eax
+popq %rbp
+retq
+_L4:
+movl $0, %eax
+addq $0, %rsp
+popq %rbp
+retq
+.globl	_bar
+_bar:
+pushq %rbp
+movq %rsp, %rbp
+_L5:
+		 # Return 0
+movl $0, %eax
+popq %rbp
+retq
+_L6:
+movl $0, %eax
+addq $0, %rsp
+popq %rbp
+retq
\ No newline at end of file
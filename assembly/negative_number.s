@@ -0,0 +1,30 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $20, %rsp
+_L1:
+		 # Precalculated 1 - 1 = 0
+movl $0, -4(%rbp)
+		 # Moving r1 into i
+movl -4(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Precalculated 1 - -1 = 2
+movl $2, -12(%rbp)
+		 # Moving r2 into r3
+movl -12(%rbp), %eax
+movl %eax, -16(%rbp)
+		 # Moving r3 into i
+movl -16(%rbp), %eax
+movl %eax, -8(%rbp)
+movl $-11, -20(%rbp)
+		 # Return a
+movl -20(%rbp), %eax
+addq $20, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $20, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,27 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $12, %rsp
+_L1:
+movl $1, -4(%rbp)
+		 # Not expression !a
+cmpl $0, -4(%rbp)
+setne %al
+xorb $-1, %al
+andb $1, %al
+movzbl %al, %ecx
+movl %ecx, -8(%rbp)
+		 # Moving r1 into b
+movl -8(%rbp), %eax
+movl %eax, -12(%rbp)
+		 # Return b
+movl -12(%rbp), %eax
+addq $12, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $12, %rsp
+popq %rbp
+retq
\ No newline at end of file
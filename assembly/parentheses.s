@@ -0,0 +1,20 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $8, %rsp
+_L1:
+movl $2, -4(%rbp)
+		 # Moving r1 into i
+movl -4(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Return i
+movl -8(%rbp), %eax
+addq $8, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $8, %rsp
+popq %rbp
+retq
\ No newline at end of file
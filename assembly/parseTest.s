@@ -0,0 +1,43 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $32, %rsp
+_L1:
+movl $10, -4(%rbp)
+		 # Precalculated 4 + 2 = 6
+movl $6, -8(%rbp)
+		 # Precalculated 10 % 11 = 10
+movl $10, -12(%rbp)
+		 # Precalculated 4 / 2 = 2
+movl $2, -16(%rbp)
+		 # Math expression 3 + r3
+movl $3, %eax
+addl -16(%rbp), %eax
+movl %eax, -20(%rbp)
+		 # Division expression -12(%rbp) / -20(%rbp)
+movl -12(%rbp), %eax
+movl -20(%rbp), %ecx
+cltd
+idivl %ecx
+movl %eax, -24(%rbp)
+		 # Math expression r1 * r5
+movl -8(%rbp), %eax
+imull -24(%rbp), %eax
+movl %eax, -28(%rbp)
+		 # Moving r6 into r7
+movl -28(%rbp), %eax
+movl %eax, -32(%rbp)
+		 # Moving r7 into i
+movl -32(%rbp), %eax
+movl %eax, -4(%rbp)
+		 # Return i
+movl -4(%rbp), %eax
+addq $32, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $32, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,70 @@
+.globl	_foo
+_foo:
+pushq %rbp
+movq %rsp, %rbp
+subq $16, %rsp
+		 # Moving parameters out of registers
+movl %r8d, -4(%rbp)
+_L1:
+movl -4(%rbp), %eax
+cmpl $5, %eax
+sete %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -8(%rbp)
+cmpl $0, -8(%rbp)
+je _L3
+_L2:
+		 # Return a
+movl -4(%rbp), %eax
+addq $16, %rsp
+popq %rbp
+retq
+jmp _L4
+_L3:
+		 # Math expression a + 1
+movl -4(%rbp), %eax
+addl $1, %eax
+movl %eax, -12(%rbp)
+		 # Moving r4 into a
+movl -12(%rbp), %eax
+movl %eax, -4(%rbp)
+		 # Moving arguments into registers
+movl -4(%rbp), %r8d
+callq _foo
+		 # Saving the return value
+movl %eax, -16(%rbp)
+		 # Return r2
+movl -16(%rbp), %eax
+addq $16, %rsp
+popq %rbp
+retq
+_L4:
+movl $0, %eax
+addq $16, %rsp
+popq %rbp
+retq
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $8, %rsp
+_L5:
+		 # Moving arguments into registers
+movl $0, %r8d
+callq _foo
+		 # Saving the return value
+movl %eax, -4(%rbp)
+		 # Moving r3 into x
+movl -4(%rbp), %eax
+movl %eax, -8(%rbp)
+		 # Return x
+movl -8(%rbp), %eax
+addq $8, %rsp
+popq %rbp
+retq
+_L6:
+movl $0, %eax
+addq $8, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,22 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $12, %rsp
+_L1:
+movl $1, -4(%rbp)
+		 # Precalculated 4 >> 2 = 1
+movl $1, -8(%rbp)
+		 # Moving r1 into b
+movl -8(%rbp), %eax
+movl %eax, -12(%rbp)
+		 # Return b
+movl -12(%rbp), %eax
+addq $12, %rsp
+popq %rbp
+retq
+_L2:
+movl $0, %eax
+addq $12, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,21 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+_L1:
+jmp label
+		 # Return 0
+movl $0, %eax
+popq %rbp
+retq
+_L2:
+label:
+		 # Return 1
+movl $1, %eax
+popq %rbp
+retq
+_L3:
+movl $0, %eax
+addq $0, %rsp
+popq %rbp
+retq
\ No newline at end of file
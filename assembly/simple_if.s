@@ -0,0 +1,25 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+_L1:
+		 # Precalculated 0 == 0 = 1
+movl $1, -4(%rbp)
+cmpl $0, -4(%rbp)
+je _L3
+_L2:
+		 # Return 0
+movl $0, %eax
+popq %rbp
+retq
+jmp _L4
+_L3:
+		 # Return 22
+movl $22, %eax
+popq %rbp
+retq
+_L4:
+movl $0, %eax
+addq $4, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,60 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $28, %rsp
+_L1:
+movl $5, -4(%rbp)
+_L2:
+movl -4(%rbp), %eax
+cmpl $1, %eax
+sete %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -8(%rbp)
+cmpl $0, -8(%rbp)
+je _L3
+movl $2, -12(%rbp)
+		 # Moving r1 into i
+movl -12(%rbp), %eax
+movl %eax, -4(%rbp)
+jmp _L5
+_L3:
+movl -4(%rbp), %eax
+cmpl $5, %eax
+sete %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -16(%rbp)
+cmpl $0, -16(%rbp)
+je _L4
+movl $22, -20(%rbp)
+		 # Moving r3 into i
+movl -20(%rbp), %eax
+movl %eax, -4(%rbp)
+jmp _L5
+_L4:
+movl -4(%rbp), %eax
+cmpl $10, %eax
+sete %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -24(%rbp)
+cmpl $0, -24(%rbp)
+je _L5
+movl $11, -28(%rbp)
+		 # Moving r5 into i
+movl -28(%rbp), %eax
+movl %eax, -4(%rbp)
+jmp _L5
+_L5:
+		 # Return i
+movl -4(%rbp), %eax
+addq $28, %rsp
+popq %rbp
+retq
+_L6:
+movl $0, %eax
+addq $28, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,119 @@
+.globl	_digitSum
+_digitSum:
+pushq %rbp
+movq %rsp, %rbp
+subq $56, %rsp
+		 # Moving parameters out of registers
+movl %r8d, -4(%rbp)
+movl %r9d, -8(%rbp)
+_L1:
+movl $0, -12(%rbp)
+movl $0, -16(%rbp)
+_L2:
+movl -16(%rbp), %eax
+cmpl -4(%rbp), %eax
+setl %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -20(%rbp)
+cmpl $0, -20(%rbp)
+je _L7
+_L3:
+		 # Moving i into n
+movl -16(%rbp), %eax
+movl %eax, -24(%rbp)
+_L4:
+movl -24(%rbp), %eax
+cmpl $0, %eax
+setg %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -28(%rbp)
+cmpl $0, -28(%rbp)
+je _L6
+_L5:
+		 # Modulo expression -24(%rbp) % -8(%rbp)
+movl -24(%rbp), %eax
+cltd
+movl -8(%rbp), %ecx
+idivl %ecx
+movl %edx, -32(%rbp)
+		 # Math expression sum + r3
+movl -12(%rbp), %eax
+addl -32(%rbp), %eax
+movl %eax, -36(%rbp)
+		 # Moving r4 into r9
+movl -36(%rbp), %eax
+movl %eax, -40(%rbp)
+		 # Moving r9 into sum
+movl -40(%rbp), %eax
+movl %eax, -12(%rbp)
+		 # Division expression -24(%rbp) / -8(%rbp)
+movl -24(%rbp), %eax
+movl -8(%rbp), %ecx
+cltd
+idivl %ecx
+movl %eax, -44(%rbp)
+		 # Moving r5 into r10
+movl -44(%rbp), %eax
+movl %eax, -48(%rbp)
+		 # Moving r10 into n
+movl -48(%rbp), %eax
+movl %eax, -24(%rbp)
+jmp _L4
+_L6:
+		 # Math expression i + 1
+movl -16(%rbp), %eax
+addl $1, %eax
+movl %eax, -52(%rbp)
+		 # Moving r6 into r11
+movl -52(%rbp), %eax
+movl %eax, -56(%rbp)
+		 # Moving r11 into i
+movl -56(%rbp), %eax
+movl %eax, -16(%rbp)
+jmp _L2
+_L7:
+		 # Return sum
+movl -12(%rbp), %eax
+addq $56, %rsp
+popq %rbp
+retq
+_L8:
+movl $0, %eax
+addq $56, %rsp
+popq %rbp
+retq
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+_L9:
+		 # Moving arguments into registers
+movl $5000000, %r8d
+movl $10, %r9d
+callq _digitSum
+		 # Saving the return value
+movl %eax, -4(%rbp)
+		 # Modulo expression r7 % 251 by multiplication
+movl -4(%rbp), %ecx
+movl $-2104705089, %eax
+imull %ecx
+addl %ecx, %edx
+sarl $7, %edx
+movl %edx, %eax
+shrl $31, %eax
+addl %eax, %edx
+imull $251, %edx, %edx
+movl %ecx, %eax
+subl %edx, %eax
+movl %eax, -8(%rbp)
+		 # Return r8
+movl -8(%rbp), %eax
+popq %rbp
+retq
+_L10:
+movl $0, %eax
+addq $8, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,36 @@
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $12, %rsp
+_L1:
+movl $5, -4(%rbp)
+_L2:
+movl -4(%rbp), %eax
+cmpl $0, %eax
+setne %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -8(%rbp)
+cmpl $0, -8(%rbp)
+je _L4
+_L3:
+		 # Math expression i - 1
+movl -4(%rbp), %eax
+subl $1, %eax
+movl %eax, -12(%rbp)
+		 # Moving r2 into i
+movl -12(%rbp), %eax
+movl %eax, -4(%rbp)
+jmp _L2
+_L4:
+		 # Return 0
+movl $0, %eax
+addq $12, %rsp
+popq %rbp
+retq
+_L5:
+movl $0, %eax
+addq $12, %rsp
+popq %rbp
+retq
\ No newline at end of file
@@ -0,0 +1,68 @@
+	.file	"arguments.c"
+	.text
+	.globl	sum
+	.type	sum, @function
+sum:
+.LFB0:
+	.cfi_startproc
+	pushq	%rbp
+	.cfi_def_cfa_offset 16
+	.cfi_offset 6, -16
+	movq	%rsp, %rbp
+	.cfi_def_cfa_register 6
+	movl	%edi, -4(%rbp)
+	movl	%esi, -8(%rbp)
+	movl	-4(%rbp), %edx
+	movl	-8(%rbp), %eax
+	addl	%edx, %eax
+	popq	%rbp
+	.cfi_def_cfa 7, 8
+	ret
+	.cfi_endproc
+.LFE0:
+	.size	sum, .-sum
+	.globl	main
+	.type	main, @function
+main:
+.LFB1:
+	.cfi_startproc
+	pushq	%rbp
+	.cfi_def_cfa_offset 16
+	.cfi_offset 6, -16
+	movq	%rsp, %rbp
+	.cfi_def_cfa_register 6
+	pushq	%rbx
+	subq	$16, %rsp
+	.cfi_offset 3, -24
+	movl	$2, %esi
+	movl	$4, %edi
+	call	sum
+	movl	%eax, -12(%rbp)
+	movl	$4, %esi
+	movl	$2, %edi
+	call	sum
+	movl	%eax, -12(%rbp)
+	movl	$2, -12(%rbp)
+	movl	-12(%rbp), %eax
+	movl	%eax, %esi
+	movl	$5, %edi
+	call	sum
+	movl	$2, %esi
+	movl	$1, %edi
+	call	sum
+	movl	%eax, %ebx
+	movl	$4, %esi
+	movl	$3, %edi
+	call	sum
+	addl	%ebx, %eax
+	movl	%eax, -12(%rbp)
+	movl	-12(%rbp), %eax
+	movq	-8(%rbp), %rbx
+	leave
+	.cfi_def_cfa 7, 8
+	ret
+	.cfi_endproc
+.LFE1:
+	.size	main, .-main
+	.ident	"GCC: (Debian 12.2.0-14+deb12u1) 12.2.0"
+	.section	.note.GNU-stack,"",@progbits
@@ -0,0 +1,32 @@
+	.file	"binary_ops.c"
+	.text
+	.globl	main
+	.type	main, @function
+main:
+.LFB0:
+	.cfi_startproc
+	pushq	%rbp
+	.cfi_def_cfa_offset 16
+	.cfi_offset 6, -16
+	movq	%rsp, %rbp
+	.cfi_def_cfa_register 6
+	movl	$1, -4(%rbp)
+	movl	$0, -8(%rbp)
+	movl	-4(%rbp), %eax
+	andl	-8(%rbp), %eax
+	movl	%eax, -12(%rbp)
+	movl	-4(%rbp), %eax
+	orl	-8(%rbp), %eax
+	movl	%eax, -16(%rbp)
+	movl	-4(%rbp), %eax
+	xorl	-8(%rbp), %eax
+	movl	%eax, -20(%rbp)
+	movl	-20(%rbp), %eax
+	popq	%rbp
+	.cfi_def_cfa 7, 8
+	ret
+	.cfi_endproc
+.LFE0:
+	.size	main, .-main
+	.ident	"GCC: (Debian 12.2.0-14+deb12u1) 12.2.0"
+	.section	.note.GNU-stack,"",@progbits
@@ -0,0 +1,34 @@
+	.file	"break.c"
+	.text
+	.globl	main
+	.type	main, @function
+main:
+.LFB0:
+	.cfi_startproc
+	pushq	%rbp
+	.cfi_def_cfa_offset 16
+	.cfi_offset 6, -16
+	movq	%rsp, %rbp
+	.cfi_def_cfa_register 6
+	movl	$10, -4(%rbp)
+	jmp	.L2
+.L5:
+	cmpl	$2, -4(%rbp)
+	je	.L7
+	subl	$1, -4(%rbp)
+.L2:
+	cmpl	$0, -4(%rbp)
+	jg	.L5
+	jmp	.L4
+.L7:
+	nop
+.L4:
+	movl	-4(%rbp), %eax
+	popq	%rbp
+	.cfi_def_cfa 7, 8
+	ret
+	.cfi_endproc
+.LFE0:
+	.size	main, .-main
+	.ident	"GCC: (Debian 12.2.0-14+deb12u1) 12.2.0"
+	.section	.note.GNU-stack,"",@progbits
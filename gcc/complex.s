@@ -0,0 +1,193 @@
+	.file	"complex.c"
+	.text
+	.globl	mult
+	.type	mult, @function
+mult:
+.LFB0:
+	.cfi_startproc
+	pushq	%rbp
+	.cfi_def_cfa_offset 16
+	.cfi_offset 6, -16
+	movq	%rsp, %rbp
+	.cfi_def_cfa_register 6
+	movl	%edi, -4(%rbp)
+	movl	%esi, -8(%rbp)
+	movl	-4(%rbp), %eax
+	imull	-8(%rbp), %eax
+	popq	%rbp
+	.cfi_def_cfa 7, 8
+	ret
+	.cfi_endproc
+.LFE0:
+	.size	mult, .-mult
+	.globl	sub
+	.type	sub, @function
+sub:
+.LFB1:
+	.cfi_startproc
+	pushq	%rbp
+	.cfi_def_cfa_offset 16
+	.cfi_offset 6, -16
+	movq	%rsp, %rbp
+	.cfi_def_cfa_register 6
+	movl	%edi, -4(%rbp)
+	movl	%esi, -8(%rbp)
+	movl	-4(%rbp), %eax
+	subl	-8(%rbp), %eax
+	popq	%rbp
+	.cfi_def_cfa 7, 8
+	ret
+	.cfi_endproc
+.LFE1:
+	.size	sub, .-sub
+	.globl	sum
+	.type	sum, @function
+sum:
+.LFB2:
+	.cfi_startproc
+	pushq	%rbp
+	.cfi_def_cfa_offset 16
+	.cfi_offset 6, -16
+	movq	%rsp, %rbp
+	.cfi_def_cfa_register 6
+	subq	$24, %rsp
+	movl	%edi, -20(%rbp)
+	movl	%esi, -24(%rbp)
+	movl	-24(%rbp), %eax
+	movl	%eax, %esi
+	movl	$-1, %edi
+	call	mult
+	movl	%eax, -24(%rbp)
+	movl	-24(%rbp), %eax
+	movl	$-1, %esi
+	movl	%eax, %edi
+	call	mult
+	movl	%eax, -24(%rbp)
+	movl	-24(%rbp), %eax
+	movl	%eax, %esi
+	movl	$-1, %edi
+	call	mult
+	movl	%eax, -24(%rbp)
+	movl	-24(%rbp), %edx
+	movl	-20(%rbp), %eax
+	movl	%edx, %esi
+	movl	%eax, %edi
+	call	sub
+	movl	%eax, -4(%rbp)
+	movl	-4(%rbp), %eax
+	leave
+	.cfi_def_cfa 7, 8
+	ret
+	.cfi_endproc
+.LFE2:
+	.size	sum, .-sum
+	.globl	mult2
+	.type	mult2, @function
+mult2:
+.LFB3:
+	.cfi_startproc
+	pushq	%rbp
+	.cfi_def_cfa_offset 16
+	.cfi_offset 6, -16
+	movq	%rsp, %rbp
+	.cfi_def_cfa_register 6
+	movl	%edi, -20(%rbp)
+	movl	%esi, -24(%rbp)
+	movl	$0, -4(%rbp)
+	movl	-20(%rbp), %eax
+	movl	%eax, -8(%rbp)
+	jmp	.L8
+.L9:
+	movl	-8(%rbp), %eax
+	addl	%eax, -4(%rbp)
+	subl	$1, -24(%rbp)
+.L8:
+	cmpl	$0, -24(%rbp)
+	jg	.L9
+	movl	-4(%rbp), %eax
+	popq	%rbp
+	.cfi_def_cfa 7, 8
+	ret
+	.cfi_endproc
+.LFE3:
+	.size	mult2, .-mult2
+	.globl	div
+	.type	div, @function
+div:
+.LFB4:
+	.cfi_startproc
+	pushq	%rbp
+	.cfi_def_cfa_offset 16
+	.cfi_offset 6, -16
+	movq	%rsp, %rbp
+	.cfi_def_cfa_register 6
+	movl	%edi, -4(%rbp)
+	movl	%esi, -8(%rbp)
+	movl	-4(%rbp), %eax
+	cltd
+	idivl	-8(%rbp)
+	popq	%rbp
+	.cfi_def_cfa 7, 8
+	ret
+	.cfi_endproc
+.LFE4:
+	.size	div, .-div
+	.globl	main
+	.type	main, @function
+main:
+.LFB5:
+	.cfi_startproc
+	pushq	%rbp
+	.cfi_def_cfa_offset 16
+	.cfi_offset 6, -16
+	movq	%rsp, %rbp
+	.cfi_def_cfa_register 6
+	subq	$32, %rsp
+	movl	$2, %esi
+	movl	$3, %edi
+	call	sum
+	movl	%eax, -16(%rbp)
+	movl	-16(%rbp), %eax
+	movl	%eax, -4(%rbp)
+	cmpl	$4, -4(%rbp)
+	jne	.L14
+	movl	$20, -4(%rbp)
+	jmp	.L15
+.L14:
+	movl	$30, -4(%rbp)
+.L15:
+	movl	-4(%rbp), %eax
+	movl	$10, %esi
+	movl	%eax, %edi
+	call	div
+	movl	%eax, -8(%rbp)
+	movl	$100, -12(%rbp)
+	jmp	.L16
+.L17:
+	addl	$1, -12(%rbp)
+	subl	$1, -8(%rbp)
+.L16:
+	cmpl	$0, -8(%rbp)
+	jg	.L17
+	movl	-12(%rbp), %eax
+	movl	$2, %esi
+	movl	%eax, %edi
+	call	mult2
+	movl	%eax, -20(%rbp)
+	cmpl	$206, -20(%rbp)
+	je	.L22
+	movl	$2, %eax
+	jmp	.L20
+.L22:
+	nop
+.L19:
+	movl	$11, %eax
+.L20:
+	leave
+	.cfi_def_cfa 7, 8
+	ret
+	.cfi_endproc
+.LFE5:
+	.size	main, .-main
+	.ident	"GCC: (Debian 12.2.0-14+deb12u1) 12.2.0"
+	.section	.note.GNU-stack,"",@progbits
@@ -0,0 +1,41 @@
+	.file	"switch.c"
+	.text
+	.globl	main
+	.type	main, @function
+main:
+.LFB0:
+	.cfi_startproc
+	pushq	%rbp
+	.cfi_def_cfa_offset 16
+	.cfi_offset 6, -16
+	movq	%rsp, %rbp
+	.cfi_def_cfa_register 6
+	movl	$5, -4(%rbp)
+	cmpl	$10, -4(%rbp)
+	je	.L2
+	cmpl	$10, -4(%rbp)
+	jg	.L3
+	cmpl	$1, -4(%rbp)
+	je	.L4
+	cmpl	$5, -4(%rbp)
+	je	.L5
+	jmp	.L3
+.L4:
+	movl	$2, -4(%rbp)
+	jmp	.L3
+.L5:
+	movl	$22, -4(%rbp)
+	jmp	.L3
+.L2:
+	movl	$11, -4(%rbp)
+	nop
+.L3:
+	movl	-4(%rbp), %eax
+	popq	%rbp
+	.cfi_def_cfa 7, 8
+	ret
+	.cfi_endproc
+.LFE0:
+	.size	main, .-main
+	.ident	"GCC: (Debian 12.2.0-14+deb12u1) 12.2.0"
+	.section	.note.GNU-stack,"",@progbits
@@ -7,7 +7,9 @@ Reads in the IR and generates assembly instructions (x86).
 
 import re
 import platform
-from src.util import CompilerMessage, writeFile
+from src.util import CompilerMessage, current, writeFile
+from src.ir.instructions import Opcode, Kind, fromList, opcodeOf, toList
+from src.ir.strength import powerOfTwo
 
 order = ["%r8d", "%r9d", "%r10d", "%r11d", "%r12d", "%r13d", "%r14d", "%r15d"]
 
@@ -19,13 +21,60 @@ def isNumber(s):
     return False
 
 
+def magicNumber(divisor):
+    """
+    Compute the multiplier and shift that divide a signed 32-bit int by a
+    constant with a multiplication, following Granlund and Montgomery as
+    given in Hacker's Delight. The divisor must not be -1, 0 or 1.
+    The quotient is the high 32 bits of n * multiplier, plus n when the
+    divisor is positive and the multiplier negative, minus n when it is
+    the other way around, shifted right by shift and rounded towards zero.
+    """
+
+    two31 = 2**31
+    absolute = abs(divisor)
+
+    # The largest dividend whose remainder is absolute - 1
+    t = two31 + (1 if divisor < 0 else 0)
+    anc = t - 1 - t % absolute
+
+    p = 31
+    q1, r1 = divmod(two31, anc)
+    q2, r2 = divmod(two31, absolute)
+
+    while True:
+        p += 1
+        q1, r1 = 2 * q1, 2 * r1
+        if r1 >= anc:
+            q1, r1 = q1 + 1, r1 - anc
+        q2, r2 = 2 * q2, 2 * r2
+        if r2 >= absolute:
+            q2, r2 = q2 + 1, r2 - absolute
+
+        delta = absolute - r2
+        if not (q1 < delta or (q1 == delta and r1 == 0)):
+            break
+
+    multiplier = q2 + 1
+    if multiplier >= two31:
+        multiplier -= 2**32
+    if divisor < 0:
+        multiplier = -multiplier
+
+    return multiplier, p - 32
+
+
 class Assembler:
     """The general assembly class."""
 
-    def __init__(self, ir):
+    def __init__(self, ir, context=None, tailCalls=False):
         self.ir = ir
+        self.context = context if context is not None else current()
         self.asm = []
 
+        # Whether calls whose result is returned become jumps
+        self.tailCalls = tailCalls
+
     def generate(self):
         """Generate the ASM from our intermediate assembly."""
 
@@ -36,6 +85,7 @@ class Assembler:
                 self.ir[function]["blocks"],
                 self.ir[function]["arguments"],
                 self.ir[function]["declarations"],
+                self.tailCalls,
             )
             self.asm.extend(f.asm)
 
@@ -50,11 +100,29 @@ class Assembler:
     def write(self, filename):
         """Creates output file for assembly"""
 
-        writeFile(filename, "\n".join(self.asm))
+        with self.context.activate():
+            writeFile(filename, "\n".join(self.asm))
+
+
+def isTailCall(instructions, index):
+    """Check if the instruction at a position is a call whose result it returns."""
+
+    if index + 1 >= len(instructions):
+        return False
+
+    call, ins = instructions[index], instructions[index + 1]
+    call = call if isinstance(call, list) else toList(call)
+    ins = ins if isinstance(ins, list) else toList(ins)
+
+    return (
+        opcodeOf(call) == Opcode.CALL
+        and opcodeOf(ins) == Opcode.RETURN
+        and ins[1] == call[1]
+    )
 
 
 class Function:
-    def __init__(self, name, blocks, arguments, declarations):
+    def __init__(self, name, blocks, arguments, declarations, tailCalls=False):
         self.name = name
         self.blocks = blocks
         self.arguments = arguments
@@ -77,8 +145,16 @@ class Function:
 
         self.setup()
         for block in blocks:
-            for instruction in block.instructions:
-                self.parse(instruction)
+            instructions = block.instructions
+            index = 0
+            while index < len(instructions):
+                # The return after a tail call is left to the callee
+                if tailCalls and isTailCall(instructions, index):
+                    self.tailCall(instructions[index])
+                    index += 2
+                else:
+                    self.parse(instructions[index])
+                    index += 1
         self.teardown()
 
         # Replace temporary instructions with the correct number of bytes
@@ -90,22 +166,12 @@ class Function:
             self.asm[4] = f"subq ${self.memory}, %rsp"
 
     def parse(self, ins):
-        """Parse an IR instruction."""
-
-        op = ins[0]
-
-        if op == "label":
-            self.label(ins)
-        if op == "ret":
-            self.returnStatement(ins)
-        elif op == "goto":
-            self.goto(ins)
-        elif op == "if":
-            self.ifStatement(ins)
-        elif op == "call":
-            self.call(ins)
-        elif ins[1] == "=":
-            self.assignment(ins)
+        """Parse an IR instruction, in list form or typed."""
+
+        if isinstance(ins, list):
+            ins = fromList(ins)
+
+        self.handlers[ins.opcode](self, ins)
 
     def setup(self):
         """Instructions that appear at the beginning of every function."""
@@ -198,14 +264,15 @@ class Function:
     # Parsing for specific types of instructions
 
     def returnStatement(self, ins):
-        self.comment(f"Return {ins[1]}")
+        value = ins.value.value
+        self.comment(f"Return {value}")
 
-        if isNumber(ins[1]):
+        if ins.value.kind == Kind.CONSTANT:
             # If returning a digit, do a literal
-            self.move(ins[1], "%eax")
+            self.move(value, "%eax")
         else:
             # Otherwise look up the memory address
-            self.move(self.get(ins[1]), "%eax")
+            self.move(self.get(value), "%eax")
 
         if self.align:
             self.asm.append("REPLACEME ADDQ")
@@ -213,52 +280,54 @@ class Function:
         self.asm.append("popq %rbp")
         self.asm.append("retq")
 
-    def assignment(self, ins):
-        operand = ins[0]
-        dest = self.get(operand)
+    def unaryAssignment(self, ins):
+        dest = self.get(ins.dest.value)
 
-        if ins[2] == "!":
-            rhs = ins[3]
-            self.notExpression(dest, rhs)
-        elif ins[2] == "~":
-            rhs = ins[3]
-            self.binaryNotExpression(dest, rhs)
-        elif len(ins) > 3:
-            # Expression assignment i.e. i = 2 + 2
-            lhs = ins[2]
-            op = ins[3]
-            rhs = ins[4]
-
-            if op == "&&":
-                op = "and"
-            if op == "||":
-                op = "or"
-
-            # If both operators are plain digits, pre-compute it
-            if isNumber(lhs) and isNumber(rhs):
-                try:
-                    result = int(eval(f"{lhs} {op} {rhs}"))
-                except ZeroDivisionError:
-                    raise CompilerMessage(f"Cannot divide by zero: {lhs} {op} {rhs}")
-                self.comment(f"Precalculated {lhs} {op} {rhs} = {result}")
-                self.move(result, dest)
-            else:
-                # Otherwise there needs to be assembly logic
-                self.mathAssignment(dest, lhs, op, rhs)
+        if ins.operator == "!":
+            self.notExpression(dest, ins.operand.value)
+        else:
+            self.binaryNotExpression(dest, ins.operand.value)
+
+    def binaryAssignment(self, ins):
+        # Expression assignment i.e. i = 2 + 2
+        dest = self.get(ins.dest.value)
+        lhs = ins.lhs.value
+        op = ins.operator
+        rhs = ins.rhs.value
+
+        if op == "&&":
+            op = "and"
+        if op == "||":
+            op = "or"
+
+        # If both operators are plain digits, pre-compute it
+        if ins.lhs.kind == Kind.CONSTANT and ins.rhs.kind == Kind.CONSTANT:
+            try:
+                result = int(eval(f"{lhs} {op} {rhs}"))
+            except ZeroDivisionError:
+                raise CompilerMessage(f"Cannot divide by zero: {lhs} {op} {rhs}")
+            self.comment(f"Precalculated {lhs} {op} {rhs} = {result}")
+            self.move(result, dest)
         else:
-            # Single assignment i.e. i = 2
-            lhs = ins[2]
+            # Otherwise there needs to be assembly logic
+            self.mathAssignment(dest, lhs, op, rhs)
 
-            if isNumber(lhs):
-                # If assignment of digit, do a literal
-                self.move(lhs, dest)
-            else:
-                # Move the value of LHS into the destination
-                self.comment(f"Moving {lhs} into {operand}")
-                dest = self.resolve(operand)
-                lhs = self.resolve(lhs)
-                self.move(lhs, "%eax")
-                self.move("%eax", dest)
+    def copyAssignment(self, ins):
+        # Single assignment i.e. i = 2
+        operand = ins.dest.value
+        dest = self.get(operand)
+        lhs = ins.source.value
+
+        if ins.source.kind == Kind.CONSTANT:
+            # If assignment of digit, do a literal
+            self.move(lhs, dest)
+        else:
+            # Move the value of LHS into the destination
+            self.comment(f"Moving {lhs} into {operand}")
+            dest = self.resolve(operand)
+            lhs = self.resolve(lhs)
+            self.move(lhs, "%eax")
+            self.move("%eax", dest)
 
     def mathAssignment(self, dest, lhs, op, rhs):
         # Handle comparison assignments separately
@@ -301,6 +370,36 @@ class Function:
         self.move("%eax", dest)
 
     def modulo(self, dest, lhs, rhs):
+        # The sign of the divisor does not change the remainder
+        shift = powerOfTwo(rhs.lstrip("-"))
+        if shift is not None:
+            self.comment(f"Modulo expression {lhs} % {rhs} by masking")
+
+            # The remainder is the dividend minus the dividend rounded
+            # towards zero to a multiple of the divisor
+            mask = 2**shift - 1
+            self.move(self.resolve(lhs), "%ecx")
+            self.move("%ecx", "%edx")
+            self.asm.append("sarl $31, %edx")
+            self.asm.append(f"andl ${mask}, %edx")
+            self.asm.append("addl %ecx, %edx")
+            self.asm.append(f"andl ${~mask}, %edx")
+            self.move("%ecx", "%eax")
+            self.asm.append("subl %edx, %eax")
+            self.move("%eax", dest)
+            return
+
+        if isNumber(rhs) and rhs != "0":
+            self.comment(f"Modulo expression {lhs} % {rhs} by multiplication")
+
+            # The remainder is the dividend minus the quotient times the divisor
+            self.constantDivision(lhs, int(rhs))
+            self.asm.append(f"imull ${rhs}, %edx, %edx")
+            self.move("%ecx", "%eax")
+            self.asm.append("subl %edx, %eax")
+            self.move("%eax", dest)
+            return
+
         lhs = self.resolve(lhs)
         rhs = self.resolve(rhs)
 
@@ -313,6 +412,12 @@ class Function:
         self.move("%edx", dest)
 
     def division(self, dest, lhs, rhs):
+        if isNumber(rhs) and rhs != "0":
+            self.comment(f"Division expression {lhs} / {rhs} by multiplication")
+            self.constantDivision(lhs, int(rhs))
+            self.move("%edx", dest)
+            return
+
         lhs = self.resolve(lhs)
         rhs = self.resolve(rhs)
 
@@ -324,15 +429,58 @@ class Function:
         self.asm.append("idivl %ecx")
         self.move("%eax", dest)
 
+    def constantDivision(self, lhs, divisor):
+        """
+        Divide by a constant other than 0 without idivl.
+        Leaves the dividend in %ecx and the quotient in %edx.
+        """
+
+        self.move(self.resolve(lhs), "%ecx")
+
+        if divisor in (1, -1):
+            self.move("%ecx", "%edx")
+            if divisor == -1:
+                self.asm.append("negl %edx")
+            return
+
+        shift = powerOfTwo(str(divisor))
+        if shift is not None:
+            # Negative dividends are biased by divisor - 1 to round towards zero
+            self.move("%ecx", "%edx")
+            self.asm.append("sarl $31, %edx")
+            self.asm.append(f"andl ${divisor - 1}, %edx")
+            self.asm.append("addl %ecx, %edx")
+            self.asm.append(f"sarl ${shift}, %edx")
+            return
+
+        multiplier, shift = magicNumber(divisor)
+
+        # The high half of the product lands in %edx
+        self.move(multiplier, "%eax")
+        self.asm.append("imull %ecx")
+
+        if divisor > 0 and multiplier < 0:
+            self.asm.append("addl %ecx, %edx")
+        elif divisor < 0 and multiplier > 0:
+            self.asm.append("subl %ecx, %edx")
+
+        if shift:
+            self.asm.append(f"sarl ${shift}, %edx")
+
+        # Negative quotients are rounded up towards zero
+        self.move("%edx", "%eax")
+        self.asm.append("shrl $31, %eax")
+        self.asm.append("addl %eax, %edx")
+
     def label(self, ins):
-        self.asm.append(f"{ins[1]}:")
+        self.asm.append(f"{ins.name.value}:")
 
     def goto(self, ins):
-        self.asm.append(f"jmp {ins[1]}")
+        self.asm.append(f"jmp {ins.target.value}")
 
     def ifStatement(self, ins):
-        condition = self.resolve(ins[1])
-        elseLabel = ins[6]
+        condition = self.resolve(ins.condition.value)
+        elseLabel = ins.otherwise.value
 
         # If the condition is false, we jump to the elseBody
         # Otherwise, we automatically continue to the ifBody
@@ -377,19 +525,40 @@ class Function:
         self.asm.append(f"movl %edx, {dest}")
 
     def call(self, ins):
-        dest = ins[1]
-        name = ins[3]
-        arguments = ins[4]
+        dest = ins.dest.value
+        name = ins.function.value
 
         self.comment("Moving arguments into registers")
-        for index, argument in enumerate(arguments):
-            self.move(self.resolve(argument), order[index])
+        for index, argument in enumerate(ins.arguments):
+            self.move(self.resolve(argument.value), order[index])
 
         self.asm.append(f"callq _{name}")
 
         self.comment("Saving the return value")
         self.move("%eax", self.resolve(dest))
 
+    def tailCall(self, ins):
+        """
+        Jump to the function of a call whose result is returned, after
+        tearing down the frame, so the callee returns to our caller.
+        """
+
+        if isinstance(ins, list):
+            ins = fromList(ins)
+
+        name = ins.function.value
+
+        self.comment("Moving arguments into registers")
+        for index, argument in enumerate(ins.arguments):
+            self.move(self.resolve(argument.value), order[index])
+
+        self.comment(f"Tail call to {name}")
+        if self.align:
+            self.asm.append("REPLACEME ADDQ")
+
+        self.asm.append("popq %rbp")
+        self.asm.append(f"jmp _{name}")
+
     def notExpression(self, dest, rhs):
         self.comment(f"Not expression !{rhs}")
 
@@ -413,6 +582,11 @@ class Function:
     def shift(self, dest, lhs, op, rhs):
         self.comment(f"Shift operation {lhs} {op} {rhs}")
 
+        # Shifts by a constant take it as an immediate
+        count = "%cl"
+        if isNumber(rhs):
+            count = f"${rhs}"
+
         lhs = self.resolve(lhs)
         rhs = self.resolve(rhs)
 
@@ -422,8 +596,9 @@ class Function:
             op = "sarl"
 
         self.move(lhs, "%eax")
-        self.move(rhs, "%ecx")
-        self.asm.append(f"{op} %cl, %eax")
+        if count == "%cl":
+            self.move(rhs, "%ecx")
+        self.asm.append(f"{op} {count}, %eax")
         self.move("%eax", dest)
 
     def binaryNotExpression(self, dest, rhs):
@@ -434,3 +609,21 @@ class Function:
         self.move(rhs, "%eax")
         self.asm.append("xorl $-1, %eax")
         self.move("%eax", dest)
+
+    def phi(self, ins):
+        raise CompilerMessage(
+            f"Cannot assemble a phi of {ins.dest.value}, the IR is still in SSA form."
+        )
+
+    # Handlers of the instructions, by opcode
+    handlers = {
+        Opcode.LABEL: label,
+        Opcode.GOTO: goto,
+        Opcode.BRANCH: ifStatement,
+        Opcode.RETURN: returnStatement,
+        Opcode.CALL: call,
+        Opcode.COPY: copyAssignment,
+        Opcode.UNARY: unaryAssignment,
+        Opcode.BINARY: binaryAssignment,
+        Opcode.PHI: phi,
+    }
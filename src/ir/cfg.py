@@ -0,0 +1,271 @@
+"""
+Basic blocks and the control flow graph of a function.
+
+The successors of a block follow from its first goto, if or ret
+instruction, or from falling through to the next block when it has none.
+The graph keeps successor and predecessor lists on every block, maps
+labels to blocks and numbers the blocks in reverse postorder.
+"""
+
+from src.ir.instructions import Opcode, Tagged, opcodeOf
+from src.util import CompilerMessage
+
+
+class BasicBlock:
+    """Defines a set of instructions and data that compose a Basic Block."""
+
+    def __init__(self, instructions, label=None):
+        self.instructions = instructions
+        self.label = label
+        self.successors = []
+        self.predecessors = []
+
+        # Position in reverse postorder, None while unreachable
+        self.order = None
+
+        if label is not None:
+            self.instructions.insert(0, Tagged(["label", label]))
+
+    def print(self):
+        """Print this basic block."""
+
+        for i in self.instructions:
+            print(i)
+        print()
+
+    def __repr__(self):
+        return f"<BasicBlock {self.label}>"
+
+
+def blockLabels(block):
+    """
+    Return the labels at the start of a block: its own label,
+    followed by any goto labels declared there.
+    """
+
+    labels = []
+    for ins in block.instructions:
+        if opcodeOf(ins) != Opcode.LABEL:
+            break
+        labels.append(ins[1])
+
+    return labels
+
+
+def jumpTargets(block):
+    """
+    Return the labels a block jumps to and whether it falls through.
+    Instructions after the first jump or return of a block are unreachable.
+    """
+
+    for ins in block.instructions:
+        op = opcodeOf(ins)
+
+        if op == Opcode.GOTO:
+            return [ins[1]], False
+        if op == Opcode.BRANCH:
+            if ins[3] == ins[6]:
+                return [ins[3]], False
+            return [ins[3], ins[6]], False
+        if op == Opcode.RETURN:
+            return [], False
+
+    return [], True
+
+
+class ControlFlowGraph:
+    """The control flow graph of the basic blocks of a function."""
+
+    def __init__(self, blocks):
+        # The blocks of the function in program order, shared with the IR
+        self.blocks = blocks
+
+        self.entry = blocks[0] if blocks else None
+
+        # Returns and the end of the function lead to a single exit block
+        self.exit = BasicBlock([])
+
+        # Maps every label to the block it starts
+        self.labels = {}
+        for block in blocks:
+            for label in blockLabels(block):
+                self.labels[label] = block
+
+        self.stale = True
+        self.reversePostorder = []
+
+        for index, block in enumerate(blocks):
+            self.connect(block, index)
+
+    def connect(self, block, index):
+        """Add the outgoing edges of the block at a position in the function."""
+
+        targets, fallsThrough = jumpTargets(block)
+
+        for label in targets:
+            try:
+                self.link(block, self.labels[label])
+            except KeyError:
+                raise CompilerMessage(f"Jump to an unknown label: {label}")
+
+        if fallsThrough:
+            if index + 1 < len(self.blocks):
+                self.link(block, self.blocks[index + 1])
+            else:
+                self.link(block, self.exit)
+        elif not targets:
+            self.link(block, self.exit)
+
+    def disconnect(self, block):
+        """Remove the outgoing edges of a block."""
+
+        for successor in block.successors:
+            successor.predecessors.remove(block)
+
+        block.successors = []
+        self.stale = True
+
+    def link(self, source, target):
+        """Add an edge between two blocks."""
+
+        if target not in source.successors:
+            source.successors.append(target)
+            target.predecessors.append(source)
+            self.stale = True
+
+    def unlink(self, source, target):
+        """Remove an edge between two blocks."""
+
+        if target in source.successors:
+            source.successors.remove(target)
+            target.predecessors.remove(source)
+            self.stale = True
+
+    def update(self, block):
+        """Rebuild the outgoing edges of a block after its instructions changed."""
+
+        self.disconnect(block)
+        self.connect(block, self.blocks.index(block))
+
+    def insertBlock(self, index, block):
+        """Insert a block at a position in the function and connect it."""
+
+        self.blocks.insert(index, block)
+        for label in blockLabels(block):
+            self.labels[label] = block
+        self.connect(block, index)
+
+        # The block before may have fallen through to another block
+        if index > 0:
+            self.update(self.blocks[index - 1])
+
+        if index == 0:
+            self.entry = block
+
+    def removeBlock(self, block):
+        """Remove a block from the function along with its edges."""
+
+        index = self.blocks.index(block)
+
+        self.disconnect(block)
+        for predecessor in list(block.predecessors):
+            self.unlink(predecessor, block)
+
+        del self.blocks[index]
+        for label in blockLabels(block):
+            del self.labels[label]
+        block.order = None
+
+        # The block before may have fallen through to the removed block
+        if index > 0:
+            self.update(self.blocks[index - 1])
+
+        if index == 0:
+            self.entry = self.blocks[0] if self.blocks else None
+
+    def removeUnreachable(self):
+        """
+        Remove the blocks that cannot be reached from the entry, and return them.
+        The instructions after the first jump or return of a block are removed
+        too, since they may jump to the removed blocks.
+        """
+
+        for block in self.blocks:
+            for index, ins in enumerate(block.instructions):
+                if opcodeOf(ins) in (Opcode.GOTO, Opcode.BRANCH, Opcode.RETURN):
+                    del block.instructions[index + 1 :]
+                    break
+
+        reachable = set(self.order)
+        removed = [block for block in self.blocks if block not in reachable]
+
+        for block in removed:
+            self.removeBlock(block)
+
+        return removed
+
+    @property
+    def order(self):
+        """The reachable blocks in reverse postorder, numbered when they change."""
+
+        if self.stale:
+            self.number()
+
+        return self.reversePostorder
+
+    def number(self):
+        """Number the blocks reachable from the entry in reverse postorder."""
+
+        for block in self.blocks:
+            block.order = None
+        self.exit.order = None
+
+        postorder = []
+        if self.entry is not None:
+            visited = {self.entry}
+            stack = [(self.entry, iter(self.entry.successors))]
+
+            while stack:
+                block, successors = stack[-1]
+                for successor in successors:
+                    if successor not in visited:
+                        visited.add(successor)
+                        stack.append((successor, iter(successor.successors)))
+                        break
+                else:
+                    stack.pop()
+                    postorder.append(block)
+
+        postorder.reverse()
+        for index, block in enumerate(postorder):
+            block.order = index
+
+        self.reversePostorder = postorder
+        self.stale = False
+
+    def edges(self):
+        """Return every edge of the graph as (source, target) pairs."""
+
+        return [
+            (block, successor)
+            for block in self.blocks
+            for successor in block.successors
+        ]
+
+
+def instructionCount(function):
+    """Count the instructions of a function, without its labels."""
+
+    return sum(
+        1
+        for block in function["blocks"]
+        for ins in block.instructions
+        if opcodeOf(ins) != Opcode.LABEL
+    )
+
+
+def buildGraphs(ir):
+    """Build the control flow graph of every function of an IR dict."""
+
+    for function in ir.values():
+        function["cfg"] = ControlFlowGraph(function["blocks"])
@@ -0,0 +1,404 @@
+"""
+Constant propagation, constant folding and algebraic simplification.
+
+The values of temps and variables that are known constants are found with
+a forward dataflow analysis over the control flow graph, then every
+instruction has the constants substituted into it and is folded where
+possible. Operators are evaluated with the semantics of 32-bit C ints:
+arithmetic wraps around, division truncates towards zero, and operations
+whose result is undefined, such as division by zero, are left to run.
+"""
+
+from src.ir.instructions import Opcode, Tagged, opcodeOf, destOf, replaceUses
+from src.ir.ssa import phis, prunePhis
+
+constantSign = 2**31
+constantRange = 2**32
+
+# Operators whose operands can be swapped
+commutative = {"+", "*", "&", "|", "^", "==", "!="}
+
+
+def wrap(value):
+    """Wrap an integer around to the range of a 32-bit int."""
+
+    return (value + constantSign) % constantRange - constantSign
+
+
+def isConstant(name):
+    """Check if an operand is an integer literal."""
+
+    return name.lstrip("-").isdigit()
+
+
+def divide(lhs, rhs):
+    """Divide two ints, truncating towards zero like C."""
+
+    quotient = abs(lhs) // abs(rhs)
+
+    return -quotient if (lhs < 0) != (rhs < 0) else quotient
+
+
+def evaluate(op, lhs, rhs):
+    """
+    Compute a binary operation on two 32-bit ints.
+    Returns None when the result is undefined and must not be folded.
+    """
+
+    if op == "+":
+        return wrap(lhs + rhs)
+    if op == "-":
+        return wrap(lhs - rhs)
+    if op == "*":
+        return wrap(lhs * rhs)
+    if op in ("/", "%"):
+        if rhs == 0 or (lhs == -constantSign and rhs == -1):
+            return None
+        quotient = divide(lhs, rhs)
+        return quotient if op == "/" else lhs - quotient * rhs
+    if op in ("<<", ">>"):
+        if not 0 <= rhs < 32:
+            return None
+        return wrap(lhs << rhs) if op == "<<" else lhs >> rhs
+    if op == "&":
+        return wrap(lhs & rhs)
+    if op == "|":
+        return wrap(lhs | rhs)
+    if op == "^":
+        return wrap(lhs ^ rhs)
+    if op == "&&":
+        return int(lhs != 0 and rhs != 0)
+    if op == "||":
+        return int(lhs != 0 or rhs != 0)
+    if op == "==":
+        return int(lhs == rhs)
+    if op == "!=":
+        return int(lhs != rhs)
+    if op == "<":
+        return int(lhs < rhs)
+    if op == "<=":
+        return int(lhs <= rhs)
+    if op == ">":
+        return int(lhs > rhs)
+    if op == ">=":
+        return int(lhs >= rhs)
+
+    return None
+
+
+def evaluateUnary(op, value):
+    """Compute a unary operation on a 32-bit int."""
+
+    if op == "!":
+        return int(value == 0)
+
+    return wrap(~value)
+
+
+def identity(dest, op, lhs, rhs):
+    """
+    Simplify a binary operation with a single constant operand, or with the
+    same operand twice. Returns the simplified instruction or None.
+    """
+
+    if lhs == rhs and op in ("-", "^"):
+        return Tagged([dest, "=", "0"])
+
+    # Constants are moved to the right of commutative operators
+    if isConstant(lhs) and op in commutative:
+        lhs, rhs = rhs, lhs
+
+    if not isConstant(rhs):
+        return None
+
+    value = int(rhs)
+
+    if value == 0 and op in ("+", "-", "|", "^", "<<", ">>"):
+        return Tagged([dest, "=", lhs])
+    if value == 0 and op in ("*", "&"):
+        return Tagged([dest, "=", "0"])
+    if value == 1 and op in ("*", "/"):
+        return Tagged([dest, "=", lhs])
+
+    return None
+
+
+def simplify(ins, constants):
+    """
+    Return an instruction with the known constants substituted into it,
+    folded if all of its operands are constant. The instruction is not changed.
+    """
+
+    op = opcodeOf(ins)
+
+    if op in (Opcode.LABEL, Opcode.GOTO, Opcode.PHI):
+        return ins
+
+    original, ins = ins, Tagged(ins, op)
+    replaceUses(ins, lambda name: str(constants[name]) if name in constants else name)
+
+    if op == Opcode.UNARY and isConstant(ins[3]):
+        return Tagged([ins[0], "=", str(evaluateUnary(ins[2], int(ins[3])))])
+
+    if op == Opcode.BINARY:
+        dest, lhs, rhs = ins[0], ins[2], ins[4]
+
+        if isConstant(lhs) and isConstant(rhs):
+            value = evaluate(ins[3], int(lhs), int(rhs))
+            if value is not None:
+                return Tagged([dest, "=", str(value)])
+
+            # Undefined operations, i.e. division by zero, are left to run
+            # with the names they read, which may be on a path never taken
+            return Tagged(original, op)
+
+        return identity(dest, ins[3], lhs, rhs) or ins
+
+    if op == Opcode.BRANCH and isConstant(ins[1]):
+        return Tagged(["goto", ins[3] if int(ins[1]) else ins[6]])
+
+    return ins
+
+
+def assign(ins, constants):
+    """Record the value an instruction assigns, if it is a constant."""
+
+    dest = destOf(ins)
+    if dest is None:
+        return
+
+    if opcodeOf(ins) == Opcode.COPY and isConstant(ins[2]):
+        constants[dest] = int(ins[2])
+    else:
+        constants.pop(dest, None)
+
+
+class ConstantPropagation:
+    """
+    Find the constants known at the start of every block that can run.
+    A name is constant at the start of a block if it has the same value at
+    the end of every predecessor that can jump to the block. Branches on
+    constants only lead to the block they take, so the other block does not
+    weaken what is known after the branches join.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+        # The constants at the end of every block visited so far
+        self.outs = {}
+
+        # The successors every visited block can jump to
+        self.edges = {}
+
+        self.solve()
+
+    def valueAt(self, name, block):
+        """The value of a name at the end of a block, or None if not constant."""
+
+        if isConstant(name):
+            return int(name)
+
+        return self.outs[block].get(name)
+
+    def runs(self, source, target):
+        """Check if a visited block can jump to another block."""
+
+        return target in self.edges.get(source, ())
+
+    def entry(self, block):
+        """Return the constants at the start of a block, after its phis."""
+
+        outs = [self.outs[p] for p in block.predecessors if self.runs(p, block)]
+        if not outs:
+            constants = {}
+        else:
+            constants = dict(outs[0])
+            for out in outs[1:]:
+                for name, value in list(constants.items()):
+                    if out.get(name) != value:
+                        del constants[name]
+
+        for phi in phis(block):
+            values = set()
+            for label, value in phi[3]:
+                predecessor = self.graph.labels[label]
+                if self.runs(predecessor, block):
+                    values.add(self.valueAt(value, predecessor))
+
+            if len(values) == 1 and None not in values:
+                constants[phi[1]] = values.pop()
+            else:
+                constants.pop(phi[1], None)
+
+        return constants
+
+    def transfer(self, block):
+        """Find the constants at the end of a block and the blocks it can jump to."""
+
+        constants = self.entry(block)
+        successors = block.successors
+
+        for ins in block.instructions:
+            new = simplify(ins, constants)
+            assign(new, constants)
+
+            op = opcodeOf(new)
+            if op == Opcode.GOTO and opcodeOf(ins) == Opcode.BRANCH:
+                successors = [self.graph.labels[new[1]]]
+            if op in (Opcode.GOTO, Opcode.BRANCH, Opcode.RETURN):
+                break
+
+        return constants, successors
+
+    def solve(self):
+        """Visit the blocks in reverse postorder until the constants stop changing."""
+
+        order = self.graph.order
+
+        changed = True
+        while changed:
+            changed = False
+
+            for block in order:
+                if block is not order[0] and not any(
+                    self.runs(p, block) for p in block.predecessors
+                ):
+                    continue
+
+                constants, successors = self.transfer(block)
+
+                if self.outs.get(block) != constants:
+                    self.outs[block] = constants
+                    changed = True
+                if self.edges.get(block) != successors:
+                    self.edges[block] = successors
+                    changed = True
+
+
+def reassociate(ins, chains):
+    """
+    Combine the constants of a chain of additions or multiplications,
+    i.e. r2 = r1 + 3 where r1 = a + 2 becomes r2 = a + 5.
+    chains maps names to the (base, operator, constant) that computed them.
+    """
+
+    step = chainOf(ins)
+    if step is None:
+        return ins
+
+    lhs, op, value = step
+    chain = chains.get(lhs)
+    if chain is None or chain[1] != op:
+        return ins
+
+    dest = ins[0]
+    lhs = chain[0]
+    value = wrap(value * chain[2] if op == "*" else value + chain[2])
+
+    if op == "+" and value == 0 or op == "*" and value == 1:
+        return Tagged([dest, "=", lhs])
+    if op == "*" and value == 0:
+        return Tagged([dest, "=", "0"])
+    if op == "+" and value < 0:
+        return Tagged([dest, "=", lhs, "-", str(-value)])
+
+    return Tagged([dest, "=", lhs, op, str(value)])
+
+
+def chainOf(ins):
+    """Return the (base, operator, constant) an instruction computes, or None."""
+
+    if opcodeOf(ins) != Opcode.BINARY:
+        return None
+
+    lhs, op, rhs = ins[2], ins[3], ins[4]
+
+    if op in ("+", "*") and isConstant(lhs):
+        lhs, rhs = rhs, lhs
+    if op not in ("+", "-", "*") or not isConstant(rhs) or isConstant(lhs):
+        return None
+
+    if op == "-":
+        return lhs, "+", -int(rhs)
+
+    return lhs, op, int(rhs)
+
+
+def forget(name, chains, users):
+    """Drop the chains computed from a name or into it after it is assigned."""
+
+    chains.pop(name, None)
+    for user in users.pop(name, ()):
+        chains.pop(user, None)
+
+
+def foldConstants(function):
+    """
+    Propagate and fold the constants of a function, simplify identities,
+    and remove the blocks that become unreachable.
+    Returns the number of instructions that were rewritten.
+    """
+
+    graph = function["cfg"]
+    propagation = ConstantPropagation(graph)
+    rewritten = 0
+
+    for block in graph.order:
+        # Blocks that cannot run are removed once their jumps are folded
+        if block not in propagation.outs:
+            continue
+
+        constants = propagation.entry(block)
+
+        # Phis read their operands at the end of their predecessors
+        for phi in phis(block):
+            for operand in phi[3]:
+                predecessor = graph.labels[operand[0]]
+                if propagation.runs(predecessor, block):
+                    value = propagation.valueAt(operand[1], predecessor)
+                    if value is not None:
+                        operand[1] = str(value)
+
+        chains = {}
+        users = {}
+        instructions = []
+        jumps = False
+
+        for ins in block.instructions:
+            new = reassociate(simplify(ins, constants), chains)
+
+            dest = destOf(new)
+            if dest is not None:
+                forget(dest, chains, users)
+                chain = chainOf(new)
+
+                # Copies carry the chain of their source
+                if opcodeOf(new) == Opcode.COPY:
+                    chain = chains.get(new[2])
+
+                if chain is not None and chain[0] != dest:
+                    chains[dest] = chain
+                    users.setdefault(chain[0], []).append(dest)
+
+            assign(new, constants)
+
+            if new != ins:
+                rewritten += 1
+                jumps = jumps or opcodeOf(ins) == Opcode.BRANCH
+
+            # Assignments of a variable to itself are dropped
+            if opcodeOf(new) == Opcode.COPY and new[0] == new[2]:
+                continue
+
+            instructions.append(new)
+
+        block.instructions[:] = instructions
+
+        if jumps:
+            graph.update(block)
+
+    graph.removeUnreachable()
+    prunePhis(graph)
+
+    return rewritten
@@ -0,0 +1,219 @@
+"""
+Copy propagation and temp coalescing.
+
+Expressions are generated into a temp that is then copied into the
+variable being assigned, i.e. r5 = a + b followed by x = r5. When the temp
+is read only by that copy, the expression is assigned to the variable
+directly. The copies that remain are propagated: after x = y, reads of x
+are replaced with y for as long as neither of them is assigned again.
+"""
+
+from src.ir.instructions import (
+    Opcode,
+    Tagged,
+    opcodeOf,
+    destOf,
+    usesOf,
+    replaceDest,
+    replaceUses,
+    constantPattern,
+    tempPattern,
+)
+from src.ir.ssa import phis
+
+
+def coalesceTemps(function):
+    """
+    Assign the expressions copied into a variable straight to the variable,
+    when their temp is assigned and read only once, in the same block.
+    Returns the number of copies removed.
+    """
+
+    reads = {}
+    writes = {}
+    for block in function["blocks"]:
+        for ins in block.instructions:
+            for name in usesOf(ins):
+                reads[name] = reads.get(name, 0) + 1
+            dest = destOf(ins)
+            if dest is not None:
+                writes[dest] = writes.get(dest, 0) + 1
+
+    removed = 0
+    for block in function["blocks"]:
+        instructions = block.instructions
+
+        # The position of the instruction that assigns each single use temp
+        temps = {}
+
+        # The last position where every name was read or assigned
+        touched = {}
+
+        coalesced = set()
+
+        for index, ins in enumerate(instructions):
+            op = opcodeOf(ins)
+            dest = destOf(ins)
+
+            if (
+                op == Opcode.COPY
+                and ins[2] in temps
+                and touched.get(dest, -1) <= temps[ins[2]]
+            ):
+                position = temps.pop(ins[2])
+                replaceDest(instructions[position], dest)
+                coalesced.add(index)
+                touched[dest] = index
+
+                # Chains of temps, i.e. r1 = a + b; r2 = r1; x = r2
+                if tempPattern.match(dest) and writes[dest] == reads.get(dest) == 1:
+                    temps[dest] = position
+                continue
+
+            for name in usesOf(ins):
+                touched[name] = index
+
+            if dest is not None:
+                touched[dest] = index
+                if (
+                    op != Opcode.PHI
+                    and tempPattern.match(dest)
+                    and writes[dest] == 1
+                    and reads.get(dest) == 1
+                ):
+                    temps[dest] = index
+
+        if coalesced:
+            block.instructions[:] = [
+                ins for index, ins in enumerate(instructions) if index not in coalesced
+            ]
+            removed += len(coalesced)
+
+    return removed
+
+
+def copyOf(ins):
+    """Return the (dest, source) of a copy between two names, or None."""
+
+    if opcodeOf(ins) == Opcode.COPY and not constantPattern.match(ins[2]):
+        return ins[0], ins[2]
+
+    return None
+
+
+def kill(copies, name):
+    """Forget the copies into or out of a name after it is assigned."""
+
+    copies.pop(name, None)
+    for dest in [dest for dest, source in copies.items() if source == name]:
+        del copies[dest]
+
+
+class CopyPropagation:
+    """
+    Find the copies that hold at the start of every reachable block.
+    A copy holds at the start of a block if it holds at the end of
+    every predecessor visited so far.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+        # The copies that hold at the end of every block visited so far
+        self.outs = {}
+
+        self.solve()
+
+    def entry(self, block):
+        """Return the copies that hold at the start of a block, after its phis."""
+
+        outs = [self.outs[p] for p in block.predecessors if p in self.outs]
+        if not outs:
+            copies = {}
+        else:
+            copies = dict(outs[0])
+            for out in outs[1:]:
+                for dest, source in list(copies.items()):
+                    if out.get(dest) != source:
+                        del copies[dest]
+
+        for phi in phis(block):
+            kill(copies, phi[1])
+
+        return copies
+
+    @staticmethod
+    def transfer(ins, copies):
+        """Rewrite the reads of an instruction and record the copy it makes."""
+
+        if opcodeOf(ins) != Opcode.PHI:
+            replaceUses(ins, lambda name: copies.get(name, name))
+
+        dest = destOf(ins)
+        if dest is None:
+            return
+
+        kill(copies, dest)
+
+        copy = copyOf(ins)
+        if copy is not None and copy[0] != copy[1]:
+            copies[dest] = copy[1]
+
+    def solve(self):
+        """Visit the blocks in reverse postorder until the copies stop changing."""
+
+        changed = True
+        while changed:
+            changed = False
+
+            for block in self.graph.order:
+                copies = self.entry(block)
+                for ins in block.instructions:
+                    self.transfer(Tagged(ins, opcodeOf(ins)), copies)
+
+                if self.outs.get(block) != copies:
+                    self.outs[block] = copies
+                    changed = True
+
+
+def propagateCopies(function):
+    """
+    Coalesce the temps of a function into the variables they are copied to,
+    then replace the reads of copies with their sources.
+    Returns the number of instructions that were removed or rewritten.
+    """
+
+    changed = coalesceTemps(function)
+
+    graph = function["cfg"]
+    propagation = CopyPropagation(graph)
+
+    for block in graph.order:
+        # Phis read their operands at the end of their predecessors
+        for phi in phis(block):
+            for operand in phi[3]:
+                out = propagation.outs.get(graph.labels[operand[0]], {})
+                if operand[1] in out:
+                    operand[1] = out[operand[1]]
+                    changed += 1
+
+        copies = propagation.entry(block)
+        instructions = []
+
+        for ins in block.instructions:
+            before = list(ins)
+            CopyPropagation.transfer(ins, copies)
+            if ins != before:
+                changed += 1
+
+            # Copies of a name to itself are dropped
+            copy = copyOf(ins)
+            if copy is not None and copy[0] == copy[1]:
+                changed += 1
+                continue
+
+            instructions.append(ins)
+
+        block.instructions[:] = instructions
+
+    return changed
@@ -0,0 +1,172 @@
+"""
+Liveness analysis and dead code elimination.
+
+A temp or variable is live at a point of a function if some path from that
+point reads it before assigning it again. Assignments to names that are not
+live afterwards are dead and removed, except for calls, which are kept for
+their side effects. A phi reads its operands at the end of the predecessor
+they come from, so they are live out of that predecessor only.
+"""
+
+from src.ir.instructions import Opcode, opcodeOf, destOf, usesOf, constantPattern
+from src.ir.ssa import phis
+
+
+def namesRead(ins):
+    """Return the temps and variables read by an instruction, without constants."""
+
+    return [name for name in usesOf(ins) if not constantPattern.match(name)]
+
+
+class Liveness:
+    """The names live at the end of every reachable block of a function."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.ins = {}
+        self.outs = {}
+
+        self.solve()
+
+    def liveOut(self, block):
+        """Return the names live at the end of a block."""
+
+        live = set()
+        for successor in block.successors:
+            live |= self.ins.get(successor, set())
+
+            for phi in phis(successor):
+                for label, value in phi[3]:
+                    if label == block.label and not constantPattern.match(value):
+                        live.add(value)
+
+        return live
+
+    @staticmethod
+    def liveIn(block, live):
+        """Return the names live at the start of a block, given those live at its end."""
+
+        live = set(live)
+        for ins in reversed(block.instructions):
+            dest = destOf(ins)
+            if dest is not None:
+                live.discard(dest)
+
+            if opcodeOf(ins) != Opcode.PHI:
+                live.update(namesRead(ins))
+
+        return live
+
+    def solve(self):
+        """Visit the blocks in postorder until the live names stop changing."""
+
+        postorder = list(reversed(self.graph.order))
+
+        changed = True
+        while changed:
+            changed = False
+
+            for block in postorder:
+                out = self.liveOut(block)
+                self.outs[block] = out
+
+                live = self.liveIn(block, out)
+                if self.ins.get(block) != live:
+                    self.ins[block] = live
+                    changed = True
+
+
+def removeDeadAssignments(block, live):
+    """
+    Remove the assignments of a block whose value is never read,
+    given the names live at its end. Returns the number removed.
+    """
+
+    live = set(live)
+    kept = []
+
+    for ins in reversed(block.instructions):
+        op = opcodeOf(ins)
+        dest = destOf(ins)
+
+        if dest is not None and dest not in live and op != Opcode.CALL:
+            continue
+
+        if dest is not None:
+            live.discard(dest)
+        if op != Opcode.PHI:
+            live.update(namesRead(ins))
+
+        kept.append(ins)
+
+    removed = len(block.instructions) - len(kept)
+    kept.reverse()
+    block.instructions[:] = kept
+
+    return removed
+
+
+def usefulNames(graph):
+    """
+    Return the names whose value can reach a return, a jump or a call.
+    Assignments to other names are dead wherever they are, even when they
+    read each other in a cycle, like a counter that is never read.
+    """
+
+    assignments = {}
+    useful = set()
+
+    for block in graph.blocks:
+        for ins in block.instructions:
+            dest = destOf(ins)
+            if dest is not None and opcodeOf(ins) != Opcode.CALL:
+                assignments.setdefault(dest, []).append(ins)
+            else:
+                useful.update(namesRead(ins))
+
+    worklist = list(useful)
+    while worklist:
+        for ins in assignments.pop(worklist.pop(), ()):
+            for name in namesRead(ins):
+                if name not in useful:
+                    useful.add(name)
+                    worklist.append(name)
+
+    return useful
+
+
+def eliminateDeadCode(function):
+    """
+    Remove the dead assignments of a function.
+    Assignments to names that are never needed are removed first, then
+    the assignments whose value is overwritten before it is read.
+    Removing an assignment can make the assignments it reads dead too,
+    so liveness is computed again until nothing else is removed.
+    Returns the number of instructions removed.
+    """
+
+    graph = function["cfg"]
+    total = 0
+
+    useful = usefulNames(graph)
+    for block in graph.blocks:
+        kept = [
+            ins
+            for ins in block.instructions
+            if destOf(ins) is None
+            or destOf(ins) in useful
+            or opcodeOf(ins) == Opcode.CALL
+        ]
+        total += len(block.instructions) - len(kept)
+        block.instructions[:] = kept
+
+    while True:
+        liveness = Liveness(graph)
+
+        removed = 0
+        for block in graph.order:
+            removed += removeDeadAssignments(block, liveness.outs[block])
+
+        total += removed
+        if not removed:
+            return total
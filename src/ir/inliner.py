@@ -0,0 +1,269 @@
+"""
+Function inlining.
+
+The call graph of the program decides the order: functions are visited
+after the functions they call, so a callee has already had its own calls
+inlined when it is inlined. Functions that can call themselves, directly or
+through others, are never inlined.
+
+A call is inlined when its cost, the instructions of the callee minus the
+overhead of the call it removes, is within the threshold of the -O level,
+and the growth of the program stays within its budget. The body of the
+callee is copied between the instructions before and after the call, with
+its temps, variables and labels renamed so they cannot clash with the
+caller, its arguments assigned to its parameters, and every return replaced
+by an assignment of the result and a jump past the body.
+"""
+
+import copy
+
+from src.util import current
+from src.ir.cfg import BasicBlock, ControlFlowGraph, instructionCount, jumpTargets
+from src.ir.instructions import (
+    Opcode,
+    Tagged,
+    opcodeOf,
+    destOf,
+    replaceDest,
+    replaceUses,
+    constantPattern,
+    tempPattern,
+)
+from src.ir.ssa import phis
+
+# The instructions a call costs besides the body of the callee: the call,
+# saving the result, and the prologue and epilogue of the callee's frame
+callOverhead = 8
+
+# The growth in instructions a single call may add when it is inlined,
+# and the growth of the whole program as a share of its size, by -O level
+thresholds = {1: 0, 2: 16, 3: 64}
+budgets = {1: 0, 2: 0.5, 3: 2}
+
+
+def callGraph(ir):
+    """Map every function of an IR dict to the functions of the IR it calls."""
+
+    return {
+        name: {
+            ins[3]
+            for block in function["blocks"]
+            for ins in block.instructions
+            if opcodeOf(ins) == Opcode.CALL and ins[3] in ir
+        }
+        for name, function in ir.items()
+    }
+
+
+def recursiveFunctions(graph):
+    """Return the functions of a call graph that can call themselves."""
+
+    recursive = set()
+    for name in graph:
+        seen = set()
+        stack = list(graph[name])
+
+        while stack:
+            callee = stack.pop()
+            if callee == name:
+                recursive.add(name)
+                break
+            if callee not in seen:
+                seen.add(callee)
+                stack.extend(graph[callee])
+
+    return recursive
+
+
+def bottomUp(graph):
+    """Return the functions of a call graph, each after the functions it calls."""
+
+    order = []
+    visited = set()
+
+    for root in graph:
+        if root in visited:
+            continue
+
+        visited.add(root)
+        stack = [(root, iter(graph[root]))]
+        while stack:
+            name, callees = stack[-1]
+            for callee in callees:
+                if callee not in visited:
+                    visited.add(callee)
+                    stack.append((callee, iter(graph[callee])))
+                    break
+            else:
+                stack.pop()
+                order.append(name)
+
+    return order
+
+
+def cost(callee, call):
+    """
+    Estimate the instructions inlining a call adds to the program.
+    Constant arguments count as savings, since folding them shrinks the body.
+    """
+
+    arguments = call[4]
+    constants = sum(1 for argument in arguments if constantPattern.match(argument))
+
+    return instructionCount(callee) - callOverhead - len(arguments) - constants
+
+
+def inlineCall(caller, block, index, callee, name):
+    """
+    Replace the call at a position of a block of the caller with the body
+    of the callee. Returns the number of instructions added in its place.
+    """
+
+    unique = current().unique
+    call = block.instructions[index]
+    dest, arguments = call[1], call[4]
+
+    names = {}
+
+    def rename(value):
+        if constantPattern.match(value):
+            return value
+        if value not in names:
+            if tempPattern.match(value):
+                names[value] = unique.new()
+            else:
+                names[value] = unique.new(f"{name}.{value}.")
+        return names[value]
+
+    labels = {}
+
+    def relabel(label):
+        if label not in labels:
+            labels[label] = unique.new("_I")
+        return labels[label]
+
+    successors = list(block.successors)
+
+    # The instructions after the call continue in a block of their own
+    after = BasicBlock(block.instructions[index + 1 :], unique.new("_I"))
+    del block.instructions[index:]
+
+    for parameter, argument in zip(callee["arguments"], arguments):
+        block.instructions.append(Tagged([rename(parameter), "=", argument]))
+
+    body = []
+    for source in callee["blocks"]:
+        instructions = []
+
+        for ins in copy.deepcopy(source.instructions):
+            op = opcodeOf(ins)
+
+            if op in (Opcode.LABEL, Opcode.GOTO):
+                ins[1] = relabel(ins[1])
+            elif op == Opcode.BRANCH:
+                ins[3], ins[6] = relabel(ins[3]), relabel(ins[6])
+            elif op == Opcode.PHI:
+                for operand in ins[3]:
+                    operand[0] = relabel(operand[0])
+
+            if op != Opcode.LABEL:
+                replaceUses(ins, rename)
+            if destOf(ins) is not None:
+                replaceDest(ins, rename(destOf(ins)))
+
+            # Returns assign the result and leave the body
+            if op == Opcode.RETURN:
+                instructions.append(Tagged([dest, "=", ins[1]]))
+                instructions.append(Tagged(["goto", after.label]))
+                break
+
+            instructions.append(ins)
+
+        inlined = BasicBlock(instructions)
+        if instructions and opcodeOf(instructions[0]) == Opcode.LABEL:
+            inlined.label = instructions[0][1]
+        else:
+            inlined.label = unique.new("_I")
+            instructions.insert(0, Tagged(["label", inlined.label]))
+        body.append(inlined)
+
+    # Falling off the end of the callee returns 0
+    if not body:
+        block.instructions.append(Tagged([dest, "=", "0"]))
+    elif jumpTargets(body[-1])[1]:
+        body[-1].instructions.append(Tagged([dest, "=", "0"]))
+
+    position = caller["blocks"].index(block) + 1
+    caller["blocks"][position:position] = body + [after]
+
+    # The successors of the block are now entered from the block after the body
+    for successor in successors:
+        for phi in phis(successor):
+            for operand in phi[3]:
+                if operand[0] == block.label:
+                    operand[0] = after.label
+
+    caller["declarations"] = (
+        (caller["declarations"] or 0)
+        + (callee["declarations"] or 0)
+        + len(callee["arguments"])
+    )
+
+    return sum(
+        1
+        for inlined in body
+        for ins in inlined.instructions
+        if opcodeOf(ins) != Opcode.LABEL
+    ) + len(arguments)
+
+
+def inlineCalls(ir, level):
+    """
+    Inline the calls of every function of an IR dict that the cost model
+    of an optimization level accepts. Returns the number of instructions
+    added in place of the calls.
+    """
+
+    graph = callGraph(ir)
+    recursive = recursiveFunctions(graph)
+
+    level = min(level, max(thresholds))
+    threshold = thresholds[level]
+    budget = budgets[level] * sum(instructionCount(f) for f in ir.values())
+
+    inlined = 0
+    for name in bottomUp(graph):
+        function = ir[name]
+
+        changed = True
+        while changed:
+            changed = False
+
+            for block in function["blocks"]:
+                for index, ins in enumerate(block.instructions):
+                    if opcodeOf(ins) != Opcode.CALL:
+                        continue
+
+                    callee = ir.get(ins[3])
+                    if (
+                        callee is None
+                        or ins[3] in recursive
+                        or len(ins[4]) != len(callee["arguments"])
+                    ):
+                        continue
+
+                    growth = cost(callee, ins)
+                    if growth > threshold or growth > budget:
+                        continue
+
+                    inlined += inlineCall(function, block, index, callee, ins[3])
+                    function["cfg"] = ControlFlowGraph(function["blocks"])
+
+                    budget -= max(growth, 0)
+                    changed = True
+                    break
+
+                if changed:
+                    break
+
+    return inlined
@@ -0,0 +1,446 @@
+"""
+Typed instructions of the intermediate representation.
+
+The IR is generated as lists of strings, i.e. ["r3", "=", "a", "+", "b"].
+fromList converts such a list into a slotted instruction object with an
+integer opcode and tagged operands, and toList converts it back, so IR
+files written with -o and read with -i keep the list form.
+Passes that rewrite the IR use usesOf, destOf, replaceUses and replaceDest
+to change the operands of the list form in place.
+
+The compiler builds its instructions as Tagged lists, which store their
+opcode when they are built, so opcodeOf does not work it out again from the
+shape of the list. Untagged lists, i.e. written by hand, still work.
+
+Lists of an unknown shape raise a CompilerMessage instead of being passed
+through, so a malformed IR file fails when it is read and not later as
+wrong assembly.
+"""
+
+import abc
+import enum
+import re
+from typing import NamedTuple
+from src.util import CompilerMessage
+
+
+class Opcode(enum.IntEnum):
+    """The kind of an instruction."""
+
+    LABEL = 0
+    GOTO = 1
+    BRANCH = 2
+    RETURN = 3
+    CALL = 4
+    COPY = 5
+    UNARY = 6
+    BINARY = 7
+    PHI = 8
+
+
+class Kind(enum.IntEnum):
+    """The kind of an operand."""
+
+    TEMP = 0
+    VARIABLE = 1
+    CONSTANT = 2
+    LABEL = 3
+    FUNCTION = 4
+
+
+class Operand(NamedTuple):
+    """An operand of an instruction, tagged with its kind."""
+
+    kind: Kind
+    value: str
+
+    def __str__(self):
+        return self.value
+
+
+constantPattern = re.compile(r"^-?[0-9]+$")
+tempPattern = re.compile(r"^r[0-9]+$")
+
+
+def operand(value):
+    """Tag a value as a constant, a temp or a variable."""
+
+    if constantPattern.match(value):
+        return Operand(Kind.CONSTANT, value)
+    if tempPattern.match(value):
+        return Operand(Kind.TEMP, value)
+
+    return Operand(Kind.VARIABLE, value)
+
+
+def label(value):
+    """Tag a value as a label."""
+
+    return Operand(Kind.LABEL, value)
+
+
+class Instruction(abc.ABC):
+    """Base class for IR instructions."""
+
+    __slots__ = ()
+
+    opcode = None
+
+    # The operand written by the instruction, if any
+    dest = None
+
+    def uses(self):
+        """Return the value operands read by the instruction."""
+
+        return ()
+
+    @abc.abstractmethod
+    def toList(self):
+        """Convert the instruction to its list form."""
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        return repr(self.toList())
+
+
+class Label(Instruction):
+    """The start of a basic block: label NAME."""
+
+    __slots__ = ("name",)
+
+    opcode = Opcode.LABEL
+
+    def __init__(self, name):
+        self.name = name
+
+    def toList(self):
+        return ["label", self.name.value]
+
+
+class Goto(Instruction):
+    """An unconditional jump: goto TARGET."""
+
+    __slots__ = ("target",)
+
+    opcode = Opcode.GOTO
+
+    def __init__(self, target):
+        self.target = target
+
+    def toList(self):
+        return ["goto", self.target.value]
+
+
+class Branch(Instruction):
+    """A conditional jump: if CONDITION GOTO TARGET else GOTO OTHERWISE."""
+
+    __slots__ = ("condition", "target", "otherwise")
+
+    opcode = Opcode.BRANCH
+
+    def __init__(self, condition, target, otherwise):
+        self.condition = condition
+        self.target = target
+        self.otherwise = otherwise
+
+    def uses(self):
+        return (self.condition,)
+
+    def toList(self):
+        return [
+            "if",
+            self.condition.value,
+            "GOTO",
+            self.target.value,
+            "else",
+            "GOTO",
+            self.otherwise.value,
+        ]
+
+
+class Return(Instruction):
+    """Return from the function: ret VALUE."""
+
+    __slots__ = ("value",)
+
+    opcode = Opcode.RETURN
+
+    def __init__(self, value):
+        self.value = value
+
+    def uses(self):
+        return (self.value,)
+
+    def toList(self):
+        return ["ret", self.value.value]
+
+
+class Call(Instruction):
+    """A function call: call DEST = FUNCTION [ARGUMENTS]."""
+
+    __slots__ = ("dest", "function", "arguments")
+
+    opcode = Opcode.CALL
+
+    def __init__(self, dest, function, arguments):
+        self.dest = dest
+        self.function = function
+        self.arguments = tuple(arguments)
+
+    def uses(self):
+        return self.arguments
+
+    def toList(self):
+        return [
+            "call",
+            self.dest.value,
+            "=",
+            self.function.value,
+            [argument.value for argument in self.arguments],
+        ]
+
+
+class Copy(Instruction):
+    """A plain assignment: DEST = SOURCE."""
+
+    __slots__ = ("dest", "source")
+
+    opcode = Opcode.COPY
+
+    def __init__(self, dest, source):
+        self.dest = dest
+        self.source = source
+
+    def uses(self):
+        return (self.source,)
+
+    def toList(self):
+        return [self.dest.value, "=", self.source.value]
+
+
+class Unary(Instruction):
+    """A unary operation: DEST = OPERATOR OPERAND, where OPERATOR is ! or ~."""
+
+    __slots__ = ("dest", "operator", "operand")
+
+    opcode = Opcode.UNARY
+
+    def __init__(self, dest, operator, operand):
+        self.dest = dest
+        self.operator = operator
+        self.operand = operand
+
+    def uses(self):
+        return (self.operand,)
+
+    def toList(self):
+        return [self.dest.value, "=", self.operator, self.operand.value]
+
+
+class Binary(Instruction):
+    """A binary operation: DEST = LHS OPERATOR RHS."""
+
+    __slots__ = ("dest", "operator", "lhs", "rhs")
+
+    opcode = Opcode.BINARY
+
+    def __init__(self, dest, operator, lhs, rhs):
+        self.dest = dest
+        self.operator = operator
+        self.lhs = lhs
+        self.rhs = rhs
+
+    def uses(self):
+        return (self.lhs, self.rhs)
+
+    def toList(self):
+        return [self.dest.value, "=", self.lhs.value, self.operator, self.rhs.value]
+
+
+class Phi(Instruction):
+    """
+    Merge the values of a variable at the start of a block in SSA form:
+    phi DEST = [[PREDECESSOR, VALUE], ...].
+    """
+
+    __slots__ = ("dest", "operands")
+
+    opcode = Opcode.PHI
+
+    def __init__(self, dest, operands):
+        self.dest = dest
+        self.operands = tuple(operands)
+
+    def uses(self):
+        return tuple(value for _, value in self.operands)
+
+    def toList(self):
+        return [
+            "phi",
+            self.dest.value,
+            "=",
+            [[block.value, value.value] for block, value in self.operands],
+        ]
+
+
+def shapeOf(ins):
+    """Work out the opcode of an instruction in list form from its shape."""
+
+    # Assignments are checked first, so variables named like keywords work
+    if len(ins) > 1 and ins[1] == "=":
+        if len(ins) == 3:
+            return Opcode.COPY
+        if len(ins) == 4:
+            return Opcode.UNARY
+        if len(ins) == 5:
+            return Opcode.BINARY
+
+    op = ins[0]
+
+    if op == "label" and len(ins) == 2:
+        return Opcode.LABEL
+    if op == "goto" and len(ins) == 2:
+        return Opcode.GOTO
+    if op == "ret" and len(ins) == 2:
+        return Opcode.RETURN
+    if op == "if" and len(ins) == 7:
+        return Opcode.BRANCH
+    if op == "call" and len(ins) == 5:
+        return Opcode.CALL
+    if op == "phi" and len(ins) == 4:
+        return Opcode.PHI
+
+    raise CompilerMessage(f"Unknown IR instruction: {ins}")
+
+
+class Tagged(list):
+    """
+    An instruction in list form that stores its opcode when it is built.
+    Changing its operands keeps its shape, while rewrite changes both.
+    """
+
+    __slots__ = ("opcode",)
+
+    def __init__(self, parts, opcode=None):
+        super().__init__(parts)
+        self.opcode = shapeOf(self) if opcode is None else opcode
+
+
+def opcodeOf(ins):
+    """Return the opcode of an instruction in list form, without converting it."""
+
+    if ins.__class__ is Tagged:
+        return ins.opcode
+
+    return shapeOf(ins)
+
+
+def rewrite(ins, parts):
+    """Replace an instruction in list form in place, which may change its opcode."""
+
+    ins[:] = parts
+    if ins.__class__ is Tagged:
+        ins.opcode = shapeOf(ins)
+
+
+# Build a typed instruction from the list form, by opcode
+builders = {
+    Opcode.LABEL: lambda ins: Label(label(ins[1])),
+    Opcode.GOTO: lambda ins: Goto(label(ins[1])),
+    Opcode.BRANCH: lambda ins: Branch(operand(ins[1]), label(ins[3]), label(ins[6])),
+    Opcode.RETURN: lambda ins: Return(operand(ins[1])),
+    Opcode.CALL: lambda ins: Call(
+        operand(ins[1]),
+        Operand(Kind.FUNCTION, ins[3]),
+        [operand(argument) for argument in ins[4]],
+    ),
+    Opcode.COPY: lambda ins: Copy(operand(ins[0]), operand(ins[2])),
+    Opcode.UNARY: lambda ins: Unary(operand(ins[0]), ins[2], operand(ins[3])),
+    Opcode.BINARY: lambda ins: Binary(
+        operand(ins[0]), ins[3], operand(ins[2]), operand(ins[4])
+    ),
+    Opcode.PHI: lambda ins: Phi(
+        operand(ins[1]), [(label(block), operand(value)) for block, value in ins[3]]
+    ),
+}
+
+# Positions of the operands read and written by instructions in list form.
+# The arguments of calls and the values of phis are lists of their own.
+usePositions = {
+    Opcode.BRANCH: (1,),
+    Opcode.RETURN: (1,),
+    Opcode.COPY: (2,),
+    Opcode.UNARY: (3,),
+    Opcode.BINARY: (2, 4),
+}
+destPositions = {
+    Opcode.CALL: 1,
+    Opcode.COPY: 0,
+    Opcode.UNARY: 0,
+    Opcode.BINARY: 0,
+    Opcode.PHI: 1,
+}
+
+
+def fromList(ins):
+    """
+    Convert an instruction in list form to a typed instruction.
+    Raises a CompilerMessage if the list is not a known instruction.
+    """
+
+    return builders[opcodeOf(ins)](ins)
+
+
+def toList(instruction):
+    """Convert a typed instruction to its list form, tagged with its opcode."""
+
+    return Tagged(instruction.toList(), instruction.opcode)
+
+
+def usesOf(ins):
+    """Return the values read by an instruction in list form."""
+
+    op = opcodeOf(ins)
+
+    if op == Opcode.CALL:
+        return list(ins[4])
+    if op == Opcode.PHI:
+        return [value for _, value in ins[3]]
+
+    return [ins[position] for position in usePositions.get(op, ())]
+
+
+def destOf(ins):
+    """Return the value written by an instruction in list form, or None."""
+
+    position = destPositions.get(opcodeOf(ins))
+
+    return None if position is None else ins[position]
+
+
+def replaceUses(ins, rename):
+    """Replace every value read by an instruction in list form with rename(value)."""
+
+    op = opcodeOf(ins)
+
+    if op == Opcode.CALL:
+        ins[4] = [rename(value) for value in ins[4]]
+    elif op == Opcode.PHI:
+        for operand in ins[3]:
+            operand[1] = rename(operand[1])
+    else:
+        for position in usePositions.get(op, ()):
+            ins[position] = rename(ins[position])
+
+
+def replaceDest(ins, name):
+    """Replace the value written by an instruction in list form."""
+
+    ins[destPositions[opcodeOf(ins)]] = name
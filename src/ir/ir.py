@@ -4,12 +4,19 @@ Intermediate Representations of the Parse Tree.
 """
 
 import json
-from src.util import unique, writeFile, readFile
+from src.util import current, writeFile, readFile, CompilerMessage
 import src.parser.grammar as grammar
+from src.parser.visitor import Visitor, FusedVisitor, enter, leave
+from src.symbolTable.symbolTable import SymbolTable, SymbolTableBuilder
+from src.ir.cfg import BasicBlock, ControlFlowGraph, buildGraphs
+from src.ir.instructions import Tagged
 
 
 def readJson(filename):
-    """Read in JSON file"""
+    """
+    Read in JSON file. Blocks start at the labels listed with their function,
+    so goto labels stay in the block they were declared in.
+    """
 
     # Read the data into a string and parse the string as JSON
     data = readFile(filename)
@@ -29,245 +36,332 @@ def readJson(filename):
             ir.ir[name]["arguments"] = entry[1]
             ir.ir[name]["declarations"] = entry[2]
             currentFunction = ir.ir[name]
-        elif command == "label":
+
+            # The labels that start blocks, files without them start one at every label
+            starts = set(entry[3]) if len(entry) > 3 else None
+        elif command == "label" and (starts is None or entry[1] in starts):
             currentBlock = BasicBlock([], entry[1])
             currentFunction["blocks"].append(currentBlock)
         else:
-            currentBlock.instructions.append(entry)
+            currentBlock.instructions.append(Tagged(entry))
+
+    buildGraphs(ir.ir)
 
     return ir
 
 
-class BasicBlock:
-    """Defines a set of instructions and data that compose a Basic Block."""
+def generateFused(parseTree, externals=None, context=None):
+    """
+    Build the symbol table and the IR in a single traversal of the parse tree.
+    externals maps the functions defined in other files to their arity.
+    Returns the symbol table and the IR.
+    """
 
-    def __init__(self, instructions, label=None):
-        self.instructions = instructions
-        self.label = label
-        self.instructions.insert(0, ["label", label])
+    st = SymbolTable()
+    for name, arity in (externals or {}).items():
+        st.declareExternal(name, arity)
+    ir = IR(parseTree, st, context)
 
-    def print(self):
-        """Print this basic block."""
+    with ir.context.activate():
+        fixups = SemanticFixups(st, parseTree)
+        FusedVisitor(fixups, SymbolTableBuilder(st), ir).visit(parseTree)
+
+    return st, ir
+
+
+class SemanticFixups(Visitor):
+    """
+    Work that the separate passes do in a full tree walk of their own,
+    done per node when building the symbol table and the IR together.
+    """
+
+    def __init__(self, st, program):
+        self.st = st
+
+        # The parser indexes the goto statements of every function
+        self.program = program
+
+        # Values compared by the switch statements we are inside of
+        self.switches = []
+
+    @enter(grammar.SwitchStatement)
+    def enterSwitch(self, _):
+        self.switches.append(None)
+
+    @leave(grammar.Node)
+    def leaveNode(self, node):
+        node.prepare()
+
+    @leave(grammar.FunctionDeclaration)
+    def leaveFunction(self, node):
+        node.prepare()
+
+        # Labels can be declared after they are used,
+        # so they are only resolved at the end of the function
+        for goto in self.program.find(grammar.GotoStatement, node.name):
+            label = goto.children[0].value
+            if self.st.current.labels.get(label) is not True:
+                raise CompilerMessage(f"The label {label} was used but never declared.")
+
+    @leave(grammar.SwitchCondition)
+    def leaveSwitchCondition(self, node):
+        node.prepare()
+        self.switches[-1] = node.value
+
+    # The separate prepare pass sets the operator of each case
+    # when preparing the switch, but cases are left before their switch
+    @leave(grammar.SwitchCase)
+    def leaveSwitchCase(self, node):
+        node.prepare()
+        node.operator = self.switches[-1]
+
+    @leave(grammar.SwitchStatement)
+    def leaveSwitch(self, node):
+        node.prepare()
+        self.switches.pop()
 
-        for i in self.instructions:
-            print(i)
-        print()
 
+class Backpatch:
+    """
+    The jumps of an open if, while or switch statement whose
+    target labels are not known until the blocks they jump to are built.
+    """
 
-class IR:
+    __slots__ = ("start", "bodies", "exits", "skips", "breaks", "continues")
+
+    def __init__(self):
+        # The label of the condition of a while statement
+        self.start = None
+
+        # Conditional jumps taken when a condition is true or false
+        self.bodies = []
+        self.exits = []
+
+        # Jumps from the end of an if body over its else body
+        self.skips = []
+        self.breaks = []
+        self.continues = []
+
+
+def patch(jumps, label, slot=-1):
+    """Set the target label of a list of jump instructions and empty the list."""
+
+    for jump in jumps:
+        jump[slot] = label
+
+    jumps.clear()
+
+
+class IR(Visitor):
     """Intermediate Representation class to hold IR data."""
 
-    def __init__(self, parseTree, symbolTable):
+    def __init__(self, parseTree, symbolTable, context=None):
         self.parseTree = parseTree
         self.symbolTable = symbolTable
+        self.context = context if context is not None else current()
         self.stack = []
         self.ir = {}
         self.current = None
 
+        # Backpatch lists of the open if, while and switch statements
+        self.patches = []
+
+        # Backpatch lists and target slots of the jumps to the next block
+        self.nextBlock = []
+
+        # The statements that break and continue jump out of, innermost last
+        self.breakTargets = []
+        self.continueTargets = []
+
     def generate(self):
         """Generate the IR from the parse tree."""
 
-        self.parseTree.visit()
-        self.visit(self.parseTree)
+        # Nodes create their temps through the current context
+        with self.context.activate():
+            self.parseTree.visit()
+            self.visit(self.parseTree)
 
         return self.ir
 
     def closeBlock(self, force=False):
-        """Save the stack as a block and start a new block."""
+        """
+        Save the stack as a block and start a new block.
+        Return the label of the new block, if one was saved.
+        """
 
+        label = None
         if self.stack or force is True:
-            bb = BasicBlock(self.stack, unique.new("_L"))
-            self.ir[self.current]["blocks"].append(bb)
+            label = self.context.unique.new("_L")
+            self.ir[self.current]["blocks"].append(BasicBlock(self.stack, label))
 
-        self.stack = []
-
-    def visit(self, node):
-        """Visit a node of the parse tree and recurse."""
+            # Blocks are laid out in the order they are saved,
+            # so the jumps to the next block can now be patched
+            for jumps, slot in self.nextBlock:
+                patch(jumps, label, slot)
+            self.nextBlock = []
 
-        # Start new basic blocks when we first encounter certain nodes.
-        if isinstance(node, grammar.FunctionDeclaration):
-            # Start a new function entry
-            self.ir[node.name] = {}
-            self.ir[node.name]["blocks"] = []
-            self.ir[node.name]["declarations"] = len(
-                self.symbolTable.table[node.name]["variables"]
-            )
-            self.current = node.name
-        elif isinstance(node, grammar.IfStatement):
-            self.closeBlock()
-            node.savedLabel = unique.get("_L")
-        elif isinstance(node, grammar.ElseStatement):
-            self.closeBlock()
-        elif isinstance(node, grammar.LabelDeclaration):
-            self.closeBlock()
-        elif isinstance(node, grammar.Condition):
-            self.closeBlock()
-        elif isinstance(node, grammar.WhileStatement):
-            self.closeBlock()
-            node.savedLabel = unique.get("_L")
-        elif isinstance(node, grammar.WhileCondition):
-            self.closeBlock()
-        elif isinstance(node, grammar.SwitchCondition):
-            self.closeBlock()
-        elif isinstance(node, grammar.SwitchStatement):
-            self.closeBlock()
-            node.savedLabel = unique.get("_L")
-
-        # Slide to the left, slide to the right
-        # Recurse recurse, recurse recurse!
-        # ~ Dj Casper (Cha Cha Slide)
-        if hasattr(node, "children"):
-            for child in node.children:
-                self.visit(child)
-        elif isinstance(node, list):
-            for child in node:
-                self.visit(child)
-
-        if not isinstance(node, list):
-            # End the basic blocks we created earlier now that all
-            # the node within have been visited.
-            if isinstance(node, grammar.FunctionDeclaration):
-                self.ir[node.name]["arguments"] = node.arguments.value
-                self.closeBlock()
-
-                # Add an extra basic block to ensure if jumps work correctly
-                self.closeBlock(force=True)
-            elif isinstance(node, grammar.IfBody):
-                if node.hasElse:
-                    self.stack.append(["goto", f"_L{unique.get('_L') + 3}"])
-                self.closeBlock()
-            elif isinstance(node, grammar.IfStatement):
-                self.closeBlock()
-
-                if node.hasElse:
-                    elseLabel = f"_L{unique.get('_L')}"
-                else:
-                    elseLabel = f"_L{unique.get('_L') + 1}"
-
-                # The condition will be the block after the condition specified by savedLabel
-                # But savedLabel is not relational to the current function, whereas self.ir is
-                firstLabel = int(
-                    self.ir[self.current]["blocks"][0].instructions[0][1][2:]
-                )
-                index = node.savedLabel - firstLabel + 1
-
-                # Replace the placeholder of the if condition with the else label
-                x = self.ir[self.current]["blocks"][index].instructions
-                for index, ins in enumerate(x):
-                    if ins[0] == "REPLACEME":
-                        ins[-1] = elseLabel
-                        x[index] = ins[1:]
-
-            elif isinstance(node, grammar.Condition):
-                self.stack.append(
-                    [
-                        "REPLACEME",
-                        "if",
-                        node.value,
-                        "GOTO",
-                        f"_L{unique.get('_L') + 2}",
-                        "else",
-                        "GOTO",
-                        "UNKNOWN",
-                    ]
-                )
-                self.closeBlock()
-            elif isinstance(node, grammar.ElseStatement):
-                self.closeBlock()
-            elif isinstance(node, grammar.LabelDeclaration):
-                self.stack.insert(0, node.ir())
-                self.closeBlock()
-            elif isinstance(node, grammar.WhileStatement):
-                # Must have a goto at the end of while statements to revisit the condition
-                # The label of the condition is one after what was saved.
-                self.stack.append(["goto", f"_L{node.savedLabel + 1}"])
-                self.closeBlock()
-
-                # The condition will be the block after the condition specified by savedLabel
-                # But savedLabel is not relational to the current function, whereas self.ir is
-                firstLabel = int(
-                    self.ir[self.current]["blocks"][0].instructions[0][1][2:]
-                )
-                index = node.savedLabel - firstLabel + 1
-
-                # breakLabel is the basic block that comes after the while statement
-                breakLabel = f"_L{unique.get('_L') + 1}"
-
-                # Replace the placeholder of the while condition with break label
-                x = self.ir[self.current]["blocks"][index].instructions
-                for index, ins in enumerate(x):
-                    if ins[0] == "REPLACEME":
-                        ins[-1] = breakLabel
-                        x[index] = ins[1:]
-
-                # Replace any break statements with a goto to the breakLabel
-                for block in self.ir[self.current]["blocks"][index + 1 :]:
-                    for index, ins in enumerate(block.instructions):
-                        if ins == ["break"]:
-                            block.instructions[index] = ["goto", breakLabel]
-                        elif ins == ["continue"]:
-                            block.instructions[index] = [
-                                "goto",
-                                f"_L{node.savedLabel + 1}",
-                            ]
-
-            elif isinstance(node, grammar.WhileCondition):
-                self.stack.append(
-                    [
-                        "REPLACEME",
-                        "if",
-                        node.value,
-                        "GOTO",
-                        f"_L{unique.get('_L') + 2}",
-                        "else",
-                        "GOTO",
-                        "UNKNOWN",
-                    ]
-                )
-                self.closeBlock()
-            elif isinstance(node, grammar.SwitchCondition):
-                self.closeBlock()
-            elif isinstance(node, grammar.SwitchCase):
-                condition = unique.new()
-                self.stack.insert(0, [condition, "=", node.operator, "==", node.value])
-                self.stack.insert(
-                    1,
-                    [
-                        "if",
-                        condition,
-                        "GOTO",
-                        f"_L{unique.get('_L') + 2}",
-                        "else",
-                        "GOTO",
-                        f"_L{unique.get('_L') + 2}",
-                    ],
-                )
-                self.closeBlock()
-            elif isinstance(node, grammar.SwitchStatement):
-                self.closeBlock()
-
-                firstLabel = int(
-                    self.ir[self.current]["blocks"][0].instructions[0][1][2:]
-                )
-                index = node.savedLabel - firstLabel
-
-                breakLabel = f"_L{unique.get('_L') + 1}"
-
-                # Replace any break statements with a goto to the breakLabel
-                for block in self.ir[self.current]["blocks"][index + 1 :]:
-                    for index, ins in enumerate(block.instructions):
-                        if ins == ["break"]:
-                            block.instructions[index] = ["goto", breakLabel]
-                        elif ins == ["continue"]:
-                            block.instructions[index] = [
-                                "goto",
-                                f"_L{node.savedLabel + 1}",
-                            ]
-
-            else:
-                i = node.ir()
-                if i is not None:
-                    self.stack.append(i)
+        self.stack = []
+        return label
+
+    # Start new basic blocks when we first encounter certain nodes.
+
+    @enter(grammar.FunctionDeclaration)
+    def enterFunction(self, node):
+        # Start a new function entry
+        self.ir[node.name] = {}
+        self.ir[node.name]["blocks"] = []
+        self.current = node.name
+
+    @enter(grammar.IfStatement, grammar.WhileStatement, grammar.SwitchStatement)
+    def enterBranch(self, node):
+        self.closeBlock()
+
+        patches = Backpatch()
+        self.patches.append(patches)
+        if not isinstance(node, grammar.IfStatement):
+            self.breakTargets.append(patches)
+        if isinstance(node, grammar.WhileStatement):
+            self.continueTargets.append(patches)
+
+    @enter(
+        grammar.ElseStatement,
+        grammar.LabelDeclaration,
+        grammar.Condition,
+        grammar.WhileCondition,
+        grammar.SwitchCondition,
+    )
+    def enterBlock(self, _):
+        self.closeBlock()
+
+    # End the basic blocks we created earlier now that all
+    # the node within have been visited.
+
+    @leave(grammar.FunctionDeclaration)
+    def leaveFunction(self, node):
+        self.ir[node.name]["arguments"] = node.arguments.value
+        self.ir[node.name]["declarations"] = len(self.symbolTable.variables(node.name))
+        self.closeBlock()
+
+        # Add an extra basic block to ensure if jumps work correctly
+        self.closeBlock(force=True)
+
+        self.ir[node.name]["cfg"] = ControlFlowGraph(self.ir[node.name]["blocks"])
+
+    @leave(grammar.IfBody)
+    def leaveIfBody(self, node):
+        patches = self.patches[-1]
+
+        if node.hasElse:
+            jump = Tagged(["goto", None])
+            patches.skips.append(jump)
+            self.stack.append(jump)
+        self.closeBlock()
+
+        # A false condition jumps to the else body, which starts the next block
+        if node.hasElse:
+            self.nextBlock.append((patches.exits, -1))
+
+    @leave(grammar.IfStatement)
+    def leaveIf(self, node):
+        self.closeBlock()
+
+        # Without an else body, a false condition jumps to the code after the if
+        patches = self.patches.pop()
+        self.nextBlock.append((patches.skips if node.hasElse else patches.exits, -1))
+
+    @leave(grammar.Condition, grammar.WhileCondition)
+    def leaveCondition(self, node):
+        patches = self.patches[-1]
+
+        # Both targets are patched once the blocks they jump to are saved
+        jump = Tagged(["if", node.value, "GOTO", None, "else", "GOTO", None])
+        self.stack.append(jump)
+        patches.start = self.closeBlock()
+        patches.bodies.append(jump)
+        patches.exits.append(jump)
+
+        # A true condition jumps to the body, which starts the next block
+        self.nextBlock.append((patches.bodies, 3))
+
+    @leave(grammar.BreakStatement)
+    def leaveBreak(self, _):
+        if not self.breakTargets:
+            raise CompilerMessage("A break statement must be in a loop or a switch.")
+
+        jump = Tagged(["goto", None])
+        self.breakTargets[-1].breaks.append(jump)
+        self.stack.append(jump)
+
+    @leave(grammar.ContinueStatement)
+    def leaveContinue(self, _):
+        if not self.continueTargets:
+            raise CompilerMessage("A continue statement must be in a loop.")
+
+        jump = Tagged(["goto", None])
+        self.continueTargets[-1].continues.append(jump)
+        self.stack.append(jump)
+
+    @leave(grammar.ElseStatement, grammar.SwitchCondition)
+    def leaveBlock(self, _):
+        self.closeBlock()
+
+    @leave(grammar.LabelDeclaration)
+    def leaveLabel(self, node):
+        self.stack.insert(0, Tagged(node.ir()))
+        self.closeBlock()
+
+    @leave(grammar.WhileStatement)
+    def leaveWhile(self, _):
+        patches = self.patches.pop()
+        self.breakTargets.pop()
+        self.continueTargets.pop()
+
+        # Must have a goto at the end of while statements to revisit the condition
+        self.stack.append(Tagged(["goto", patches.start]))
+        self.closeBlock()
+
+        # Continue statements go back to the condition, while the condition
+        # and break statements leave the loop for the block that comes next
+        patch(patches.continues, patches.start)
+        self.nextBlock.append((patches.exits, -1))
+        self.nextBlock.append((patches.breaks, -1))
+
+    @leave(grammar.SwitchCase)
+    def leaveSwitchCase(self, node):
+        # The comparison ends a block of its own, so the body of the case
+        # starts a new block and the next case is only reached by a jump
+        patches = self.patches[-1]
+        body = self.stack
+        condition = self.context.unique.new()
+        jump = Tagged(["if", condition, "GOTO", None, "else", "GOTO", None])
+        comparison = Tagged([condition, "=", node.operator, "==", node.value])
+        self.stack = [comparison, jump]
+        self.closeBlock()
+
+        # The jumps of the previous case were patched with this block,
+        # so the lists only hold the jump of this case from here on
+        patches.bodies.append(jump)
+        patches.exits.append(jump)
+        self.nextBlock.append((patches.bodies, 3))
+
+        self.stack = body
+        self.closeBlock(force=True)
+
+        # A case that does not match jumps to the comparison of the next case
+        self.nextBlock.append((patches.exits, -1))
+
+    @leave(grammar.SwitchStatement)
+    def leaveSwitch(self, _):
+        self.closeBlock()
+
+        self.patches.pop()
+        self.nextBlock.append((self.breakTargets.pop().breaks, -1))
+
+    @leave(grammar.Node)
+    def leaveNode(self, node):
+        i = node.ir()
+        if i is not None:
+            self.stack.append(Tagged(i))
 
     def print(self):
         """Print the intermediate representation as a string."""
@@ -289,14 +383,16 @@ class IR:
                 [
                     f".{function}",
                     self.ir[function]["arguments"],
-                    len(self.symbolTable.table[function]["variables"]),
+                    len(self.symbolTable.variables(function)),
+                    [block.label for block in self.ir[function]["blocks"]],
                 ]
             )
             for block in self.ir[function]["blocks"]:
                 for instruction in block.instructions:
                     s.append(instruction)
 
-        writeFile(filename, json.dumps(s))
+        with self.context.activate():
+            writeFile(filename, json.dumps(s))
 
     def __str__(self):
         s = []
@@ -0,0 +1,269 @@
+"""
+Natural loops and loop-invariant code motion.
+
+An edge is a back edge when its target dominates its source. The natural
+loop of a back edge is its target, the header, together with every block
+that can reach the source without passing through the header, and the loops
+of back edges into the same header are merged. Instructions of a loop that
+compute the same value on every iteration are hoisted into the preheader of
+the loop, a block outside of it that only leads to the header, which is
+inserted when the header has none.
+"""
+
+from src.util import current
+from src.ir.cfg import BasicBlock, blockLabels, jumpTargets
+from src.ir.constants import isConstant
+from src.ir.deadCode import Liveness, namesRead
+from src.ir.instructions import Opcode, Tagged, opcodeOf, destOf
+from src.ir.ssa import DominatorTree, phis, terminator
+
+
+class Loop:
+    """A natural loop, with its header and the blocks in it."""
+
+    def __init__(self, header):
+        self.header = header
+
+        # The blocks of the loop, header included
+        self.blocks = {header}
+
+        # The blocks with a back edge to the header
+        self.latches = []
+
+    def exits(self):
+        """Return the edges that leave the loop, as (source, target) pairs."""
+
+        return [
+            (block, successor)
+            for block in self.blocks
+            for successor in block.successors
+            if successor not in self.blocks
+        ]
+
+    def __repr__(self):
+        return f"<Loop {self.header.label}: {len(self.blocks)} blocks>"
+
+
+def naturalLoops(graph, tree):
+    """Return the natural loops of a graph, inner loops before outer ones."""
+
+    loops = {}
+    for block in graph.order:
+        for successor in block.successors:
+            if not tree.dominates(successor, block):
+                continue
+
+            loop = loops.setdefault(successor, Loop(successor))
+            loop.latches.append(block)
+
+            stack = [block]
+            while stack:
+                member = stack.pop()
+                if member not in loop.blocks and member.order is not None:
+                    loop.blocks.add(member)
+                    stack.extend(member.predecessors)
+
+    return sorted(loops.values(), key=lambda loop: len(loop.blocks))
+
+
+def preheader(graph, loop):
+    """
+    Return the block hoisted instructions go to, before the header of a loop.
+    An outside predecessor that only jumps to the header is used when there is
+    one, otherwise a new block is inserted right before the header and the
+    jumps into the loop are moved to it. Returns None for a header without
+    labels, which cannot be jumped to.
+    """
+
+    header = loop.header
+    labels = blockLabels(header)
+    outside = [p for p in header.predecessors if p not in loop.blocks]
+
+    if len(outside) == 1 and outside[0].successors == [header]:
+        index = terminator(outside[0])
+        if index is None or opcodeOf(outside[0].instructions[index]) == Opcode.GOTO:
+            return outside[0]
+
+    if not labels:
+        return None
+
+    # A block of the loop that fell through to the header now jumps to it
+    index = graph.blocks.index(header)
+    if index > 0:
+        before = graph.blocks[index - 1]
+        if before in loop.blocks and jumpTargets(before)[1]:
+            before.instructions.append(Tagged(["goto", labels[0]]))
+            graph.update(before)
+
+    block = BasicBlock([], current().unique.new("_S"))
+    graph.insertBlock(index, block)
+
+    for predecessor in outside:
+        for ins in predecessor.instructions:
+            op = opcodeOf(ins)
+            if op == Opcode.GOTO and ins[1] in labels:
+                ins[1] = block.label
+            elif op == Opcode.BRANCH:
+                ins[3] = block.label if ins[3] in labels else ins[3]
+                ins[6] = block.label if ins[6] in labels else ins[6]
+        graph.update(predecessor)
+
+    # The values entering the loop are merged in the preheader
+    entering = {predecessor.label for predecessor in outside}
+    for phi in phis(header):
+        operands = [operand for operand in phi[3] if operand[0] in entering]
+        if not operands:
+            continue
+
+        if len(operands) == 1:
+            value = operands[0][1]
+        else:
+            value = current().interner.intern(f"{phi[1]}.pre")
+            block.instructions.append(Tagged(["phi", value, "=", operands]))
+
+        phi[3] = [operand for operand in phi[3] if operand[0] not in entering]
+        phi[3].append([block.label, value])
+
+    return block
+
+
+class LoopInvariantMotion:
+    """Hoist the invariant instructions of the loops of a function."""
+
+    def __init__(self, function):
+        self.graph = function["cfg"]
+        self.hoisted = 0
+
+    def analyze(self):
+        """Find the dominators, loops and live names of the graph."""
+
+        self.tree = DominatorTree(self.graph)
+        self.liveness = Liveness(self.graph)
+
+        return naturalLoops(self.graph, self.tree)
+
+    def liveOnEdge(self, name, source, target):
+        """Check if a name is read after control moves from one block to another."""
+
+        if name in self.liveness.ins.get(target, ()):
+            return True
+
+        return any(
+            operand == [source.label, name]
+            for phi in phis(target)
+            for operand in phi[3]
+        )
+
+    @staticmethod
+    def invariant(ins, assigned):
+        """
+        Check if an instruction computes the same value on every iteration
+        of a loop, given the names the loop assigns. Divisions are only
+        invariant by constants that cannot trap, since they may not have run.
+        """
+
+        op = opcodeOf(ins)
+        if op not in (Opcode.UNARY, Opcode.BINARY, Opcode.COPY):
+            return False
+
+        if op == Opcode.BINARY and ins[3] in ("/", "%"):
+            if not isConstant(ins[4]) or int(ins[4]) in (0, -1):
+                return False
+
+        return not any(name in assigned for name in namesRead(ins))
+
+    def hoistable(self, loop, block, ins, assigned):
+        """
+        Check if an invariant instruction can move to the preheader of a loop:
+        it must be the only assignment of its name in the loop, the loop must not
+        read the name before it, and the name must not be read after the loop
+        unless the instruction runs before every exit.
+        """
+
+        dest = ins[0]
+        if assigned[dest] != 1 or dest in self.liveness.ins[loop.header]:
+            return False
+
+        return all(
+            self.tree.dominates(block, source)
+            or not self.liveOnEdge(dest, source, target)
+            for source, target in loop.exits()
+        )
+
+    def candidates(self, loop):
+        """Return the (block, instruction) pairs of a loop that can be hoisted."""
+
+        assigned = {}
+        for block in loop.blocks:
+            for ins in block.instructions:
+                dest = destOf(ins)
+                if dest is not None:
+                    assigned[dest] = assigned.get(dest, 0) + 1
+
+        found = []
+        seen = set()
+        changed = True
+        while changed:
+            changed = False
+
+            for block in sorted(loop.blocks, key=lambda block: block.order):
+                for ins in block.instructions:
+                    if id(ins) in seen:
+                        continue
+
+                    if self.invariant(ins, assigned) and self.hoistable(
+                        loop, block, ins, assigned
+                    ):
+                        found.append((block, ins))
+                        seen.add(id(ins))
+                        del assigned[ins[0]]
+                        changed = True
+
+        return found
+
+    def hoist(self, loop):
+        """Move the invariant instructions of a loop to its preheader."""
+
+        found = self.candidates(loop)
+        if not found:
+            return False
+
+        block = preheader(self.graph, loop)
+        if block is None:
+            return False
+
+        moved = {id(ins) for _, ins in found}
+        for source in {source for source, _ in found}:
+            source.instructions[:] = [
+                ins for ins in source.instructions if id(ins) not in moved
+            ]
+
+        index = terminator(block)
+        if index is None:
+            index = len(block.instructions)
+        block.instructions[index:index] = [ins for _, ins in found]
+
+        self.hoisted += len(found)
+        return True
+
+    def run(self):
+        """Hoist out of inner loops first, then out of the loops around them."""
+
+        done = set()
+        while True:
+            for loop in self.analyze():
+                if loop.header not in done:
+                    done.add(loop.header)
+                    if self.hoist(loop):
+                        break
+            else:
+                return self.hoisted
+
+
+def hoistInvariants(function):
+    """
+    Hoist the loop-invariant instructions of a function out of its loops.
+    Returns the number of instructions hoisted.
+    """
+
+    return LoopInvariantMotion(function).run()
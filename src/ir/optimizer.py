@@ -0,0 +1,94 @@
+"""
+Optimization passes over the IR.
+
+A pass takes the IR of a function, rewrites its blocks in place, keeps its
+control flow graph up to date and returns how many instructions it changed.
+The passes of an optimization level run in order over every function,
+and the instruction count of the program is reported after each pass.
+Passes listed in remarks also report what they changed in each function.
+Passes listed in wholeProgram take the whole IR dict instead, and passes
+listed in tuned also take the level, which sets how far they go.
+"""
+
+from src.util import CompilerMessage, current
+from src.ir.cfg import instructionCount
+from src.ir.constants import foldConstants
+from src.ir.deadCode import eliminateDeadCode
+from src.ir.copies import propagateCopies
+from src.ir.valueNumbering import numberValues
+from src.ir.loops import hoistInvariants
+from src.ir.strength import reduceStrength
+from src.ir.inliner import inlineCalls
+from src.ir.tailCalls import eliminateTailCalls
+
+# The passes of every optimization level, in the order they run
+levels = {
+    0: [],
+    1: [
+        ("Inlining", inlineCalls),
+        ("Tail recursion elimination", eliminateTailCalls),
+        ("Constant folding", foldConstants),
+        ("Copy propagation", propagateCopies),
+        ("Dead code elimination", eliminateDeadCode),
+    ],
+    2: [
+        ("Inlining", inlineCalls),
+        ("Tail recursion elimination", eliminateTailCalls),
+        ("Constant folding", foldConstants),
+        ("Copy propagation", propagateCopies),
+        ("Value numbering", numberValues),
+        ("Loop-invariant code motion", hoistInvariants),
+        ("Strength reduction", reduceStrength),
+        ("Constant folding", foldConstants),
+        ("Copy propagation", propagateCopies),
+        ("Dead code elimination", eliminateDeadCode),
+    ],
+}
+
+# Level 3 runs the passes of level 2 and inlines more aggressively
+levels[3] = levels[2]
+
+# The passes that take the whole program, since they change several functions
+wholeProgram = {inlineCalls, eliminateTailCalls}
+
+# The passes whose limits depend on the optimization level
+tuned = {inlineCalls}
+
+# The passes that report how many instructions they changed in every function
+remarks = {numberValues, hoistInvariants, reduceStrength}
+
+
+def optimize(ir, level):
+    """Run the passes of an optimization level over every function of an IR dict."""
+
+    passes = levels[min(level, max(levels))]
+
+    for name, run in passes:
+        before = sum(instructionCount(function) for function in ir.values())
+        if run in tuned:
+            changed = run(ir, level)
+        elif run in wholeProgram:
+            changed = run(ir)
+        else:
+            changed = 0
+            for functionName, function in ir.items():
+                count = run(function)
+                changed += count
+
+                if run in remarks and count:
+                    current().messages.add(
+                        CompilerMessage(
+                            f"{name} changed {count} instructions in {functionName}.",
+                            "success",
+                        )
+                    )
+
+        after = sum(instructionCount(function) for function in ir.values())
+
+        current().messages.add(
+            CompilerMessage(
+                f"{name} changed {changed} instructions and removed "
+                f"{before - after}, {before} -> {after} instructions.",
+                "success",
+            )
+        )
@@ -0,0 +1,423 @@
+"""
+Static single assignment form of the IR.
+
+constructSsa places phi instructions at the dominance frontiers of the
+blocks that assign a variable, then renames every assignment to a new
+version of the variable, i.e. i.1, i.2. Version 0 is the variable itself,
+so arguments and variables read before they are assigned keep their names.
+Dots cannot appear in C identifiers, so versions never clash with variables.
+
+destructSsa replaces the phi instructions with parallel copies at the end
+of the predecessors of their block, so the assembler never sees a phi.
+"""
+
+from src.util import CompilerMessage, current
+from src.ir.cfg import BasicBlock, blockLabels
+from src.ir.instructions import (
+    Kind,
+    Opcode,
+    Tagged,
+    opcodeOf,
+    operand,
+    destOf,
+    replaceDest,
+    replaceUses,
+    usesOf,
+)
+
+
+class DominatorTree:
+    """
+    The dominator tree and the dominance frontiers of a control flow graph,
+    computed with the iterative algorithm of Cooper, Harvey and Kennedy.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+        # Maps every reachable block to its immediate dominator,
+        # the entry block has none
+        self.idom = {}
+        self.children = {}
+        self.frontiers = {}
+
+        self.build()
+        self.buildFrontiers()
+
+    def intersect(self, first, second):
+        """Find the closest common dominator of two blocks."""
+
+        while first is not second:
+            while first.order > second.order:
+                first = self.idom[first]
+            while second.order > first.order:
+                second = self.idom[second]
+
+        return first
+
+    def build(self):
+        """Compute the immediate dominator of every reachable block."""
+
+        order = self.graph.order
+        if not order:
+            return
+
+        entry = order[0]
+        idom = {entry: entry}
+        self.idom = idom
+
+        changed = True
+        while changed:
+            changed = False
+
+            for block in order[1:]:
+                dominator = None
+                for predecessor in block.predecessors:
+                    if predecessor not in idom:
+                        continue
+                    if dominator is None:
+                        dominator = predecessor
+                    else:
+                        dominator = self.intersect(predecessor, dominator)
+
+                if idom.get(block) is not dominator:
+                    idom[block] = dominator
+                    changed = True
+
+        idom[entry] = None
+
+        self.children = {block: [] for block in order}
+        for block in order[1:]:
+            self.children[idom[block]].append(block)
+
+    def buildFrontiers(self):
+        """Compute the dominance frontier of every reachable block."""
+
+        self.frontiers = {block: [] for block in self.idom}
+
+        for block in self.idom:
+            predecessors = [p for p in block.predecessors if p in self.idom]
+            if len(predecessors) < 2:
+                continue
+
+            for predecessor in predecessors:
+                runner = predecessor
+                while runner is not self.idom[block]:
+                    if block not in self.frontiers[runner]:
+                        self.frontiers[runner].append(block)
+                    runner = self.idom[runner]
+
+    def dominates(self, first, second):
+        """Check if a block dominates another block."""
+
+        while second is not None:
+            if second is first:
+                return True
+            second = self.idom.get(second)
+
+        return False
+
+    def preorder(self):
+        """Return the reachable blocks in preorder of the dominator tree."""
+
+        if not self.idom:
+            return []
+
+        blocks = []
+        stack = [self.graph.order[0]]
+        while stack:
+            block = stack.pop()
+            blocks.append(block)
+            stack.extend(reversed(self.children[block]))
+
+        return blocks
+
+
+def phis(block):
+    """Return the phi instructions at the start of a block."""
+
+    start = len(blockLabels(block))
+    end = start
+    while (
+        end < len(block.instructions)
+        and opcodeOf(block.instructions[end]) == Opcode.PHI
+    ):
+        end += 1
+
+    return block.instructions[start:end]
+
+
+def prunePhis(graph):
+    """Remove the phi operands of edges that no longer exist."""
+
+    for block in graph.blocks:
+        labels = {predecessor.label for predecessor in block.predecessors}
+        for phi in phis(block):
+            phi[3] = [operand for operand in phi[3] if operand[0] in labels]
+
+
+def localVariables(function):
+    """Return the variables read or assigned in a function."""
+
+    names = dict.fromkeys(function["arguments"])
+
+    for block in function["blocks"]:
+        for ins in block.instructions:
+            for name in usesOf(ins) + [destOf(ins)]:
+                if name is not None and operand(name).kind == Kind.VARIABLE:
+                    names[name] = None
+
+    return list(names)
+
+
+def singleAssignment(function):
+    """
+    Check if a function is in SSA form: no name is assigned more than once
+    and its parameters, which are assigned on entry, are never assigned.
+    """
+
+    assigned = set(function["arguments"])
+    for block in function["blocks"]:
+        for ins in block.instructions:
+            dest = destOf(ins)
+            if dest is not None:
+                if dest in assigned:
+                    return False
+                assigned.add(dest)
+
+    return True
+
+
+def constructSsa(function, variables=None):
+    """
+    Convert a function of the IR to SSA form.
+    variables are the names to rename, every variable of the function by default.
+    """
+
+    graph = function["cfg"]
+    if variables is None:
+        variables = localVariables(function)
+    variables = set(variables)
+
+    # A phi in the entry block needs a predecessor for the values on entry
+    if graph.entry is not None and graph.entry.predecessors:
+        graph.insertBlock(0, BasicBlock([], current().unique.new("_S")))
+
+    tree = DominatorTree(graph)
+    insertPhis(graph, tree, variables)
+    rename(graph, tree, variables)
+
+
+def insertPhis(graph, tree, variables):
+    """
+    Place a phi for a variable at the iterated dominance frontier of the
+    blocks that assign it. Only variables read in a block other than the
+    one that assigns them get phis.
+    """
+
+    assignments = {}
+    crossing = {}
+
+    for block in graph.order:
+        assigned = set()
+        for ins in block.instructions:
+            if opcodeOf(ins) != Opcode.PHI:
+                for name in usesOf(ins):
+                    if name in variables and name not in assigned:
+                        crossing[name] = None
+
+            dest = destOf(ins)
+            if dest in variables:
+                assigned.add(dest)
+                blocks = assignments.setdefault(dest, [])
+                if not blocks or blocks[-1] is not block:
+                    blocks.append(block)
+
+    for name in crossing:
+        placed = set()
+        worklist = list(assignments.get(name, ()))
+
+        while worklist:
+            block = worklist.pop()
+            for frontier in tree.frontiers[block]:
+                if frontier in placed or frontier is graph.exit:
+                    continue
+                placed.add(frontier)
+
+                operands = [
+                    [predecessor.label, name]
+                    for predecessor in frontier.predecessors
+                    if predecessor in tree.idom
+                ]
+                position = len(blockLabels(frontier))
+                frontier.instructions.insert(
+                    position, Tagged(["phi", name, "=", operands])
+                )
+
+                worklist.append(frontier)
+
+
+def rename(graph, tree, variables):
+    """Give every assignment of a variable a new version, walking the dominator tree."""
+
+    versions = dict.fromkeys(variables, 0)
+    interner = current().interner
+
+    # The current version of every variable, innermost last
+    stacks = {name: [name] for name in variables}
+
+    def latest(name):
+        stack = stacks.get(name)
+        return name if stack is None else stack[-1]
+
+    if not tree.idom:
+        return
+
+    # The variables assigned in each block, whose versions end with the block
+    assigned = {}
+
+    stack = [(graph.order[0], True)]
+    while stack:
+        block, entering = stack.pop()
+
+        if not entering:
+            for name in assigned.pop(block):
+                stacks[name].pop()
+            continue
+
+        assigned[block] = []
+        for ins in block.instructions:
+            if opcodeOf(ins) != Opcode.PHI:
+                replaceUses(ins, latest)
+
+            dest = destOf(ins)
+            if dest in variables:
+                versions[dest] += 1
+                version = interner.intern(f"{dest}.{versions[dest]}")
+                replaceDest(ins, version)
+                stacks[dest].append(version)
+                assigned[block].append(dest)
+
+        # Phis still name their variable for the predecessors not renamed yet
+        for successor in block.successors:
+            for phi in phis(successor):
+                for operand in phi[3]:
+                    if operand[0] == block.label:
+                        operand[1] = latest(operand[1])
+
+        stack.append((block, False))
+        for child in reversed(tree.children[block]):
+            stack.append((child, True))
+
+
+def sequentialize(copies):
+    """
+    Order a list of parallel copies (dest, source) as copy instructions.
+    A copy is emitted once no other copy still reads its destination,
+    and cycles such as swaps are broken with a temporary variable.
+    """
+
+    pending = [(dest, source) for dest, source in copies if dest != source]
+    instructions = []
+
+    while pending:
+        sources = {source for _, source in pending}
+
+        for index, (dest, source) in enumerate(pending):
+            if dest not in sources:
+                instructions.append(Tagged([dest, "=", source]))
+                del pending[index]
+                break
+        else:
+            # Every destination is still read, save one of them first
+            dest = pending[0][0]
+            temporary = current().interner.intern(f"{dest}.swap")
+            instructions.append(Tagged([temporary, "=", dest]))
+            pending = [
+                (other, temporary if source == dest else source)
+                for other, source in pending
+            ]
+
+    return instructions
+
+
+def terminator(block):
+    """Return the position of the first jump or return of a block, or None."""
+
+    for index, ins in enumerate(block.instructions):
+        if opcodeOf(ins) in (Opcode.GOTO, Opcode.BRANCH, Opcode.RETURN):
+            return index
+
+    return None
+
+
+def destructSsa(function):
+    """Replace the phis of a function with copies on the edges into their block."""
+
+    graph = function["cfg"]
+
+    # The copies on every edge into a block with phis, by predecessor
+    edges = {}
+    for block in graph.blocks:
+        blockPhis = phis(block)
+        if not blockPhis:
+            continue
+
+        for phi in blockPhis:
+            block.instructions.remove(phi)
+            for label, value in phi[3]:
+                predecessor = graph.labels.get(label)
+                if predecessor not in block.predecessors:
+                    raise CompilerMessage(
+                        f"The phi of {phi[1]} reads a value from {label}, "
+                        f"which does not lead to {block.label}."
+                    )
+
+                copies = edges.setdefault(predecessor, {}).setdefault(block, [])
+                copies.append((phi[1], value))
+
+    for predecessor, successors in edges.items():
+        index = terminator(predecessor)
+
+        if index is None or opcodeOf(predecessor.instructions[index]) != Opcode.BRANCH:
+            # A single successor, the copies go before the jump
+            if index is None:
+                index = len(predecessor.instructions)
+            for successor, copies in successors.items():
+                predecessor.instructions[index:index] = sequentialize(copies)
+        else:
+            splitBranch(graph, predecessor, index, successors)
+
+
+def splitBranch(graph, block, index, successors):
+    """
+    Place copies on the edges out of a conditional jump in new blocks.
+    The assembler falls through to the next block when the condition holds,
+    so the block for the true edge always follows the jump.
+    """
+
+    branch = block.instructions[index]
+    target, otherwise = branch[3], branch[6]
+    position = graph.blocks.index(block) + 1
+
+    def edgeBlock(label):
+        copies = successors.get(graph.labels[label], [])
+        instructions = sequentialize(copies) + [Tagged(["goto", label])]
+        return BasicBlock(instructions, current().unique.new("_S"))
+
+    if target == otherwise:
+        edge = edgeBlock(target)
+        branch[3] = branch[6] = edge.label
+        graph.insertBlock(position, edge)
+        return
+
+    trueEdge = edgeBlock(target)
+    branch[3] = trueEdge.label
+    graph.insertBlock(position, trueEdge)
+
+    if graph.labels[otherwise] in successors:
+        falseEdge = edgeBlock(otherwise)
+        branch[6] = falseEdge.label
+        graph.insertBlock(position + 1, falseEdge)
+
+    graph.update(block)
@@ -0,0 +1,294 @@
+"""
+Strength reduction and induction variables.
+
+Multiplications, divisions and remainders by powers of two become shifts
+and masks. An arithmetic shift rounds the quotient of a negative number
+towards negative infinity while C truncates it towards zero, so 2^k - 1 is
+added to negative dividends before they are shifted.
+
+In loops, a basic induction variable is a name the loop only assigns by
+adding a constant to it, like i = i + 1. Multiplications of one by a
+constant, like i * 4, are replaced with a running value that starts at
+i * 4 in the preheader and has 4 added to it whenever i is stepped.
+"""
+
+from src.util import current
+from src.ir.constants import isConstant, wrap
+from src.ir.instructions import Opcode, Tagged, opcodeOf, destOf, rewrite
+from src.ir.loops import naturalLoops, preheader
+from src.ir.ssa import DominatorTree, phis, terminator
+
+
+def powerOfTwo(name):
+    """Return k if an operand is the constant 2^k, with 0 < k < 31, or None."""
+
+    if not isConstant(name):
+        return None
+
+    value = int(name)
+    if value < 2 or value >= 2**31 or value & (value - 1):
+        return None
+
+    return value.bit_length() - 1
+
+
+def reducePower(ins):
+    """
+    Return the instructions that compute a multiplication, division or
+    remainder by a power of two with shifts and masks, or None.
+    """
+
+    dest, lhs, op, rhs = ins[0], ins[2], ins[3], ins[4]
+
+    if op == "*" and powerOfTwo(lhs) is not None:
+        lhs, rhs = rhs, lhs
+
+    shift = powerOfTwo(rhs)
+    if shift is None or isConstant(lhs) or op not in ("*", "/", "%"):
+        return None
+
+    if op == "*":
+        return [Tagged([dest, "=", lhs, "<<", str(shift)])]
+
+    # Negative dividends are biased by 2^k - 1 to round towards zero
+    unique = current().unique
+    sign, bias, biased = unique.new(), unique.new(), unique.new()
+    instructions = [
+        Tagged([sign, "=", lhs, ">>", "31"]),
+        Tagged([bias, "=", sign, "&", str(2**shift - 1)]),
+        Tagged([biased, "=", lhs, "+", bias]),
+    ]
+
+    if op == "/":
+        instructions.append(Tagged([dest, "=", biased, ">>", str(shift)]))
+    else:
+        rounded = unique.new()
+        instructions.append(Tagged([rounded, "=", biased, "&", str(-(2**shift))]))
+        instructions.append(Tagged([dest, "=", lhs, "-", rounded]))
+
+    return instructions
+
+
+def reducePowers(function):
+    """
+    Replace the multiplications, divisions and remainders by powers of two
+    of a function. Returns the number of instructions replaced.
+    """
+
+    replaced = 0
+    for block in function["blocks"]:
+        instructions = []
+        for ins in block.instructions:
+            reduced = reducePower(ins) if opcodeOf(ins) == Opcode.BINARY else None
+            if reduced is None:
+                instructions.append(ins)
+            else:
+                instructions.extend(reduced)
+                replaced += 1
+
+        block.instructions[:] = instructions
+
+    return replaced
+
+
+def stepOf(ins, name):
+    """Return c if an instruction adds the constant c to a name, or None."""
+
+    if opcodeOf(ins) != Opcode.BINARY:
+        return None
+
+    lhs, op, rhs = ins[2], ins[3], ins[4]
+    if op == "+" and isConstant(lhs):
+        lhs, rhs = rhs, lhs
+
+    if lhs != name or op not in ("+", "-") or not isConstant(rhs):
+        return None
+
+    return int(rhs) if op == "+" else -int(rhs)
+
+
+def scaleOf(ins):
+    """Return the (name, constant) a multiplication by a constant reads, or None."""
+
+    if opcodeOf(ins) != Opcode.BINARY or ins[3] != "*":
+        return None
+
+    lhs, rhs = ins[2], ins[4]
+    if isConstant(lhs):
+        lhs, rhs = rhs, lhs
+
+    if isConstant(lhs) or not isConstant(rhs):
+        return None
+
+    return lhs, int(rhs)
+
+
+class Induction:
+    """
+    A basic induction variable of a loop, and the instruction that steps it.
+    In SSA form, the variable is a phi of the header and phi is set.
+    """
+
+    def __init__(self, name, update, step, phi=None):
+        self.name = name
+        self.update = update
+        self.step = step
+        self.phi = phi
+
+
+def inductionVariables(loop):
+    """Return the basic induction variables of a loop, by name."""
+
+    definitions = {}
+    for block in loop.blocks:
+        for ins in block.instructions:
+            dest = destOf(ins)
+            if dest is not None:
+                definitions.setdefault(dest, []).append(ins)
+
+    variables = {}
+    for name, assignments in definitions.items():
+        (update,) = assignments if len(assignments) == 1 else (None,)
+        if update is None:
+            continue
+
+        # A variable that is stepped in place, i = i + c
+        step = stepOf(update, name)
+        if step is not None:
+            variables[name] = Induction(name, update, step)
+
+    labels = {block.label for block in loop.blocks}
+    for phi in phis(loop.header):
+        inside = [operand for operand in phi[3] if operand[0] in labels]
+        if len(inside) != 1 or len(phi[3]) != 2:
+            continue
+
+        # Outside SSA form the loop can assign the name of the phi as well
+        if any(ins is not phi for ins in definitions[phi[1]]):
+            continue
+
+        # A phi whose value from the back edge steps it, i.1 = i.0 + c
+        assignments = definitions.get(inside[0][1], [])
+        step = stepOf(assignments[0], phi[1]) if len(assignments) == 1 else None
+        if step is not None:
+            variables[phi[1]] = Induction(phi[1], assignments[0], step, phi)
+
+    return variables
+
+
+def insertAfter(loop, ins, new):
+    """Insert an instruction right after another instruction of a loop."""
+
+    for block in loop.blocks:
+        for index, other in enumerate(block.instructions):
+            if other is ins:
+                block.instructions.insert(index + 1, new)
+                return
+
+
+def reduceInductions(graph, loop):
+    """
+    Replace the multiplications of the induction variables of a loop
+    by constants with running values. Returns the number replaced.
+    """
+
+    variables = inductionVariables(loop)
+
+    derived = [
+        ins
+        for block in loop.blocks
+        for ins in block.instructions
+        if scaleOf(ins) is not None and scaleOf(ins)[0] in variables
+    ]
+    if not derived:
+        return 0
+
+    block = preheader(graph, loop)
+    if block is None:
+        return 0
+
+    unique = current().unique
+    start = []
+
+    # The running value of every (variable, constant) pair
+    running = {}
+
+    for ins in derived:
+        name, scale = scaleOf(ins)
+        induction = variables[name]
+        step = str(wrap(induction.step * scale))
+
+        if (name, scale) not in running:
+            if induction.phi is None:
+                value = unique.new()
+                start.append(Tagged([value, "=", name, "*", str(scale)]))
+                insertAfter(
+                    loop, induction.update, Tagged([value, "=", value, "+", step])
+                )
+            else:
+                (initial,) = [
+                    operand[1]
+                    for operand in induction.phi[3]
+                    if operand[0] == block.label
+                ]
+                (latch,) = [
+                    operand[0]
+                    for operand in induction.phi[3]
+                    if operand[0] != block.label
+                ]
+
+                first, value, following = unique.new(), unique.new(), unique.new()
+                if isConstant(initial):
+                    start.append(Tagged([first, "=", str(wrap(int(initial) * scale))]))
+                else:
+                    start.append(Tagged([first, "=", initial, "*", str(scale)]))
+
+                header = loop.header.instructions
+                header.insert(
+                    header.index(induction.phi) + 1,
+                    Tagged(
+                        ["phi", value, "=", [[block.label, first], [latch, following]]]
+                    ),
+                )
+                insertAfter(
+                    loop, induction.update, Tagged([following, "=", value, "+", step])
+                )
+
+            running[(name, scale)] = value
+
+        rewrite(ins, [ins[0], "=", running[(name, scale)]])
+
+    index = terminator(block)
+    if index is None:
+        index = len(block.instructions)
+    block.instructions[index:index] = start
+
+    return len(derived)
+
+
+def reduceStrength(function):
+    """
+    Replace the multiplications of induction variables in the loops of a
+    function with running additions, then replace the multiplications,
+    divisions and remainders by powers of two with shifts and masks.
+    Returns the number of instructions replaced.
+    """
+
+    graph = function["cfg"]
+    replaced = 0
+
+    done = set()
+    changed = True
+    while changed:
+        changed = False
+
+        for loop in naturalLoops(graph, DominatorTree(graph)):
+            if loop.header not in done:
+                done.add(loop.header)
+                count = reduceInductions(graph, loop)
+                if count:
+                    replaced += count
+                    changed = True
+                    break
+
+    return replaced + reducePowers(function)
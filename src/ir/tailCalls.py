@@ -0,0 +1,153 @@
+"""
+Tail recursion elimination.
+
+A call is in tail position when the function returns its result right
+after it, so nothing of the frame of the caller is needed once the call is
+made. A function that calls itself in tail position reuses its frame: the
+call becomes a jump back to the block it started in, and the function
+becomes a loop. The arguments are copied into the parameters before the
+jump. In SSA form, where the parameters are never assigned, the block gets
+a phi for every parameter instead, which merges the values on entry with
+the arguments of the calls. Either way a new entry block is inserted
+before it, since the values on entry must come from a predecessor.
+
+Tail calls to other functions are left to the assembler, which tears the
+frame down and jumps to the callee when optimizing.
+"""
+
+from src.util import current
+from src.ir.cfg import BasicBlock, ControlFlowGraph, blockLabels
+from src.ir.instructions import Opcode, Tagged, opcodeOf, replaceUses
+from src.ir.ssa import singleAssignment, terminator
+
+
+def tailCall(block):
+    """Return the position of a call a block returns the result of, or None."""
+
+    index = terminator(block)
+    if index is None or index == 0:
+        return None
+
+    call, ins = block.instructions[index - 1], block.instructions[index]
+    if opcodeOf(ins) != Opcode.RETURN or opcodeOf(call) != Opcode.CALL:
+        return None
+    if ins[1] != call[1]:
+        return None
+
+    return index - 1
+
+
+def eliminateTailRecursion(function, name):
+    """
+    Replace the calls a function makes to itself in tail position, given
+    its name, with jumps to its first block. Returns the number replaced.
+    """
+
+    parameters = function["arguments"]
+
+    sites = []
+    for block in function["blocks"]:
+        index = tailCall(block)
+        if index is None:
+            continue
+
+        call = block.instructions[index]
+        if call[3] == name and len(call[4]) == len(parameters):
+            sites.append((block, index))
+
+    if not sites:
+        return 0
+
+    header = function["blocks"][0]
+    if not blockLabels(header):
+        return 0
+
+    # The values on entry come from a new block, since the first one is jumped to
+    predecessors = list(header.predecessors)
+    entry = BasicBlock([], current().unique.new("_S"))
+    function["blocks"].insert(0, entry)
+
+    if singleAssignment(function):
+        loopPhis(function, sites, entry, predecessors)
+    else:
+        loopCopies(function, sites)
+
+    function["cfg"] = ControlFlowGraph(function["blocks"])
+
+    return len(sites)
+
+
+def loopCopies(function, sites):
+    """
+    Replace tail calls with copies of the arguments into the parameters and
+    a jump to the block after the entry block. The arguments are copied to
+    temps first, since they can read the parameters assigned before them.
+    """
+
+    unique = current().unique
+    header = function["blocks"][1]
+
+    for block, index in sites:
+        arguments = block.instructions[index][4]
+        temps = [unique.new() for _ in arguments]
+
+        del block.instructions[index:]
+        block.instructions.extend(
+            Tagged([temp, "=", argument]) for temp, argument in zip(temps, arguments)
+        )
+        block.instructions.extend(
+            Tagged([parameter, "=", temp])
+            for parameter, temp in zip(function["arguments"], temps)
+        )
+        block.instructions.append(Tagged(["goto", blockLabels(header)[0]]))
+
+
+def loopPhis(function, sites, entry, predecessors):
+    """
+    Replace tail calls in SSA form with jumps to the block after the entry
+    block, which gets a phi for every parameter. The phis merge the values
+    from the entry block and its other predecessors with the arguments.
+    """
+
+    unique = current().unique
+    parameters = function["arguments"]
+    header = function["blocks"][1]
+
+    # Every parameter is read from a phi of the header from now on
+    names = {parameter: unique.new(f"{parameter}.tail.") for parameter in parameters}
+    for block in function["blocks"]:
+        for ins in block.instructions:
+            if opcodeOf(ins) == Opcode.PHI:
+                for operand in ins[3]:
+                    operand[1] = names.get(operand[1], operand[1])
+            else:
+                replaceUses(ins, lambda value: names.get(value, value))
+
+    operands = {parameter: [[entry.label, parameter]] for parameter in parameters}
+    for predecessor in predecessors:
+        for parameter in parameters:
+            operands[parameter].append([predecessor.label, names[parameter]])
+
+    # The arguments become the parameters and the call jumps to the header
+    for block, index in sites:
+        call = block.instructions[index]
+        for parameter, argument in zip(parameters, call[4]):
+            operands[parameter].append([block.label, argument])
+
+        del block.instructions[index:]
+        block.instructions.append(Tagged(["goto", blockLabels(header)[0]]))
+
+    position = len(blockLabels(header))
+    header.instructions[position:position] = [
+        Tagged(["phi", names[parameter], "=", operands[parameter]])
+        for parameter in parameters
+    ]
+
+
+def eliminateTailCalls(ir):
+    """
+    Eliminate the tail recursion of every function of an IR dict.
+    Returns the number of calls replaced with jumps.
+    """
+
+    return sum(eliminateTailRecursion(function, name) for name, function in ir.items())
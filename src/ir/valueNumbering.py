@@ -0,0 +1,175 @@
+"""
+Value numbering over the dominator tree.
+
+Every value computed by a function gets a number, and every expression is
+hashed by its operator and the numbers of its operands. An expression whose
+hash was already computed by an earlier instruction is replaced with a copy
+of the name that holds it.
+
+Expressions are remembered while walking down the dominator tree, so a block
+reuses what its dominators computed. Only names that are assigned once in
+the function keep their value across blocks, which is every name in SSA
+form. Names assigned several times only take part within a single block,
+which gives plain local value numbering for them.
+"""
+
+from src.ir.instructions import Opcode, opcodeOf, destOf, rewrite
+from src.ir.ssa import DominatorTree
+
+# Operators whose operands can be swapped
+commutative = {"+", "*", "&", "|", "^", "==", "!=", "&&", "||"}
+
+# Comparisons that hold with their operands swapped, i.e. a < b and b > a
+mirrored = {"<": ">", ">": "<", "<=": ">=", ">=": "<="}
+
+
+class ValueNumbering:
+    """Number the values of a function and replace redundant expressions."""
+
+    def __init__(self, function):
+        self.graph = function["cfg"]
+        self.tree = DominatorTree(self.graph)
+
+        writes = dict.fromkeys(function["arguments"], 1)
+        for block in self.graph.blocks:
+            for ins in block.instructions:
+                dest = destOf(ins)
+                if dest is not None:
+                    writes[dest] = writes.get(dest, 0) + 1
+
+        # Names assigned more than once only keep their number within a block
+        self.reassigned = {name for name, count in writes.items() if count > 1}
+
+        # The numbers of constants and of names assigned once
+        self.numbers = {}
+        self.count = 0
+
+        # Maps expressions to the (holder, number) of the name that holds them
+        self.expressions = {}
+
+        self.replaced = 0
+
+    def new(self):
+        """Return a new value number."""
+
+        self.count += 1
+        return self.count
+
+    def number(self, name, local):
+        """Return the value number of a name or constant."""
+
+        if name in local:
+            return local[name]
+
+        if name in self.reassigned:
+            local[name] = self.new()
+            return local[name]
+
+        if name not in self.numbers:
+            self.numbers[name] = self.new()
+
+        return self.numbers[name]
+
+    def key(self, ins, local):
+        """Hash an expression by its operator and the numbers of its operands."""
+
+        if opcodeOf(ins) == Opcode.UNARY:
+            return ins[2], self.number(ins[3], local)
+
+        op = ins[3]
+        lhs = self.number(ins[2], local)
+        rhs = self.number(ins[4], local)
+
+        if lhs > rhs and op in commutative:
+            lhs, rhs = rhs, lhs
+        elif lhs > rhs and op in mirrored:
+            op = mirrored[op]
+            lhs, rhs = rhs, lhs
+
+        return op, lhs, rhs
+
+    def numberBlock(self, block):
+        """
+        Replace the redundant expressions of a block.
+        Returns the expressions it added, which hold in the blocks it dominates.
+        """
+
+        # The numbers of names assigned several times, and the expressions
+        # they hold, which are only known within this block
+        local = {}
+        localExpressions = {}
+        holding = {}
+
+        added = []
+
+        for ins in block.instructions:
+            op = opcodeOf(ins)
+            dest = destOf(ins)
+
+            if dest is None:
+                continue
+
+            key = None
+            if op in (Opcode.UNARY, Opcode.BINARY):
+                key = self.key(ins, local)
+                found = localExpressions.get(key) or self.expressions.get(key)
+
+                if found is not None and found[0] != dest:
+                    rewrite(ins, [dest, "=", found[0]])
+                    self.replaced += 1
+                    value = found[1]
+                    key = None
+                else:
+                    value = self.new()
+            elif op == Opcode.COPY:
+                value = self.number(ins[2], local)
+            else:
+                value = self.new()
+
+            if dest in self.reassigned:
+                local[dest] = value
+                for stale in holding.pop(dest, ()):
+                    if localExpressions.get(stale, (None,))[0] == dest:
+                        del localExpressions[stale]
+                if key is not None:
+                    localExpressions[key] = (dest, value)
+                    holding.setdefault(dest, []).append(key)
+            else:
+                self.numbers[dest] = value
+                if key is not None and key not in self.expressions:
+                    self.expressions[key] = (dest, value)
+                    added.append(key)
+
+        return added
+
+    def run(self):
+        """Walk the dominator tree and number every reachable block."""
+
+        order = self.graph.order
+        if not order:
+            return self.replaced
+
+        stack = [(order[0], None)]
+        while stack:
+            block, added = stack.pop()
+
+            # The expressions of a block stop holding once its subtree is done
+            if added is not None:
+                for key in added:
+                    del self.expressions[key]
+                continue
+
+            stack.append((block, self.numberBlock(block)))
+            for child in reversed(self.tree.children[block]):
+                stack.append((child, None))
+
+        return self.replaced
+
+
+def numberValues(function):
+    """
+    Replace the expressions of a function that were already computed.
+    Returns the number of expressions replaced.
+    """
+
+    return ValueNumbering(function).run()
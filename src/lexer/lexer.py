@@ -7,7 +7,7 @@ import re
 import logging
 import src.lexer.tokens as tokens
 from src.lexer.tokens import Token, symbols, keywords
-from src.util import CompilerMessage
+from src.util import CompilerMessage, current
 
 debug = False
 
@@ -163,7 +163,8 @@ def tokenizeLine(line, isComment):
 
         if symbol == tokens.colon:
             if matchNumber(line[start:end]) is None:
-                lineTokens.append(Token(tokens.label, line[start:end]))
+                label = current().interner.intern(line[start:end])
+                lineTokens.append(Token(tokens.label, label))
                 start = end + 1
                 end = start
 
@@ -241,14 +242,14 @@ def tokenizeChunk(text):
     if identifier is not None:
         if debug is True:
             logging.debug("Found identifier: %s", text)
-        return Token(tokens.identifier, text)
+        return Token(tokens.identifier, current().interner.intern(text))
 
     label = matchLabel(text)
     if label is not None:
         if debug is True:
             logging.debug("Found label: %s", text)
         print(f"Found label: {text}")
-        return Token(tokens.label, text[:-1])
+        return Token(tokens.label, current().interner.intern(text[:-1]))
 
     # If it is none of the above, we do not recognize this type
     raise CompilerMessage(f"Unrecogized token: '{text}'")
@@ -4,27 +4,33 @@ Main executable for the compiler.
 
 import sys
 import getopt
+import functools
 import logging
 import os
-from src.util import readFile, ensureDirectory
+from src.util import readFile, writeFile, ensureDirectory
 
 from src.parser.lrParser import LRParser
 import src.lexer.lexer as lexer
-from src.parser.grammar import (
-    DeclarationList,
-    StatementList,
-    Arguments,
-    Parameters,
-    StatementListNew,
-    SwitchCaseList,
-    EnumList,
-    StructList,
-    VarList,
-)
-from src.ir.ir import IR, readJson
+from src.parser.grammar import recursiveNodes
+from src.parser.treeWriter import dumpTree, formats
+from src.ir.ir import IR, readJson, generateFused
+from src.ir.ssa import constructSsa, destructSsa
+from src.ir.optimizer import optimize, levels
 from src.symbolTable.symbolTable import buildSymbolTable, flattenTree
+from src.symbolTable.symbolIndex import SymbolIndex
 from src.assembler.assembler import Assembler
-from src.util import CompilerMessage, messages
+from src.util import CompilerMessage, CompilationContext, current
+
+
+def inContext(method):
+    """Run a stage of the compiler with the context of its compilation activated."""
+
+    @functools.wraps(method)
+    def run(self, *args, **kwargs):
+        with self.context.activate():
+            return method(self, *args, **kwargs)
+
+    return run
 
 
 class Compiler:
@@ -37,15 +43,23 @@ class Compiler:
         self.output = options.get("output")
         self.input = options.get("input")
         self.asmOutput = options.get("asmOutput")
+        self.jobs = options.get("jobs")
+        self.treeFormat = options.get("treeFormat")
+        self.index = options.get("index")
+        self.ssa = options.get("ssa")
+        self.optimization = options.get("optimization")
         self.tokens = []
         self.parseTree = None
         self.symbolTable = None
         self.ir = None
         self.asm = None
 
+        # Counters, names and messages are owned by this compilation
+        self.context = CompilationContext(options)
+
         # Setup default grammar if none provided
         if self.grammar is None:
-            messages.add(
+            self.context.messages.add(
                 CompilerMessage("No grammar specified, using default.", "warning")
             )
             self.grammar = "grammars/main_grammar.txt"
@@ -54,12 +68,31 @@ class Compiler:
         if self.flags is None:
             self.flags = []
 
+        # Do not optimize unless told otherwise
+        if self.optimization is None:
+            self.optimization = 0
+
+        # Parse in a single process unless told otherwise
+        if self.jobs is None:
+            self.jobs = 1
+
+        # With a tree format and no IR flag, the output file is for the parse tree
+        self.treeOutput = (
+            self.treeFormat is not None
+            and "-p" in self.flags
+            and "-r" not in self.flags
+        )
+
+        if self.treeFormat is None:
+            self.treeFormat = "text"
+
         # Warn if output flag exists but no filename specified
         if "-o" in self.flags and self.output is None:
-            messages.add(
+            self.context.messages.add(
                 CompilerMessage("No output file specified. Not dumping IR.", "warning")
             )
 
+    @inContext
     def tokenize(self):
         """Tokenize the input file."""
 
@@ -70,16 +103,19 @@ class Compiler:
         if self.tokens is None:
             raise CompilerMessage("Failed to tokenize the file.")
 
-        messages.add(CompilerMessage("Tokenized the file successfully.", "success"))
+        self.context.messages.add(
+            CompilerMessage("Tokenized the file successfully.", "success")
+        )
 
         # Print the tokens
         if "-s" in self.flags:
-            messages.add(CompilerMessage("Tokens:", "important"))
+            self.context.messages.add(CompilerMessage("Tokens:", "important"))
             for token in self.tokens:
                 print(token)
 
         return self.tokens
 
+    @inContext
     def parse(self):
         """Parse the tokens using our LR Parser."""
 
@@ -96,38 +132,39 @@ class Compiler:
             parser.loadParseTables(self.grammar, force=False)
 
         # Parse the tokens and save the parse tree
-        self.parseTree = parser.parse(self.tokens)
+        if self.jobs > 1:
+            self.parseTree = parser.parseParallel(self.tokens, self.jobs)
+        else:
+            self.parseTree = parser.parse(self.tokens)
 
         if self.parseTree is None:
-            messages.add(CompilerMessage("Failed to parse the tokens."))
+            self.context.messages.add(CompilerMessage("Failed to parse the tokens."))
             return None
 
         # Change [Program] to Program
         self.parseTree = self.parseTree[0]
 
-        messages.add(CompilerMessage("Successfully parsed the tokens.", "success"))
+        self.context.messages.add(
+            CompilerMessage("Successfully parsed the tokens.", "success")
+        )
 
         # Flatten the parse tree
-        for reduce in [
-            Arguments,
-            Parameters,
-            DeclarationList,
-            StatementList,
-            StatementListNew,
-            SwitchCaseList,
-            EnumList,
-            StructList,
-            VarList,
-        ]:
+        for reduce in recursiveNodes:
             flattenTree(self.parseTree, reducer=reduce)
 
-        # Print the parse tree
+        # Print the parse tree, or write it to the output file
         if "-p" in self.flags:
-            messages.add(CompilerMessage("Parse Tree:", "important"))
-            parser.print()
+            tree = dumpTree(self.parseTree, self.treeFormat)
+
+            if self.treeOutput and self.output is not None:
+                writeFile(self.output, tree)
+            else:
+                self.context.messages.add(CompilerMessage("Parse Tree:", "important"))
+                sys.stdout.write(tree)
 
         return self.parseTree
 
+    @inContext
     def buildSymbolTable(self):
         """Build a symbol table from a parse tree."""
 
@@ -136,31 +173,87 @@ class Compiler:
             raise CompilerMessage("Cannot build symbol table without a parse tree.")
 
         # Save the symbol table
-        self.symbolTable = buildSymbolTable(self.parseTree)
+        self.symbolTable = buildSymbolTable(self.parseTree, self.externals())
 
         if self.symbolTable is None:
-            messages.add(CompilerMessage("Failed to build the symbol table."))
+            self.context.messages.add(
+                CompilerMessage("Failed to build the symbol table.")
+            )
             return None
 
-        messages.add(CompilerMessage("Successfully built the symbol table.", "success"))
+        self.updateIndex()
+
+        self.context.messages.add(
+            CompilerMessage("Successfully built the symbol table.", "success")
+        )
 
         # Print the symbol table if flag is present
         if "-t" in self.flags:
-            messages.add(CompilerMessage("Symbol Table:", "important"))
+            self.context.messages.add(CompilerMessage("Symbol Table:", "important"))
             self.symbolTable.print()
         return self.symbolTable
 
+    @inContext
+    def externals(self):
+        """Read the functions defined in other files from the symbol index."""
+
+        if self.index is None:
+            return None
+
+        with SymbolIndex(self.index) as index:
+            return index.externals(self.filename)
+
+    @inContext
+    def updateIndex(self):
+        """Record the functions defined in this file in the symbol index."""
+
+        if self.index is None:
+            return
+
+        with SymbolIndex(self.index) as index:
+            # Files that did not change since they were indexed are skipped
+            if index.isCurrent(self.filename):
+                return
+
+            index.update(self.filename, self.symbolTable.definitions())
+
+        self.context.messages.add(
+            CompilerMessage(f"Updated the symbol index '{self.index}'.", "success")
+        )
+
+    @inContext
     def generateIr(self):
         """Convert a parse tree to the first intermediate representation."""
 
         # Read in an IR from a file
         if "-i" in self.flags and self.input is not None:
             self.ir = readJson(self.input)
-            messages.add(
+            self.context.messages.add(
                 CompilerMessage(
                     f"Succesfully parsed the IR in '{self.input}'.", "success"
                 )
             )
+        elif "-u" in self.flags:
+            # Cannot convert to IR without parse tree
+            if not self.parseTree:
+                raise CompilerMessage("Cannot generate an IR without a parse tree.")
+
+            # Build the symbol table while generating the IR
+            self.symbolTable, self.ir = generateFused(
+                self.parseTree, self.externals(), self.context
+            )
+            self.updateIndex()
+
+            self.context.messages.add(
+                CompilerMessage(
+                    "Successfully built the symbol table and generated an IR.",
+                    "success",
+                )
+            )
+
+            if "-t" in self.flags:
+                self.context.messages.add(CompilerMessage("Symbol Table:", "important"))
+                self.symbolTable.print()
         else:
             # Cannot convert to IR without parse tree
             if not self.parseTree:
@@ -171,26 +264,46 @@ class Compiler:
                 raise CompilerMessage("Cannot generate an IR without a symbol table.")
 
             # Create a new instance of IR
-            self.ir = IR(self.parseTree, self.symbolTable)
+            self.ir = IR(self.parseTree, self.symbolTable, self.context)
 
             # Generate the IR
             output = self.ir.generate()
 
             if output is None:
-                messages.add(CompilerMessage("Failed to generate an IR."))
+                self.context.messages.add(CompilerMessage("Failed to generate an IR."))
                 return None
 
-            messages.add(CompilerMessage("Successfully generated an IR.", "success"))
+            self.context.messages.add(
+                CompilerMessage("Successfully generated an IR.", "success")
+            )
+
+        if self.ssa:
+            for name, function in self.ir.ir.items():
+                # IR read from a file has no symbol table to list the locals
+                variables = None
+                if self.symbolTable is not None:
+                    variables = self.symbolTable.variables(name)
+                constructSsa(function, variables)
+
+            self.context.messages.add(
+                CompilerMessage("Converted the IR to SSA form.", "success")
+            )
+
+        if self.optimization:
+            optimize(self.ir.ir, self.optimization)
 
         if "-r" in self.flags:
-            messages.add(CompilerMessage("Intermediate Representation:", "important"))
+            self.context.messages.add(
+                CompilerMessage("Intermediate Representation:", "important")
+            )
             self.ir.print()
 
-        if "-o" in self.flags and self.output is not None:
+        if "-o" in self.flags and self.output is not None and not self.treeOutput:
             self.ir.write(self.output)
 
         return self.ir
 
+    @inContext
     def assemble(self):
         """Convert the IR to assembly instructions."""
 
@@ -198,19 +311,26 @@ class Compiler:
         if not self.ir:
             raise CompilerMessage("Cannot generate asm without an IR.")
 
-        assembler = Assembler(self.ir.ir)
+        # Phis are replaced with copies, IR without phis is left unchanged
+        for function in self.ir.ir.values():
+            destructSsa(function)
+
+        # Optimized code returns the results of tail calls by jumping
+        assembler = Assembler(self.ir.ir, self.context, self.optimization > 0)
 
         self.asm = assembler.generate()
 
         if self.asm is None:
-            messages.add(CompilerMessage("Failed to generate the ASM."))
+            self.context.messages.add(CompilerMessage("Failed to generate the ASM."))
             return None
 
-        messages.add(CompilerMessage("Successfully generated ASM.", "success"))
+        self.context.messages.add(
+            CompilerMessage("Successfully generated ASM.", "success")
+        )
 
         # Print the ASM if "-a" flag
         if "-a" in self.flags:
-            messages.add(CompilerMessage("ASM:", "important"))
+            self.context.messages.add(CompilerMessage("ASM:", "important"))
             assembler.print()
 
         if "-n" in self.flags:
@@ -246,6 +366,15 @@ def printUsage():
         "     -a, --asm                   Generate assembly instructions from the IR."
     )
     print("     -n, --asmOutput <filename>  Output the assembly to a file.")
+    print("     -j, --jobs <number>         Parse functions in parallel processes.")
+    print("     -u, --fused                 Build the symbol table and IR in one pass.")
+    print("     --format <format>           Parse tree format: text, sexp or json.")
+    print("                                 With -p and -o, writes the tree to a file.")
+    print("     -x, --index <filename>      Check calls against a cross-file index.")
+    print("     --ssa                       Convert the IR to SSA form.")
+    print(
+        f"     -O, --optimize <level>      Optimize the IR, up to level {max(levels)}."
+    )
     print()
 
 
@@ -255,7 +384,7 @@ def parseArguments():
     try:
         opts, args = getopt.getopt(
             sys.argv[1:],
-            "hvsptfrag:o:i:n:",
+            "hvsptfraug:o:i:n:j:x:O:",
             [
                 "help",
                 "verbose",
@@ -265,10 +394,16 @@ def parseArguments():
                 "force",
                 "ir",
                 "asm",
+                "fused",
                 "grammar=",
                 "output=",
                 "input=",
                 "asmOutput=",
+                "jobs=",
+                "format=",
+                "index=",
+                "ssa",
+                "optimize=",
             ],
         )
     except getopt.GetoptError as err:
@@ -281,6 +416,11 @@ def parseArguments():
     output = None
     inputFile = None
     asmOutput = None
+    jobs = None
+    treeFormat = None
+    index = None
+    ssa = False
+    optimization = None
 
     for opt, arg in opts:
         if opt in ("-h", "--help"):
@@ -308,9 +448,37 @@ def parseArguments():
             grammar = arg
         elif opt in ("-a", "--asm"):
             flags.append("-a")
+        elif opt in ("-u", "--fused"):
+            flags.append("-u")
         elif opt in ("-n", "--asmOutput"):
             flags.append("-n")
             asmOutput = arg
+        elif opt == "--format":
+            if arg not in formats:
+                print(f"Unknown parse tree format: {arg}")
+                printUsage()
+                sys.exit(2)
+            treeFormat = arg
+        elif opt in ("-x", "--index"):
+            index = arg
+        elif opt == "--ssa":
+            ssa = True
+        elif opt in ("-O", "--optimize"):
+            try:
+                optimization = int(arg)
+            except ValueError:
+                optimization = -1
+            if optimization < 0:
+                print(f"Invalid optimization level: {arg}")
+                printUsage()
+                sys.exit(2)
+        elif opt in ("-j", "--jobs"):
+            try:
+                jobs = int(arg)
+            except ValueError:
+                print(f"Invalid number of jobs: {arg}")
+                printUsage()
+                sys.exit(2)
 
     try:
         filename = args[0]
@@ -321,7 +489,19 @@ def parseArguments():
             printUsage()
             sys.exit()
 
-    return filename, grammar, flags, output, inputFile, asmOutput
+    return (
+        filename,
+        grammar,
+        flags,
+        output,
+        inputFile,
+        asmOutput,
+        jobs,
+        treeFormat,
+        index,
+        ssa,
+        optimization,
+    )
 
 
 def startLog():
@@ -346,13 +526,25 @@ def startLog():
 def main():
     """Run the compiler from the command line."""
 
-    filename, grammar, flags, output, inputFile, asmOutput = parseArguments()
+    (
+        filename,
+        grammar,
+        flags,
+        output,
+        inputFile,
+        asmOutput,
+        jobs,
+        treeFormat,
+        index,
+        ssa,
+        optimization,
+    ) = parseArguments()
 
     # Define levels for each step of the compiler
     # Run up to max level
     level = 0
     if not flags:
-        messages.add(
+        current().messages.add(
             CompilerMessage(
                 "No flags found! Running the compiler to the ASM stage.", "warning"
             )
@@ -375,13 +567,17 @@ def main():
         level = 3
     if "-r" in flags:
         level = 4
-    if "-o" in flags:
+    if "-o" in flags and (treeFormat is None or "-r" in flags):
         level = 4
     if "-a" in flags:
         level = 5
     if "-n" in flags:
         level = 5
 
+    # The fused pass builds the symbol table while generating the IR
+    if "-u" in flags and level == 3:
+        level = 4
+
     options = {
         "filename": filename,
         "grammar": grammar,
@@ -389,6 +585,11 @@ def main():
         "output": output,
         "input": inputFile,
         "asmOutput": asmOutput,
+        "jobs": jobs,
+        "treeFormat": treeFormat,
+        "index": index,
+        "ssa": ssa,
+        "optimization": optimization,
     }
     compiler = Compiler(options)
 
@@ -404,7 +605,7 @@ def main():
                     compiler.tokenize()
                 elif i == 2:
                     compiler.parse()
-                elif i == 3:
+                elif i == 3 and "-u" not in flags:
                     compiler.buildSymbolTable()
                 elif i == 4:
                     compiler.generateIr()
@@ -419,7 +620,7 @@ def main():
         sys.exit(2)
     except KeyboardInterrupt:
         print()
-        messages.add(CompilerMessage("Compiler was interrupted."))
+        current().messages.add(CompilerMessage("Compiler was interrupted."))
         sys.exit(2)
 
 
@@ -0,0 +1,243 @@
+"""
+Array backed (struct of arrays) storage for very large parse trees.
+
+Nodes are numbered in breadth first order, so the children of a node
+always have consecutive ids. Each node is described by its kind, its
+value and the id and number of its children, all stored in flat arrays.
+
+Parallel parses use it to send the trees of the workers back to the main
+process, since pickling nested node objects recurses once per level and
+fails on deeply nested code.
+"""
+
+from array import array
+import src.parser.grammar as grammar
+from src.util import current
+
+# Every node class we can store, indexed by its kind number
+kinds = sorted(
+    set(grammar.nodes.values()) | set(grammar.terminals.values()),
+    key=lambda kind: kind.__name__,
+)
+kindNumbers = {kind: number for number, kind in enumerate(kinds)}
+terminalKinds = set(grammar.terminals.values())
+
+# Attributes that constructors derive from the children of a node
+derived = {"name", "type", "arguments", "parameters", "expr"}
+
+magic = b"FLATTREE"
+
+
+class FlatTree:
+    """A parse tree stored in flat arrays indexed by node id."""
+
+    def __init__(self):
+        self.kinds = array("H")
+        self.values = array("i")
+        self.first = array("I")
+        self.count = array("I")
+        self.strings = []
+        self.stringNumbers = {}
+
+        # Nodes built to read derived attributes, by id
+        self.derived = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @classmethod
+    def fromNode(cls, root):
+        """Build a flat tree from a parse tree of node instances."""
+
+        tree = cls()
+        queue = [root]
+        position = 0
+
+        # Ids are handed out in the order nodes are queued,
+        # which places all children of a node next to each other
+        while position < len(queue):
+            node = queue[position]
+            position += 1
+
+            tree.kinds.append(kindNumbers[node.__class__])
+
+            if node.__class__ in terminalKinds:
+                tree.values.append(tree.intern(node.value))
+                tree.first.append(0)
+                tree.count.append(0)
+            else:
+                tree.values.append(-1)
+                tree.first.append(len(queue))
+                tree.count.append(len(node.children))
+                queue.extend(node.children)
+
+        return tree
+
+    def intern(self, value):
+        """Return the number of a string value, adding it if needed."""
+
+        if value is None:
+            return -1
+
+        try:
+            return self.stringNumbers[value]
+        except KeyError:
+            number = self.stringNumbers[value] = len(self.strings)
+            self.strings.append(value)
+            return number
+
+    def root(self):
+        """Return a view of the root node."""
+
+        return NodeView(self, 0)
+
+    def derive(self, index):
+        """Return the node built on the views of the children of a node."""
+
+        try:
+            return self.derived[index]
+        except KeyError:
+            view = NodeView(self, index)
+            node = self.derived[index] = view.kind(view.children)
+            return node
+
+    def toNode(self):
+        """
+        Rebuild the parse tree as node instances.
+        Nodes are built from the last id to the first, so the children
+        of every node already exist when the node itself is built.
+        """
+
+        nodes = [None] * len(self)
+
+        for index in range(len(self) - 1, -1, -1):
+            kind = kinds[self.kinds[index]]
+
+            if kind in terminalKinds:
+                nodes[index] = kind(self.strings[self.values[index]])
+            else:
+                start = self.first[index]
+                nodes[index] = kind(nodes[start : start + self.count[index]])
+
+        return nodes[0]
+
+    def dumps(self):
+        """Serialize the tree into bytes."""
+
+        names = "\n".join(kind.__name__ for kind in kinds).encode()
+        strings = [string.encode() for string in self.strings]
+        lengths = array("I", [len(string) for string in strings])
+        header = array("I", [len(names), len(self), len(strings)])
+
+        return b"".join(
+            [
+                magic,
+                header.tobytes(),
+                names,
+                self.kinds.tobytes(),
+                self.values.tobytes(),
+                self.first.tobytes(),
+                self.count.tobytes(),
+                lengths.tobytes(),
+            ]
+            + strings
+        )
+
+    @classmethod
+    def loads(cls, data):
+        """Load a tree serialized with dumps."""
+
+        if not data.startswith(magic):
+            raise ValueError("Not a serialized flat tree.")
+
+        tree = cls()
+        offset = len(magic)
+
+        header = array("I")
+        header.frombytes(data[offset : offset + 3 * header.itemsize])
+        offset += 3 * header.itemsize
+        namesLength, size, stringCount = header
+
+        # Map the stored kind numbers onto the current kind numbers
+        names = data[offset : offset + namesLength].decode().split("\n")
+        offset += namesLength
+        byName = {kind.__name__: number for number, kind in enumerate(kinds)}
+        remap = [byName[name] for name in names]
+
+        def read(typecode, count):
+            nonlocal offset
+            values = array(typecode)
+            values.frombytes(data[offset : offset + count * values.itemsize])
+            offset += count * values.itemsize
+            return values
+
+        tree.kinds = array("H", [remap[kind] for kind in read("H", size)])
+        tree.values = read("i", size)
+        tree.first = read("I", size)
+        tree.count = read("I", size)
+
+        # Decoded names are new strings, so they are interned again
+        interner = current().interner
+        for length in read("I", stringCount):
+            tree.intern(interner.intern(data[offset : offset + length].decode()))
+            offset += length
+
+        return tree
+
+
+class NodeView:
+    """
+    A read-only view of a node in a FlatTree.
+
+    The node class of a view is its kind, which the visitor dispatches on.
+    Views offer the attributes read by the symbol table: children, value
+    and the attributes node constructors derive from their children.
+    """
+
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def kind(self):
+        """The node class of this node."""
+
+        return kinds[self.tree.kinds[self.index]]
+
+    @property
+    def children(self):
+        """Views of the children of this node."""
+
+        if self.kind in terminalKinds:
+            raise AttributeError("Terminal nodes do not have children.")
+
+        start = self.tree.first[self.index]
+        return [
+            NodeView(self.tree, child)
+            for child in range(start, start + self.tree.count[self.index])
+        ]
+
+    @property
+    def value(self):
+        """The value of a terminal node, or the value derived from its children."""
+
+        number = self.tree.values[self.index]
+        if number >= 0:
+            return self.tree.strings[number]
+
+        if self.kind is grammar.Parameter:
+            return self.children[0].value
+
+        return None
+
+    def __getattr__(self, attribute):
+        # Let the node constructor derive the attribute from the children
+        if attribute in derived:
+            return getattr(self.tree.derive(self.index), attribute)
+
+        raise AttributeError(attribute)
+
+    def __str__(self):
+        return self.kind.__name__
@@ -4,15 +4,27 @@
 Classes that represent grammar rules for our Parse Tree.
 """
 
-from src.util import unique
+from src.util import current
 
 
-def parseToken(desc, content="", children=None):
-    """Parse a token into the relevant class."""
+def parseToken(desc, content="", children=None, cache=None):
+    """
+    Parse a token into the relevant class.
+    Terminal nodes are never modified, so if a cache dict is given
+    equal terminals share a single node instance.
+    """
 
     # Check if the node is a terminal
     if desc in terminals:
-        return terminals[desc](content)
+        if cache is None:
+            return terminals[desc](content)
+
+        key = (desc, content)
+        try:
+            return cache[key]
+        except KeyError:
+            node = cache[key] = terminals[desc](content)
+            return node
 
     # Check if the node exists
     if desc in nodes:
@@ -32,7 +44,14 @@ def printPrefix(level):
 
 
 class Node:
-    """General parse tree node class"""
+    """
+    General parse tree node class.
+
+    Every subclass declares the attributes it uses in __slots__,
+    so nodes do not carry a __dict__ around.
+    """
+
+    __slots__ = ("children", "value")
 
     def __init__(self, *children):
         self.value = None
@@ -53,15 +72,25 @@ class Node:
         This method is overriden at lower level nodes like ConstNum.
         """
 
-        printPrefix(level)
-        print(self.__class__.__name__)
+        stack = [(self, level)]
 
-        if isinstance(self.children, list):
-            for child in self.children:
-                child.print(level + 1)
-        else:
-            for child in self.children[0]:
-                child.print(level + 1)
+        while stack:
+            node, level = stack.pop()
+
+            # Lower level nodes print themselves
+            if node.__class__.print is not Node.print:
+                node.print(level)
+                continue
+
+            printPrefix(level)
+            print(node.__class__.__name__)
+
+            if isinstance(node.children, list):
+                children = node.children
+            else:
+                children = node.children[0]
+
+            stack.extend((child, level + 1) for child in reversed(children))
 
     # pylint: disable=no-self-use
     def ir(self):
@@ -73,29 +102,63 @@ class Node:
     # pylint: enable=no-self-use
 
     def visit(self):
-        if hasattr(self, "children"):
-            for child in self.children:
-                child.visit()
+        """Prepare every node below this one, children before their parent."""
+
+        # Reversing a root, right, left order gives a left, right, root order
+        stack = [self]
+        order = []
+
+        while stack:
+            node = stack.pop()
+            order.append(node)
 
-        self.prepare()
+            if hasattr(node, "children"):
+                stack.extend(node.children)
+
+        for node in reversed(order):
+            node.prepare()
 
 
 # Parse Tree Node Classes
 
 
 class Program(Node):
-    pass
+    __slots__ = ("index",)
+
+    def __init__(self, *children):
+        super().__init__(*children)
+
+        # Nodes per function and node class, filled in by the parser
+        self.index = {}
+
+    def find(self, kind, function=None):
+        """
+        Return the nodes of a class, in the order they were parsed.
+        Only the nodes of one function are returned if a name is given.
+        Nodes outside of any function are found under the name "global".
+        """
+
+        if function is not None:
+            return self.index.get(function, {}).get(kind, [])
+
+        found = []
+        for kinds in self.index.values():
+            found.extend(kinds.get(kind, []))
+
+        return found
 
 
 class DeclarationList(Node):
-    pass
+    __slots__ = ()
 
 
 class Declaration(Node):
-    pass
+    __slots__ = ()
 
 
 class FunctionDeclaration(Node):
+    __slots__ = ("type", "name", "arguments")
+
     def __init__(self, children):
         self.children = children
         self.type = self.children[0].value
@@ -104,6 +167,8 @@ class FunctionDeclaration(Node):
 
 
 class Arguments(Node):
+    __slots__ = ()
+
     def prepare(self):
         s = []
         for i in self.children:
@@ -113,6 +178,8 @@ class Arguments(Node):
 
 
 class Argument(Node):
+    __slots__ = ("type", "name")
+
     def __init__(self, children):
         self.children = children
         self.type = children[0].value
@@ -124,6 +191,8 @@ class Argument(Node):
 
 
 class Parameters(Node):
+    __slots__ = ()
+
     def prepare(self):
         s = []
         for i in self.children:
@@ -133,28 +202,32 @@ class Parameters(Node):
 
 
 class Parameter(Node):
+    __slots__ = ()
+
     def __init__(self, children):
         self.children = children
         self.value = children[0].value
 
 
 class StatementList(Node):
-    pass
+    __slots__ = ()
 
 
 class Statement(Node):
-    pass
+    __slots__ = ()
 
 
 class StatementListNew(Node):
-    pass
+    __slots__ = ()
 
 
 class StatementNew(Node):
-    pass
+    __slots__ = ()
 
 
 class ReturnStatement(Node):
+    __slots__ = ("expr",)
+
     def prepare(self):
         self.expr = self.children[0]
 
@@ -163,6 +236,8 @@ class ReturnStatement(Node):
 
 
 class VariableDeclaration(Node):
+    __slots__ = ("type", "name", "expr")
+
     def __init__(self, children):
         self.children = children
         self.type = children[0].value
@@ -180,6 +255,8 @@ class VariableDeclaration(Node):
 
 
 class LabelDeclaration(Node):
+    __slots__ = ()
+
     def prepare(self):
         self.value = self.children[0].value
 
@@ -191,98 +268,116 @@ class LabelDeclaration(Node):
 
 
 class VariableAssignment(Node):
+    __slots__ = ("name",)
+
     def __init__(self, children):
         self.children = children
         self.name = children[0].name
 
     def ir(self):
-        recent = unique.count["none"]
+        recent = current().unique.count["none"]
         return [self.name, "=", f"r{recent}"]
 
 
 class IncrementAssignment(Node):
+    __slots__ = ("name",)
+
     def __init__(self, children):
         self.children = children
         self.name = self.children[0].value
 
     def ir(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
         return [self.value, "=", self.name, "+", "1"]
 
 
 class DecrementAssignment(Node):
+    __slots__ = ("name",)
+
     def __init__(self, children):
         self.children = children
         self.name = self.children[0].value
 
     def ir(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
         return [self.value, "=", self.name, "-", "1"]
 
 
 class PlusEqualAssignment(Node):
+    __slots__ = ("name", "expr")
+
     def __init__(self, children):
         self.children = children
         self.name = self.children[0].value
         self.expr = self.children[1]
 
     def ir(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
         return [self.value, "=", self.name, "+", self.expr.value]
 
 
 class MinusEqualAssignment(Node):
+    __slots__ = ("name", "expr")
+
     def __init__(self, children):
         self.children = children
         self.name = self.children[0].value
         self.expr = self.children[1]
 
     def ir(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
         return [self.value, "=", self.name, "-", self.expr.value]
 
 
 class MultEqualAssignment(Node):
+    __slots__ = ("name", "expr")
+
     def __init__(self, children):
         self.children = children
         self.name = self.children[0].value
         self.expr = self.children[1]
 
     def ir(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
         return [self.value, "=", self.name, "*", self.expr.value]
 
 
 class DivEqualAssignment(Node):
+    __slots__ = ("name", "expr")
+
     def __init__(self, children):
         self.children = children
         self.name = self.children[0].value
         self.expr = self.children[1]
 
     def ir(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
         return [self.value, "=", self.name, "/", self.expr.value]
 
 
 class CallAssignment(Node):
+    __slots__ = ("name", "expr")
+
     def __init__(self, children):
         self.children = children
         self.name = self.children[0].value
         self.expr = self.children[1]
 
     def ir(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
         return f"{self.value} = call {self.name} - {self.expr.value}"
 
 
 class ExpressionAssignment(Node):
+    __slots__ = ("name", "expr")
+
     def __init__(self, children):
         self.children = children
         self.name = self.children[0].value
         self.expr = self.children[1]
 
     def ir(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
         return [self.value, "=", self.expr.value]
 
 
@@ -290,96 +385,132 @@ class ExpressionAssignment(Node):
 
 
 class Expression(Node):
+    __slots__ = ()
+
     def prepare(self):
         self.value = self.children[0].value
 
 
 class NestedExpression(Node):
+    __slots__ = ()
+
     def prepare(self):
         self.value = self.children[0].value
 
 
 class MathExpression(Node):
+    __slots__ = ("a", "b")
+
     def prepare(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
         self.a = self.children[0].value
         self.b = self.children[1].value
 
 
 class AdditionExpression(MathExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "+", self.b]
 
 
 class SubtractionExpression(MathExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "-", self.b]
 
 
 class MultiplicationExpression(MathExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "*", self.b]
 
 
 class DivisionExpression(MathExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "/", self.b]
 
 
 class ModulusExpression(MathExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "%", self.b]
 
 
 class BooleanAnd(MathExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "&&", self.b]
 
 
 class BooleanOr(MathExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "||", self.b]
 
 
 class BooleanNot(Node):
+    __slots__ = ()
+
     def ir(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
         return [self.value, "=", "!", self.children[0].value]
 
 
 class ComparisonExpression(Node):
+    __slots__ = ("a", "b")
+
     def prepare(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
         self.a = self.children[0].value
         self.b = self.children[1].value
 
 
 class LTOEExpression(ComparisonExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "<=", self.b]
 
 
 class GTOEExpression(ComparisonExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, ">=", self.b]
 
 
 class LTExpression(ComparisonExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "<", self.b]
 
 
 class GTExpression(ComparisonExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, ">", self.b]
 
 
 class NotEqualExpression(ComparisonExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "!=", self.b]
 
 
 class EqualExpression(ComparisonExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "==", self.b]
 
@@ -388,53 +519,61 @@ class EqualExpression(ComparisonExpression):
 
 
 class ForStatement(Node):
-    pass
+    __slots__ = ()
 
 
 class WhileStatement(Node):
+    __slots__ = ()
+
     def ir(self):
         return ["while", self.children[0].ir()]
 
 
 class WhileCondition(Node):
+    __slots__ = ()
+
     def prepare(self):
         self.value = self.children[0].value
 
 
 class BreakStatement(Node):
-    def ir(self):
-        return ["break"]
+    __slots__ = ()
 
 
 class ContinueStatement(Node):
-    def ir(self):
-        return ["continue"]
+    __slots__ = ()
 
 
 class IncludeStatement(Node):
-    pass
+    __slots__ = ()
 
 
 class CallStatement(Node):
+    __slots__ = ("name", "parameters")
+
     def __init__(self, children):
         self.children = children
         self.name = self.children[0].value
         self.parameters = self.children[1]
 
     def prepare(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
 
     def ir(self):
         return ["call", self.value, "=", self.name, self.parameters.value]
 
 
 class GotoStatement(Node):
+    __slots__ = ()
+
     def ir(self):
         self.value = self.children[0].value
         return ["goto", self.value]
 
 
 class IfStatement(Node):
+    __slots__ = ("condition", "body", "hasElse")
+
     def __init__(self, children):
         self.children = children
         self.condition = self.children[0]
@@ -449,19 +588,23 @@ class IfStatement(Node):
 
 
 class IfBody(Node):
-    pass
+    __slots__ = ("hasElse",)
 
 
 class Condition(Node):
+    __slots__ = ()
+
     def prepare(self):
         self.value = self.children[0].value
 
 
 class ElseStatement(Node):
-    pass
+    __slots__ = ()
 
 
 class SwitchStatement(Node):
+    __slots__ = ()
+
     def prepare(self):
         self.value = self.children[0].value
 
@@ -470,72 +613,88 @@ class SwitchStatement(Node):
 
 
 class SwitchCaseList(Node):
-    pass
+    __slots__ = ()
 
 
 class SwitchCase(Node):
+    __slots__ = ("operator",)
+
     def prepare(self):
         self.value = self.children[0].value
 
 
 class SwitchCondition(Node):
+    __slots__ = ()
+
     def prepare(self):
         self.value = self.children[0].value
 
 
 class BitAnd(MathExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "&", self.b]
 
 
 class BitOr(MathExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "|", self.b]
 
 
 class BitXor(MathExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "^", self.b]
 
 
 class BitNot(Node):
+    __slots__ = ()
+
     def ir(self):
-        self.value = unique.new()
+        self.value = current().unique.new()
         return [self.value, "=", "~", self.children[0].value]
 
 
 class LeftShift(MathExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, "<<", self.b]
 
 
 class RightShift(MathExpression):
+    __slots__ = ()
+
     def ir(self):
         return [self.value, "=", self.a, ">>", self.b]
 
 
 class EnumStatement(Node):
-    pass
+    __slots__ = ()
 
 
 class EnumList(Node):
-    pass
+    __slots__ = ()
 
 
 class StructStatement(Node):
-    pass
+    __slots__ = ()
 
 
 class StructList(Node):
-    pass
+    __slots__ = ()
 
 
 class StructDec(Node):
-    pass
+    __slots__ = ()
 
 
 class VarList(Node):
-    pass
+    __slots__ = ()
 
 
 # A dictionary of all the parse tree nodes we recognize
@@ -613,12 +772,28 @@ nodes = {
     "varList": VarList,
 }
 
+# Recursive grammar rules that are collapsed after parsing
+
+recursiveNodes = (
+    Arguments,
+    Parameters,
+    DeclarationList,
+    StatementList,
+    StatementListNew,
+    SwitchCaseList,
+    EnumList,
+    StructList,
+    VarList,
+)
+
 # Terminal Nodes
 
 
 class TypeSpecifier(Node):
     """Type specifier node."""
 
+    __slots__ = ()
+
     def __init__(self, value):
         self.value = value
 
@@ -630,6 +805,8 @@ class TypeSpecifier(Node):
 class ConstNum(Node):
     """Number constant node."""
 
+    __slots__ = ()
+
     def __init__(self, value):
         self.value = value
 
@@ -641,6 +818,8 @@ class ConstNum(Node):
 class Identifier(Node):
     """ID node."""
 
+    __slots__ = ()
+
     def __init__(self, value):
         self.value = value
 
@@ -652,6 +831,8 @@ class Identifier(Node):
 class Filename(Node):
     """Filename node."""
 
+    __slots__ = ()
+
     def __init__(self, value):
         self.value = value
 
@@ -663,6 +844,8 @@ class Filename(Node):
 class String(Node):
     """String node."""
 
+    __slots__ = ()
+
     def __init__(self, value):
         self.value = value
 
@@ -674,6 +857,8 @@ class String(Node):
 class Label(Node):
     """Label node."""
 
+    __slots__ = ()
+
     def __init__(self, value):
         self.value = value
 
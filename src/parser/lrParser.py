@@ -7,14 +7,22 @@ Parses the list of tokens using the action and goto tables.
 
 import logging
 import os
+import sys
 import json
+from concurrent.futures import ProcessPoolExecutor
 from halo import Halo
 import src.parser.grammar as grammar
-from src.util import readFile, messages, CompilerMessage, ensureDirectory
+import src.lexer.tokens as tokenTypes
+from src.parser.flatTree import FlatTree, terminalKinds
+from src.parser.treeWriter import dumpText
+from src.util import readFile, current, CompilerMessage, ensureDirectory
 
 debug = True
 printDebug = False
 
+# Parser used by each worker process of a parallel parse
+workerParser = None
+
 
 class LRParser:
     """The general parser class."""
@@ -39,6 +47,14 @@ class LRParser:
         # Parse tree, represented as a node list
         self.parseTree = []
 
+        # Shared terminal nodes, keyed by token and content
+        self.terminalNodes = {}
+
+        # Nodes per function and node class, and nodes
+        # reduced since the last function or declaration
+        self.index = {}
+        self.pendingIndex = {}
+
     def buildTables(self):
         """Build the item sets, transitions, and action goto tables."""
 
@@ -413,12 +429,12 @@ class LRParser:
 
         if os.path.isfile(tableFile) and force is False:
             # Load a saved tables file
-            messages.add(CompilerMessage("Reading saved tables.", "success"))
+            current().messages.add(CompilerMessage("Reading saved tables.", "success"))
 
             self.loadTables(readFile(tableFile))
         else:
             # Parse the tokens using an LR(1) table
-            messages.add(
+            current().messages.add(
                 CompilerMessage(
                     "Generating new tables. Consider removing the -f flag.", "warning"
                 )
@@ -468,6 +484,9 @@ class LRParser:
             self.printTransitions()
             self.printTable()
 
+        self.index = {}
+        self.pendingIndex = {}
+
         lookahead = 0
         done = False
         states = [0]
@@ -513,7 +532,9 @@ class LRParser:
                         stack.append(token)
                         lookahead += 1
 
-                        node = grammar.parseToken(token, realToken.content)
+                        node = grammar.parseToken(
+                            token, realToken.content, cache=self.terminalNodes
+                        )
                         self.parseTree.append(node)
 
                     # If the action table says to reduce
@@ -552,6 +573,7 @@ class LRParser:
                                 # print(c)
 
                                 if tempNode:
+                                    self.indexNode(tempNode)
                                     if rule != ["EMPTY"]:
                                         del self.parseTree[-len(rule) :]
                                     self.parseTree.append(tempNode)
@@ -569,7 +591,7 @@ class LRParser:
                             if topStack in self.goto[topState].keys():
                                 states.append(self.goto[topState][topStack])
                         else:
-                            messages.add(
+                            current().messages.add(
                                 CompilerMessage(
                                     "Tried to reduce a rule with invalid tokens on stack."
                                 )
@@ -590,17 +612,17 @@ class LRParser:
                             stack.append("EMPTY")
 
                     else:
-                        messages.add(
+                        current().messages.add(
                             CompilerMessage(
                                 f"State {state} does not have Token {token}"
                             )
                         )
-                        messages.add(CompilerMessage(self.actions[state]))
-                        messages.add(CompilerMessage(f"Stack: {stack}"))
+                        current().messages.add(CompilerMessage(self.actions[state]))
+                        current().messages.add(CompilerMessage(f"Stack: {stack}"))
                         return None
 
             except KeyError:
-                messages.add(
+                current().messages.add(
                     CompilerMessage(
                         f"No entry in the action table for [{state}][{token}]"
                     )
@@ -616,6 +638,97 @@ class LRParser:
 
         return self.parseTree
 
+    def parseParallel(self, tokens, jobs):
+        """
+        Parse the program using several worker processes.
+
+        The tokens are split into groups of whole top-level declarations.
+        A group of declarations is a valid program on its own, so each
+        worker parses its group from the start state using the same tables.
+        The resulting declarations are stitched back into a single Program.
+        """
+
+        declarations = splitDeclarations(tokens)
+
+        # Nothing to gain from parallel parsing, or the tokens could not
+        # be split cleanly. The sequential parser reports any errors.
+        if jobs <= 1 or declarations is None or len(declarations) < 2:
+            return self.parse(tokens)
+
+        groups = groupDeclarations(declarations, jobs * 4, tokens[-1])
+
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=initWorker,
+            initargs=(self.rules, self.terminals, self.actions, self.goto),
+        ) as executor:
+            results = list(executor.map(parseGroup, groups))
+
+        if any(result is None for result in results):
+            return None
+
+        # Chain the declarations the same way the grammar rule
+        # declarationList -> declarationList declaration would
+        declarationList = None
+        self.index = {}
+        self.pendingIndex = {}
+        for result in results:
+            program = FlatTree.loads(result).toNode()
+
+            # The nodes of the workers are rebuilt, so they are indexed again
+            for node in reductionOrder(program.children[0]):
+                self.indexNode(node)
+
+            for declaration in unchainDeclarations(program.children[0]):
+                if declarationList is None:
+                    declarationList = grammar.DeclarationList([declaration])
+                else:
+                    declarationList = grammar.DeclarationList(
+                        [declarationList, declaration]
+                    )
+
+        self.parseTree = [grammar.Program([declarationList])]
+        self.indexNode(self.parseTree[0])
+
+        return self.parseTree
+
+    def indexNode(self, node):
+        """
+        Record a reduced node in the index of node classes.
+        The parser reduces bottom up, so the nodes reduced before a
+        function declaration are the nodes inside of that function.
+        """
+
+        kind = node.__class__
+
+        if kind in grammar.recursiveNodes:
+            # These nodes are collapsed after parsing
+            return
+
+        if kind is grammar.FunctionDeclaration:
+            self.pendingIndex.setdefault(kind, []).append(node)
+            self.flushIndex(node.name)
+        elif kind is grammar.Declaration:
+            # Anything pending was declared outside of a function
+            self.flushIndex("global")
+        elif kind is grammar.Program:
+            self.flushIndex("global")
+            node.index = self.index
+        else:
+            self.pendingIndex.setdefault(kind, []).append(node)
+
+    def flushIndex(self, name):
+        """Move the pending nodes into the index under a function name."""
+
+        if not self.pendingIndex:
+            return
+
+        index = self.index.setdefault(name, {})
+        for kind, nodes in self.pendingIndex.items():
+            index.setdefault(kind, []).extend(nodes)
+
+        self.pendingIndex = {}
+
     def updateSetNum(self):
         """Update the number of item sets that we have generated."""
 
@@ -678,9 +791,7 @@ class LRParser:
     def print(self):
         """Print the parse tree."""
 
-        for node in self.parseTree:
-            if node:
-                node.print(0)
+        sys.stdout.write("".join(dumpText(node) for node in self.parseTree if node))
 
 
 class Item:
@@ -744,6 +855,126 @@ class Item:
         return Item(self.lhs, self.rhs, self.seperator + 1, self.following)
 
 
+def splitDeclarations(tokens):
+    """
+    Split a list of tokens into top-level declarations.
+    A declaration ends with a closing curly brace or a semicolon at
+    nesting depth 0, or is a single include filename.
+    Returns None if the braces are not balanced.
+    """
+
+    declarations = []
+    current = []
+    depth = 0
+
+    # The last token is always the end of file token
+    for token in tokens[:-1]:
+        current.append(token)
+
+        if token.kind is tokenTypes.openCurly:
+            depth += 1
+        elif token.kind is tokenTypes.closeCurly:
+            depth -= 1
+            if depth < 0:
+                return None
+            if depth == 0:
+                declarations.append(current)
+                current = []
+        elif depth == 0 and (
+            token.kind is tokenTypes.semicolon or token.kind is tokenTypes.filename
+        ):
+            declarations.append(current)
+            current = []
+
+    if current or depth != 0:
+        return None
+
+    return declarations
+
+
+def groupDeclarations(declarations, count, eof):
+    """Group declarations into about count groups of a similar number of tokens."""
+
+    total = sum(len(declaration) for declaration in declarations)
+    target = max(total // count, 1)
+
+    groups = []
+    group = []
+    size = 0
+    for declaration in declarations:
+        group.extend(declaration)
+        size += len(declaration)
+
+        if size >= target:
+            groups.append(group + [eof])
+            group = []
+            size = 0
+
+    if group:
+        groups.append(group + [eof])
+
+    return groups
+
+
+def unchainDeclarations(declarationList):
+    """Return the declarations of a recursive DeclarationList in source order."""
+
+    declarations = []
+    while len(declarationList.children) == 2:
+        declarations.append(declarationList.children[1])
+        declarationList = declarationList.children[0]
+    declarations.append(declarationList.children[0])
+    declarations.reverse()
+
+    return declarations
+
+
+def initWorker(rules, terminals, actions, goto):
+    """Setup the parser of a worker process with already loaded tables."""
+
+    global workerParser  # pylint: disable=global-statement
+
+    workerParser = LRParser()
+    workerParser.rules = rules
+    workerParser.terminals = terminals
+    workerParser.actions = actions
+    workerParser.goto = goto
+
+
+def reductionOrder(root):
+    """
+    Return the nodes of a tree that are not terminals, in the order the
+    parser reduced them: every node after its children, left to right.
+    """
+
+    # Reversing a root, right, left order gives a left, right, root order
+    stack = [root]
+    order = []
+
+    while stack:
+        node = stack.pop()
+        if node.__class__ not in terminalKinds:
+            order.append(node)
+            stack.extend(node.children)
+
+    order.reverse()
+    return order
+
+
+def parseGroup(tokens):
+    """
+    Parse a group of declarations in a worker process.
+    The tree is sent back serialized as a flat tree, or None on errors.
+    """
+
+    workerParser.parseTree = []
+    parseTree = workerParser.parse(tokens)
+    if parseTree is None:
+        return None
+
+    return FlatTree.fromNode(parseTree[0]).dumps()
+
+
 def seperatorAtEnd(currItem):
     """Check if there is a separator at the end of the current item."""
 
@@ -0,0 +1,118 @@
+"""
+Serialize parse trees as indented text, S-expressions or JSON.
+
+The whole tree is written into a list of strings that is joined once,
+so large trees can be written with a single write call.
+"""
+
+import json
+import src.parser.grammar as grammar
+
+formats = ["text", "sexp", "json"]
+
+terminalKinds = set(grammar.terminals.values())
+
+
+def walk(root):
+    """
+    Walk a tree in depth first order with an explicit stack.
+    Yields (True, node, level, position) when entering a node, where
+    position is the index of the node among its siblings,
+    and (False, node, level, position) when leaving it.
+    """
+
+    stack = [(True, root, 0, 0)]
+
+    while stack:
+        entering, node, level, position = stack.pop()
+        yield entering, node, level, position
+
+        if entering:
+            stack.append((False, node, level, position))
+
+            if node.__class__ not in terminalKinds:
+                children = node.children
+
+                # Like Node.print, nodes built from several arguments
+                # keep their children in the first one
+                if not isinstance(children, list):
+                    children = children[0]
+
+                for index in range(len(children) - 1, -1, -1):
+                    stack.append((True, children[index], level + 1, index))
+
+
+def dumpText(root):
+    """Write a tree in the same indented format as Node.print."""
+
+    parts = []
+    for entering, node, level, _ in walk(root):
+        if not entering:
+            continue
+
+        parts.append("   " * level)
+        parts.append("| -  ")
+        parts.append(node.__class__.__name__)
+        if node.__class__ in terminalKinds:
+            parts.append(f": {node.value}")
+        parts.append("\n")
+
+    return "".join(parts)
+
+
+def dumpSexp(root):
+    """Write a tree as a compact S-expression."""
+
+    parts = []
+    for entering, node, level, _ in walk(root):
+        if not entering:
+            parts.append(")")
+            continue
+
+        if level:
+            parts.append(" ")
+        parts.append("(")
+        parts.append(node.__class__.__name__)
+        if node.__class__ in terminalKinds:
+            parts.append(" ")
+            parts.append(json.dumps(node.value))
+
+    parts.append("\n")
+    return "".join(parts)
+
+
+def dumpJson(root):
+    """
+    Write a tree as JSON.
+    Nodes are objects with a kind, and either a value or a list of children.
+    """
+
+    parts = []
+    for entering, node, _, position in walk(root):
+        terminal = node.__class__ in terminalKinds
+
+        if not entering:
+            parts.append("}" if terminal else "]}")
+            continue
+
+        if position:
+            parts.append(",")
+        parts.append(f'{{"kind":"{node.__class__.__name__}",')
+        if terminal:
+            parts.append(f'"value":{json.dumps(node.value)}')
+        else:
+            parts.append('"children":[')
+
+    parts.append("\n")
+    return "".join(parts)
+
+
+def dumpTree(root, treeFormat="text"):
+    """Serialize a tree in one of the known formats."""
+
+    if treeFormat == "sexp":
+        return dumpSexp(root)
+    if treeFormat == "json":
+        return dumpJson(root)
+
+    return dumpText(root)
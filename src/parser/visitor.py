@@ -0,0 +1,165 @@
+"""
+Visitor framework shared by all passes over the parse tree.
+
+A pass subclasses Visitor and registers handlers per node class with the
+enter and leave decorators. Handlers are looked up through a table
+that maps every node class to its handlers, so dispatching a node costs
+a single dict lookup instead of a chain of isinstance checks.
+A handler registered for a base class (i.e. grammar.Node) also handles
+all of its subclasses that do not have a handler of their own.
+"""
+
+import src.parser.grammar as grammar
+from src.parser.flatTree import NodeView
+
+
+def enter(*nodeClasses):
+    """Register a method to run before the children of a node are visited."""
+
+    def register(method):
+        method.enterClasses = nodeClasses
+        return method
+
+    return register
+
+
+def leave(*nodeClasses):
+    """Register a method to run after the children of a node are visited."""
+
+    def register(method):
+        method.leaveClasses = nodeClasses
+        return method
+
+    return register
+
+
+def resolveHandlers(cls, nodeClass):
+    """Find and save the handlers of a node class for a pass using the node MRO."""
+
+    handlers = [None, None]
+    for base in nodeClass.__mro__:
+        if handlers[0] is None:
+            handlers[0] = cls.enterHandlers.get(base)
+        if handlers[1] is None:
+            handlers[1] = cls.leaveHandlers.get(base)
+
+    cls.table[nodeClass] = handlers = tuple(handlers)
+    return handlers
+
+
+class Visitor:
+    """Base class for a pass over the parse tree."""
+
+    # Maps node classes to (enter handler, leave handler)
+    table = {}
+
+    # Handlers registered by this pass and its bases, per node class
+    enterHandlers = {}
+    leaveHandlers = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        cls.enterHandlers = dict(cls.enterHandlers)
+        cls.leaveHandlers = dict(cls.leaveHandlers)
+
+        for method in vars(cls).values():
+            for nodeClass in getattr(method, "enterClasses", ()):
+                cls.enterHandlers[nodeClass] = method
+            for nodeClass in getattr(method, "leaveClasses", ()):
+                cls.leaveHandlers[nodeClass] = method
+
+        # Precompute the handlers of every node class of the grammar
+        cls.table = {}
+        for nodeClass in (*grammar.nodes.values(), *grammar.terminals.values()):
+            if nodeClass not in cls.table:
+                resolveHandlers(cls, nodeClass)
+
+    @classmethod
+    def resolve(cls, nodeClass):
+        """Find and save the handlers of a node class."""
+
+        return resolveHandlers(cls, nodeClass)
+
+    def visit(self, node):
+        """
+        Visit a node of the parse tree and every node below it.
+        The tree is walked with an explicit stack. A leave handler is pushed
+        below the children of its node, so it runs once they are all visited.
+        """
+
+        stack = [(node, None)]
+
+        while stack:
+            node, leaveHandler = stack.pop()
+
+            if leaveHandler is not None:
+                leaveHandler(self, node)
+                continue
+
+            if isinstance(node, list):
+                stack.extend((child, None) for child in reversed(node))
+                continue
+
+            nodeClass = node.__class__
+            if nodeClass is NodeView:
+                nodeClass = node.kind
+
+            try:
+                enterHandler, leaveHandler = self.table[nodeClass]
+            except KeyError:
+                enterHandler, leaveHandler = self.resolve(nodeClass)
+
+            if enterHandler is not None:
+                enterHandler(self, node)
+
+            if leaveHandler is not None:
+                stack.append((node, leaveHandler))
+
+            if hasattr(node, "children"):
+                stack.extend((child, None) for child in reversed(node.children))
+
+
+class FusedVisitor(Visitor):
+    """
+    Run several passes in a single traversal of the parse tree.
+    For every node, the enter handlers and then the leave handlers
+    of the passes run in the order the passes were given.
+    """
+
+    def __init__(self, *passes):
+        self.passes = passes
+        self.table = {}
+
+    # pylint: disable=arguments-differ
+    def resolve(self, nodeClass):
+        """Combine the handlers of every pass for a node class."""
+
+        enters = []
+        leaves = []
+        for visitor in self.passes:
+            try:
+                enterHandler, leaveHandler = visitor.table[nodeClass]
+            except KeyError:
+                enterHandler, leaveHandler = visitor.resolve(nodeClass)
+
+            if enterHandler is not None:
+                enters.append((enterHandler, visitor))
+            if leaveHandler is not None:
+                leaves.append((leaveHandler, visitor))
+
+        self.table[nodeClass] = handlers = (combine(enters), combine(leaves))
+        return handlers
+
+
+def combine(handlers):
+    """Combine the handlers of several passes into a single handler."""
+
+    if not handlers:
+        return None
+
+    def run(_, node):
+        for handler, visitor in handlers:
+            handler(visitor, node)
+
+    return run
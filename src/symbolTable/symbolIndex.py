@@ -0,0 +1,99 @@
+"""
+Persistent index of the global functions of a multi-file build.
+
+The index is a sqlite database that records every function defined in
+the compiled files: its name, its arity and the file it is defined in.
+Compiling a file only replaces the rows of that file, so calls to
+functions of other files can be checked without parsing those files again.
+"""
+
+import os
+import sqlite3
+from src.util import CompilerMessage
+
+schema = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    modified REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS functions (
+    name TEXT PRIMARY KEY,
+    arity INTEGER NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS functionsByPath ON functions (path);
+"""
+
+
+class SymbolIndex:
+    """A cross-file index of function definitions stored in a sqlite database."""
+
+    def __init__(self, filename):
+        try:
+            self.connection = sqlite3.connect(filename)
+            self.connection.executescript(schema)
+        except sqlite3.Error as err:
+            raise CompilerMessage(f"Cannot open the symbol index '{filename}': {err}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Close the database."""
+
+        self.connection.close()
+
+    def isCurrent(self, path):
+        """Check if the index is up to date with the last change to a file."""
+
+        row = self.connection.execute(
+            "SELECT modified FROM files WHERE path = ?", (os.path.abspath(path),)
+        ).fetchone()
+
+        return row is not None and row[0] == os.path.getmtime(path)
+
+    def find(self, name):
+        """Return the (arity, path) of a function, or None if it is not indexed."""
+
+        return self.connection.execute(
+            "SELECT arity, path FROM functions WHERE name = ?", (name,)
+        ).fetchone()
+
+    def externals(self, path):
+        """Return the arity of every function defined outside of a file."""
+
+        rows = self.connection.execute(
+            "SELECT name, arity FROM functions WHERE path != ? ORDER BY name",
+            (os.path.abspath(path),),
+        )
+
+        return dict(rows)
+
+    def update(self, path, functions):
+        """
+        Replace the functions defined in a file.
+        functions maps the name of every function in the file to its arity.
+        """
+
+        path = os.path.abspath(path)
+
+        with self.connection:
+            for name in functions:
+                row = self.find(name)
+                if row is not None and row[1] != path:
+                    raise CompilerMessage(
+                        f"Function {name} is already defined in '{row[1]}'."
+                    )
+
+            self.connection.execute("DELETE FROM functions WHERE path = ?", (path,))
+            self.connection.executemany(
+                "INSERT INTO functions (name, arity, path) VALUES (?, ?, ?)",
+                [(name, arity, path) for name, arity in functions.items()],
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files (path, modified) VALUES (?, ?)",
+                (path, os.path.getmtime(path)),
+            )
@@ -3,215 +3,312 @@ Contains the Symbol Table class.
 """
 
 import src.parser.grammar as grammar
+from src.parser.visitor import Visitor, enter, leave
 from src.util import CompilerMessage
 
+# Kinds of symbols stored in the shadow stacks
+VARIABLE = "variable"
+FUNCTION = "function"
+LABEL = "label"
+
+
+class Scope:
+    """A scope of the program, holding the symbols declared directly in it."""
+
+    __slots__ = (
+        "name",
+        "parent",
+        "arity",
+        "variables",
+        "labels",
+        "children",
+        "declared",
+    )
+
+    def __init__(self, name, parent=None, arity=None):
+        self.name = name
+        self.parent = parent
+        self.arity = arity
+        self.variables = {}
+        self.labels = {}
+
+        # Maps the names of nested scopes to their scope ids
+        self.children = {}
+
+        # Names pushed onto the shadow stacks while this scope was open
+        self.declared = []
+
 
 class SymbolTable:
-    """Symbol Table that represents all variables and their scopes in the program."""
+    """
+    Symbol Table that represents all variables and their scopes in the program.
+
+    Every name maps to a shadow stack of (scope id, symbol) entries, where the
+    last entry belongs to the innermost open scope that declares the name.
+    Entering a scope only pushes it on the scope stack, and leaving it pops
+    the entries it declared, so looking up a name is a single dict access.
+    """
 
     def __init__(self):
-        self.table = {}
-        self.table["name"] = "global"
-        self.table["variables"] = {}
-        self.table["labels"] = {}
-        self.current = self.table
-        self.level = 0
-
-    def startScope(self, name, level):
+        self.scopes = [Scope("global")]
+        self.symbols = {}
+
+        # Ids of the open scopes, the innermost last
+        self.open = [0]
+
+        # Maps the names of the scopes in the global scope to their scope ids
+        self.functions = self.scopes[0].children
+
+        # Arity of the functions defined in other files
+        self.externals = {}
+
+        # The nested dicts of table, until a declaration changes them
+        self.cachedTable = None
+
+    @property
+    def current(self):
+        """The innermost open scope."""
+
+        return self.scopes[self.open[-1]]
+
+    def push(self, name, symbol):
+        """Push a symbol for a name declared in the current scope."""
+
+        scopeId = self.open[-1]
+        self.symbols.setdefault(name, []).append((scopeId, symbol))
+        self.scopes[scopeId].declared.append(name)
+        self.cachedTable = None
+
+    def startScope(self, name, arity=None):
         """Initialize a new scope."""
 
-        if name in self.current:
+        parent = self.current
+        if name in parent.children:
             raise CompilerMessage(f"Scope with name {name} already exists.")
 
-        # Add the new scope dict
-        self.current[name] = {}
-        self.current[name]["name"] = name
+        # The scope name is visible from the parent scope onwards
+        self.push(name, FUNCTION)
+
+        scopeId = parent.children[name] = len(self.scopes)
+        self.scopes.append(Scope(name, self.open[-1], arity))
+        self.open.append(scopeId)
 
-        # Initialize the dict with a .. and variables entry
-        self.current[name][".."] = self.current
-        self.current[name]["variables"] = {}
-        self.current[name]["labels"] = {}
+        # Within the scope, its own name resolves to the scope itself
+        self.push(name, FUNCTION)
 
-        # Update the current pointer
-        self.current = self.current[name]
+    def declareExternal(self, name, arity):
+        """Declare a function defined in another file in the global scope."""
 
-        # Set the current level of scope
-        self.level = level
+        self.externals[name] = arity
+        self.scopes[0].declared.append(name)
+        self.symbols.setdefault(name, []).append((0, FUNCTION))
 
     def declareVariable(self, t, name):
         """Declare a new variable in the current scope."""
 
-        if name in self.current["variables"]:
+        if name in self.current.variables:
             raise CompilerMessage(f"Variable with name '{name}' already exists.")
 
         # Add the variable to the current scope
-        self.current["variables"][name] = t
+        self.current.variables[name] = t
+        self.push(name, VARIABLE)
 
     def useLabel(self, name):
         """Add a new label to the label list as unverified."""
 
-        if name not in self.current["labels"]:
-            self.current["labels"][name] = False
+        if name not in self.current.labels:
+            self.current.labels[name] = False
+            self.push(name, LABEL)
 
     def declareLabel(self, name):
         """Add a new label to the label list as verified."""
 
-        if name in self.current["labels"] and self.current["labels"][name] is True:
+        labels = self.current.labels
+        if labels.get(name) is True:
             raise CompilerMessage(f"Label with name '{name}' already exists.")
 
-        self.current["labels"][name] = True
+        if name not in labels:
+            self.push(name, LABEL)
+        labels[name] = True
+        self.cachedTable = None
 
     def endScope(self):
-        """Finalize a scope and return it's parent scope."""
+        """Finalize a scope and return to it's parent scope."""
 
-        # Go back up one scope
-        if ".." in self.current:
-            self.current = self.current[".."]
+        # The global scope is never closed
+        if len(self.open) == 1:
+            return
 
-    def find(self, name):
-        """Find the specified variable in the Symbol Table, starting from the current scope."""
+        # Pop the entries of every name declared in this scope
+        for name in self.scopes[self.open.pop()].declared:
+            entries = self.symbols[name]
+            entries.pop()
+            if not entries:
+                del self.symbols[name]
 
-        c = self.current
+    def lookup(self, name):
+        """Return the (scope id, symbol) entry visible for a name, or None."""
 
-        # Search the global table first
-        if c == self.table:
-            if name in c["variables"] or name in c or name in c["labels"]:
-                return self.table["name"]
+        entries = self.symbols.get(name)
+        return entries[-1] if entries else None
 
+    def find(self, name):
+        """Find the name of the innermost scope declaring a name, or None."""
+
+        entries = self.symbols.get(name)
+        if not entries:
             return None
 
-        # Search up the tree from our current scope
-        # as long as there is a parent
-        while ".." in c:
-            if name in c["variables"] or c["name"] == name or name in c["labels"]:
-                return c["name"]
+        return self.scopes[entries[-1][0]].name
+
+    def arity(self, function):
+        """Return the arity of a function, or None if it is unknown."""
+
+        if function in self.functions:
+            return self.scopes[self.functions[function]].arity
+
+        return self.externals.get(function)
+
+    def definitions(self):
+        """Return the arity of every function defined in the global scope."""
+
+        return {
+            name: self.scopes[scopeId].arity for name, scopeId in self.functions.items()
+        }
 
-            # Loop will break without checking global scope
-            # So check if the parent is global scope before exiting
-            if c[".."] == self.table:
-                if name in self.table["variables"] or name in self.table:
-                    return self.table["name"]
+    def variables(self, function):
+        """Return the variables declared in the scope of a function."""
 
-                return None
+        return self.scopes[self.functions[function]].variables
 
-            c = c[".."]
+    def view(self, scopeId=0, parent=None):
+        """
+        Build the nested dict representation of a scope and its children,
+        with the name, .., variables and labels keys of each scope.
+        """
 
-        # Not found in any scope, return False
-        return None
+        scope = self.scopes[scopeId]
 
-    def print(self, node=None, level=0):
+        node = {"name": scope.name}
+        if parent is not None:
+            node[".."] = parent
+        node["variables"] = dict(scope.variables)
+        node["labels"] = dict(scope.labels)
+
+        for name, childId in scope.children.items():
+            node[name] = self.view(childId, node)
+
+        return node
+
+    @property
+    def table(self):
+        """The symbol table as nested dicts, built once after every change."""
+
+        if self.cachedTable is None:
+            self.cachedTable = self.view()
+
+        return self.cachedTable
+
+    def print(self, scopeId=0, level=0):
         """Pretty print the symbol table."""
 
-        if not node:
-            node = self.table
+        scope = self.scopes[scopeId]
 
         grammar.printPrefix(level)
-        print(f"{node['name']}: {node['variables']}, {node['labels']}")
+        print(f"{scope.name}: {scope.variables}, {scope.labels}")
 
-        for key in node:
-            if key not in ["name", "variables", "..", "labels"]:
-                self.print(node[key], level + 1)
+        for childId in scope.children.values():
+            self.print(childId, level + 1)
 
     def __str__(self):
         return str(self.table)
 
-    def verifyLabels(self, c=None):
+    def verifyLabels(self):
         """Check for used but undeclared labels."""
 
-        if c is None:
-            c = self.table
-
-        if c["labels"] is not False:
-            for l in c["labels"]:
-                if c["labels"][l] is False:
+        # Scopes are numbered in the order they are opened,
+        # so this visits them in the same order as a depth first walk
+        for scope in self.scopes:
+            for l in scope.labels:
+                if scope.labels[l] is False:
                     raise CompilerMessage(f"The label {l} was used but never declared.")
 
-        for key in c:
-            if key not in ["name", "variables", "..", "labels"]:
-                self.verifyLabels(c[key])
 
-
-def flattenTree(root, reducer, seen=False):
+def flattenTree(root, reducer):
     """
     Collapse recursive rules to have a single parent.
     The grammar rule to collapse should be specified in reducer.
     i.e. DeclarationList or StatementList.
+
+    The tree is walked with an explicit stack, so deep trees
+    do not run into the recursion limit.
     """
 
     # TODO: fix collapsing nested recursive rules
 
-    if isinstance(root, reducer):
-        if not seen:
-            seen = True
-
-            if len(root.children) <= 1:
-                return root
-
-            c = flattenTree(root.children[0], reducer, seen)
+    stack = [root]
 
-            root.children = [root.children[1]]
+    while stack:
+        node = stack.pop()
 
-            if isinstance(c, list):
-                for i in c:
-                    root.children.append(i)
-            else:
-                root.children.append(c)
+        if isinstance(node, reducer):
+            # The items of a reducer are not descended into
+            collapseRule(node, reducer)
+        elif isinstance(node, list):
+            stack.extend(node)
+        elif hasattr(node, "children"):
+            # Current node is not a reducer, we just want to descend the parse tree
+            node.children = list(node.children)
+            stack.extend(node.children)
 
-            root.children.reverse()
-
-            return root
-
-        if len(root.children) == 1:
-            # This is a DecList that only has a Dec child, no recurse
-            return root.children[0]
+    return root
 
-        # Save the sibling
-        dec = root.children[1]
 
-        # Recurse on the DecList
-        children = flattenTree(root.children[0], reducer, seen)
+def collapseRule(root, reducer):
+    """
+    Collapse a chain of recursive rules into the children of its top node.
+    i.e. DecList(DecList(DecList(Dec1), Dec2), Dec3) becomes DecList(Dec1, Dec2, Dec3)
+    """
 
-        c = [dec]
+    if len(root.children) <= 1:
+        return
 
-        if isinstance(children, list):
-            for i in children:
-                c.append(i)
-        else:
-            c.append(children)
+    # Follow the left-recursive chain down, saving the sibling at each level
+    items = [root.children[1]]
+    chain = root.children[0]
 
-        return c
+    while isinstance(chain, reducer) and len(chain.children) == 2:
+        items.append(chain.children[1])
+        chain = chain.children[0]
 
-    # Current node is not a DecList,
-    # we just want to descend the parse tree
-    if isinstance(root, list):
-        for item in root:
-            flattenTree(item, reducer, seen)
+    if isinstance(chain, reducer):
+        # This is a DecList that only has a Dec child
+        items.append(chain.children[0])
+    else:
+        items.append(chain)
 
-    # Current node is not a DecList,
-    # but we will need to update its children reference
-    if hasattr(root, "children"):
-        children = []
-        for item in root.children:
-            children.append(flattenTree(item, reducer, seen))
+    items.reverse()
+    root.children = items
 
-        if isinstance(children, list) and len(children) >= 1:
-            if isinstance(children[0], list):
-                children = children[0]
 
-        root.children = children
-        return root
+def functionArity(node):
+    """Count the arguments of a function declaration, where f(void) has none."""
 
-    # Not a reducer node, not a list, not a "complex" node
-    # Just return it to be appended as a child
-    return root
+    return sum(1 for argument in node.arguments.children if argument.name != "None")
 
 
-def buildSymbolTable(parseTree):
-    """Given the parse tree, build a symbol table."""
+def buildSymbolTable(parseTree, externals=None):
+    """
+    Given the parse tree, build a symbol table.
+    externals maps the functions defined in other files to their arity.
+    """
 
     # Build the symbol table
     st = SymbolTable()
-    visitChildren(parseTree, st)
+    for name, arity in (externals or {}).items():
+        st.declareExternal(name, arity)
+
+    SymbolTableBuilder(st).visit(parseTree)
 
     # Verify all labels are valid
     st.verifyLabels()
@@ -219,35 +316,42 @@ def buildSymbolTable(parseTree):
     return st
 
 
-def visitChildren(node, st, level=0):
-    """Visit each node of the parse tree."""
-
-    # Update the symbol table for every visited node
-    updateSymbolTable(node, st, level)
-
-    if hasattr(node, "children"):
-        for child in node.children:
-            visitChildren(child, st, level + 1)
-    elif isinstance(node, list):
-        for child in node:
-            visitChildren(child, st, level + 1)
-
-
-def updateSymbolTable(node, st, level=0):
-    """Check if symbol table should be updated based on node."""
-
-    if isinstance(node, grammar.FunctionDeclaration):
-        if st.level == level:
-            st.endScope()
-        st.startScope(node.name, level)
-    elif isinstance(node, grammar.VariableDeclaration):
-        st.declareVariable(node.type, node.name)
-    elif isinstance(node, grammar.Argument):
-        st.declareVariable(node.type, node.name)
-    elif isinstance(node, grammar.GotoStatement):
-        st.useLabel(node.children[0].value)
-    elif isinstance(node, grammar.LabelDeclaration):
-        st.declareLabel(node.children[0].value)
-    elif isinstance(node, grammar.Identifier):
-        if st.find(node.value) is None:
+class SymbolTableBuilder(Visitor):
+    """Visit each node of the parse tree and update the symbol table."""
+
+    def __init__(self, st):
+        self.st = st
+
+    @enter(grammar.FunctionDeclaration)
+    def enterFunction(self, node):
+        self.st.startScope(node.name, functionArity(node))
+
+    @leave(grammar.FunctionDeclaration)
+    def leaveFunction(self, _):
+        self.st.endScope()
+
+    @enter(grammar.VariableDeclaration, grammar.Argument)
+    def enterDeclaration(self, node):
+        self.st.declareVariable(node.type, node.name)
+
+    @enter(grammar.CallStatement)
+    def enterCall(self, node):
+        arity = self.st.arity(node.name)
+        if arity is not None and arity != len(node.parameters.children):
+            raise CompilerMessage(
+                f"Function {node.name} takes {arity} arguments "
+                f"but {len(node.parameters.children)} were given."
+            )
+
+    @enter(grammar.GotoStatement)
+    def enterGoto(self, node):
+        self.st.useLabel(node.children[0].value)
+
+    @enter(grammar.LabelDeclaration)
+    def enterLabel(self, node):
+        self.st.declareLabel(node.children[0].value)
+
+    @enter(grammar.Identifier)
+    def enterIdentifier(self, node):
+        if self.st.find(node.value) is None:
             raise CompilerMessage(f"Identifier {node.value} is undefined.")
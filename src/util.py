@@ -2,14 +2,38 @@
 Utility functions to be re-used across modules.
 """
 
+import contextlib
+import contextvars
 import os
 
 
+class Interner:
+    """
+    Give every name of a compilation (identifiers, temps and labels)
+    a single canonical string.
+
+    Phases key their tables on the canonical strings: their hashes are
+    computed once, and dict lookups compare them by identity.
+    """
+
+    def __init__(self):
+        self.names = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name):
+        """Return the canonical string of a name, adding it if needed."""
+
+        return self.names.setdefault(name, name)
+
+
 class Unique:
     """Class to contain unique values."""
 
-    def __init__(self):
+    def __init__(self, interner=None):
         self.count = {"none": 0}
+        self.interner = interner if interner is not None else Interner()
 
     def get(self, k):
         """Get a count for a unique value."""
@@ -26,13 +50,10 @@ class Unique:
             if prefix not in self.count:
                 self.count[prefix] = 0
             self.count[prefix] += 1
-            return f"{prefix}{self.count[prefix]}"
+            return self.interner.intern(f"{prefix}{self.count[prefix]}")
 
         self.count["none"] += 1
-        return f"r{self.count['none']}"
-
-
-unique = Unique()
+        return self.interner.intern(f"r{self.count['none']}")
 
 
 def readFile(filename):
@@ -40,7 +61,9 @@ def readFile(filename):
 
     try:
         with open(filename) as file:
-            messages.add(CompilerMessage(f"Read file: '{filename}'.", "success"))
+            current().messages.add(
+                CompilerMessage(f"Read file: '{filename}'.", "success")
+            )
             return file.read()
     except IOError:
         raise CompilerMessage(f"Cannot read file: {filename}.")
@@ -55,9 +78,11 @@ def writeFile(filename, content=None):
     try:
         with open(filename, "x") as file:
             file.write(str(content))
-            messages.add(CompilerMessage(f"Wrote to file: '{filename}'.", "success"))
+            current().messages.add(
+                CompilerMessage(f"Wrote to file: '{filename}'.", "success")
+            )
     except FileExistsError:
-        messages.add(
+        current().messages.add(
             CompilerMessage(f"The file '{filename}' already exists.", "warning")
         )
         choice = input("Overwrite it? [y/n]: ")
@@ -65,13 +90,13 @@ def writeFile(filename, content=None):
             try:
                 with open(filename, "w") as file:
                     file.write(str(content))
-                    messages.add(
+                    current().messages.add(
                         CompilerMessage(f"Wrote to file: '{filename}'.", "success")
                     )
             except IOError:
                 raise CompilerMessage(f"Error overwriting file: '{filename}'.")
         else:
-            messages.add(
+            current().messages.add(
                 CompilerMessage(f"Did not overwrite the file '{filename}'.", "warning")
             )
 
@@ -88,7 +113,7 @@ def ensureDirectory(path):
 
     # Ensure the directory exists.
     if not os.path.exists(f"{path}/"):
-        messages.add(
+        current().messages.add(
             CompilerMessage(f"No '{path}' directory found, creating one.", "warning")
         )
         os.makedirs(path)
@@ -97,14 +122,16 @@ def ensureDirectory(path):
 class MessageCollector:
     """A collector class that hold compiler messages."""
 
-    def __init__(self):
+    def __init__(self, echo=True):
         self.messages = []
+        self.echo = echo
 
     def add(self, message):
-        """Add a new message to the collector, and print it."""
+        """Add a new message to the collector, and print it unless told otherwise."""
 
         self.messages.append(message)
-        print(message)
+        if self.echo:
+            print(message)
 
     def print(self):
         """Print all the messages in the collector."""
@@ -138,4 +165,40 @@ class CompilerMessage(Exception):
         return f"{bold}{error}✖ Error:{reset} {self.message}"
 
 
-messages = MessageCollector()
+class CompilationContext:
+    """
+    The state owned by a single compilation: its options, the counters for
+    temps and labels, the interned names and the diagnostics.
+
+    Compilations with separate contexts do not interfere, so several files
+    can be compiled in one process, i.e. from a thread pool.
+    """
+
+    def __init__(self, options=None):
+        self.options = dict(options) if options else {}
+        self.interner = Interner()
+        self.unique = Unique(self.interner)
+        self.messages = MessageCollector(echo=self.options.get("echo", True))
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Make this the current context for the duration of a with block."""
+
+        token = currentContext.set(self)
+        try:
+            yield self
+        finally:
+            currentContext.reset(token)
+
+
+# Used by code that runs outside of any activated context
+defaultContext = CompilationContext()
+
+# Every thread and asyncio task sees its own current context
+currentContext = contextvars.ContextVar("currentContext", default=defaultContext)
+
+
+def current():
+    """Return the context of the compilation that is running."""
+
+    return currentContext.get()
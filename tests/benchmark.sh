@@ -0,0 +1,32 @@
+# Time a program that divides by constants against the same program
+# dividing by a variable, which still uses idivl. Reports the fastest of
+# five runs of each.
+
+mkdir -p assembly
+
+for NAME in constant_division variable_division
+do
+	CFILE=tests/benchmarks/$NAME.c
+	SFILE=assembly/$NAME.s
+
+	rm -f $SFILE
+	python3 -m src.main -n $SFILE $CFILE > /dev/null
+	gcc $SFILE -o assembly/$NAME 2> /dev/null
+
+	best=""
+	for RUN in 1 2 3 4 5
+	do
+		start=$(date +%s%N)
+		./assembly/$NAME
+		result=$?
+		end=$(date +%s%N)
+
+		time=$(( (end - start) / 1000000 ))
+		if [ -z "$best" ] || [ $time -lt $best ]
+		then
+			best=$time
+		fi
+	done
+
+	echo "$NAME: returned $result in $best ms"
+done
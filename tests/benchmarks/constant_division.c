@@ -0,0 +1,17 @@
+int digitSum(int count) {
+    int sum = 0;
+    int i = 0;
+    while (i < count) {
+        int n = i;
+        while (n > 0) {
+            sum = sum + n % 10;
+            n = n / 10;
+        }
+        i = i + 1;
+    }
+    return sum;
+}
+
+int main() {
+    return digitSum(5000000) % 251;
+}
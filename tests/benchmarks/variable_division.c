@@ -0,0 +1,17 @@
+int digitSum(int count, int base) {
+    int sum = 0;
+    int i = 0;
+    while (i < count) {
+        int n = i;
+        while (n > 0) {
+            sum = sum + n % base;
+            n = n / base;
+        }
+        i = i + 1;
+    }
+    return sum;
+}
+
+int main() {
+    return digitSum(5000000, 10) % 251;
+}
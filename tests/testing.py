@@ -5,8 +5,157 @@ Each test case has an accompanying class.
 Each have methods such as: test_lexer, test_parser & test_symbolTable
 """
 
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import io
+import json
+import os
+import tempfile
 import unittest
-from src.main import Compiler
+from unittest import mock
+from src.main import Compiler, parseArguments
+from src.parser.lrParser import splitDeclarations
+import src.parser.grammar as grammar
+from src.parser.flatTree import FlatTree
+from src.symbolTable.symbolTable import SymbolTable, buildSymbolTable
+from src.symbolTable.symbolIndex import SymbolIndex
+from src.parser.visitor import Visitor, enter, leave
+from src.ir.ir import generateFused, readJson
+from src.ir.instructions import (
+    Opcode,
+    Kind,
+    Operand,
+    Instruction,
+    Binary,
+    Tagged,
+    fromList,
+    opcodeOf,
+    rewrite,
+)
+from src.ir.cfg import BasicBlock, ControlFlowGraph, blockLabels
+from src.ir.ssa import DominatorTree, destructSsa, phis, sequentialize
+from src.ir.constants import (
+    evaluate,
+    evaluateUnary,
+    foldConstants,
+    isConstant,
+    simplify,
+    wrap,
+)
+from src.ir.deadCode import Liveness
+from src.ir.copies import propagateCopies
+from src.ir.valueNumbering import numberValues
+from src.ir.loops import hoistInvariants, naturalLoops
+from src.ir.strength import (
+    inductionVariables,
+    powerOfTwo,
+    reducePower,
+    reduceStrength,
+)
+from src.ir.inliner import bottomUp, callGraph, inlineCalls, recursiveFunctions
+from src.ir.tailCalls import eliminateTailCalls
+from src.assembler.assembler import magicNumber
+from src.util import CompilationContext, CompilerMessage, current
+import src.lexer.tokens as tokens
+from src.parser.treeWriter import dumpTree
+
+
+def treeShape(node):
+    """Describe a parse tree as nested tuples of class names and values."""
+
+    children = tuple(treeShape(child) for child in getattr(node, "children", []))
+    return (node.__class__.__name__, getattr(node, "value", None), children)
+
+
+def interpret(ir, name, arguments):
+    """Run a function of an IR dict on a list of arguments and return its result."""
+
+    function = ir[name]
+    blocks = function["blocks"]
+    positions = {
+        label: index
+        for index, block in enumerate(blocks)
+        for label in blockLabels(block)
+    }
+    values = dict(zip(function["arguments"], arguments))
+
+    def value(operand):
+        return int(operand) if isConstant(operand) else values[operand]
+
+    index, previous = 0, None
+    while index < len(blocks):
+        block = blocks[index]
+
+        # Phis read their operands at once, from the edge that was taken
+        values.update(
+            {
+                phi[1]: value(operand[1])
+                for phi in phis(block)
+                for operand in phi[3]
+                if operand[0] == previous
+            }
+        )
+
+        target = None
+        for ins in block.instructions:
+            op = opcodeOf(ins)
+            if op == Opcode.COPY:
+                values[ins[0]] = value(ins[2])
+            elif op == Opcode.UNARY:
+                values[ins[0]] = evaluateUnary(ins[2], value(ins[3]))
+            elif op == Opcode.BINARY:
+                values[ins[0]] = evaluate(ins[3], value(ins[2]), value(ins[4]))
+            elif op == Opcode.CALL:
+                values[ins[1]] = interpret(ir, ins[3], [value(a) for a in ins[4]])
+            elif op == Opcode.RETURN:
+                return value(ins[1])
+            elif op == Opcode.GOTO:
+                target = ins[1]
+                break
+            elif op == Opcode.BRANCH:
+                target = ins[3] if value(ins[1]) else ins[6]
+                break
+
+        previous = block.label
+        index = index + 1 if target is None else positions[target]
+
+    return 0
+
+
+def compileFile(filename, options=None):
+    """Generate the IR of a file, with extra compiler options."""
+
+    compiler = Compiler({"filename": filename, "echo": False, **(options or {})})
+    compiler.tokenize()
+    compiler.parse()
+    compiler.buildSymbolTable()
+    compiler.generateIr()
+
+    return compiler
+
+
+def compileCode(code, options=None):
+    """Generate the IR of the source of a program, with extra compiler options."""
+
+    with tempfile.NamedTemporaryFile("w", suffix=".c", delete=False) as file:
+        file.write(code)
+
+    try:
+        return compileFile(file.name, options)
+    finally:
+        os.remove(file.name)
+
+
+def instructionsOf(function):
+    """Return every instruction of a function of an IR dict."""
+
+    return [ins for block in function["blocks"] for ins in block.instructions]
+
+
+def callsOf(function):
+    """Return the names of the functions a function of an IR dict calls."""
+
+    return [ins[3] for ins in instructionsOf(function) if ins[0] == "call"]
 
 
 class ArgumentsTestCase(unittest.TestCase):
@@ -1144,5 +1293,1655 @@ class WhileTestCase(unittest.TestCase):
         self.assertEqual(str(self.compiler.symbolTable), result)
 
 
+class ParallelParseTestCase(unittest.TestCase):
+    """Test parsing top-level declarations in worker processes."""
+
+    @classmethod
+    def setUpClass(cls):
+        filename = "samples/multiple_functions.c"
+        cls.sequential = Compiler({"filename": filename})
+        cls.sequential.tokenize()
+        cls.sequential.parse()
+
+        cls.parallel = Compiler({"filename": filename, "jobs": 2})
+        cls.parallel.tokenize()
+        cls.parallel.parse()
+
+    def test_split(self):
+        """Test splitting the tokens at top-level declarations."""
+
+        declarations = splitDeclarations(self.sequential.tokens)
+        self.assertEqual(len(declarations), 5)
+        self.assertEqual(str(declarations[0]), "[int, foo, (, ), {, return, 0, ;, }]")
+
+    def test_parser(self):
+        """Test that both parsers produce the same parse tree."""
+
+        self.assertEqual(
+            treeShape(self.parallel.parseTree), treeShape(self.sequential.parseTree)
+        )
+
+    def test_index(self):
+        """Test that the node index of each worker is merged."""
+
+        self.assertEqual(
+            list(self.parallel.parseTree.index),
+            ["foo", "bar", "foobar", "foobiz", "main"],
+        )
+
+        # The rebuilt nodes of the workers are indexed like a sequential parse
+        def shape(program):
+            return {
+                name: {
+                    kind: list(map(treeShape, nodes)) for kind, nodes in kinds.items()
+                }
+                for name, kinds in program.index.items()
+            }
+
+        self.assertEqual(
+            shape(self.parallel.parseTree), shape(self.sequential.parseTree)
+        )
+
+
+class CompactNodeTestCase(unittest.TestCase):
+    """Test the slotted parse tree nodes."""
+
+    def test_slots(self):
+        """Test that no node class carries a __dict__."""
+
+        for kind in list(grammar.nodes.values()) + list(grammar.terminals.values()):
+            self.assertEqual(kind.__dictoffset__, 0, kind.__name__)
+
+    def test_sharedTerminals(self):
+        """Test that equal terminals are shared when a cache is given."""
+
+        cache = {}
+        a = grammar.parseToken("ID", "x", cache=cache)
+        b = grammar.parseToken("ID", "x", cache=cache)
+        c = grammar.parseToken("constNum", "x", cache=cache)
+        self.assertIs(a, b)
+        self.assertIsNot(a, c)
+
+
+class FlatTreeTestCase(unittest.TestCase):
+    """Test the array backed parse tree storage."""
+
+    @classmethod
+    def setUpClass(cls):
+        filename = "samples/goto.c"
+        cls.compiler = Compiler({"filename": filename})
+        cls.compiler.tokenize()
+        cls.compiler.parse()
+        cls.tree = FlatTree.loads(FlatTree.fromNode(cls.compiler.parseTree).dumps())
+
+    def test_toNode(self):
+        """Test rebuilding node instances from the flat tree."""
+
+        self.assertEqual(
+            treeShape(self.tree.toNode()), treeShape(self.compiler.parseTree)
+        )
+
+    def test_symbolTable(self):
+        """Test building the symbol table from a view of the flat tree."""
+
+        root = self.tree.root()
+        self.assertIs(root.kind, grammar.Program)
+        self.assertNotIsInstance(root, grammar.Program)
+
+        self.assertEqual(
+            str(buildSymbolTable(self.tree.root())),
+            str(buildSymbolTable(self.compiler.parseTree)),
+        )
+
+
+class VisitorTestCase(unittest.TestCase):
+    """Test the table based visitor dispatch."""
+
+    def test_dispatch(self):
+        """Test that handlers are found through the node class hierarchy."""
+
+        class Counter(Visitor):
+            def __init__(self):
+                self.order = []
+
+            @enter(grammar.MathExpression)
+            def enterMath(self, node):
+                self.order.append(f"enter {node}")
+
+            @leave(grammar.Node)
+            def leaveNode(self, node):
+                self.order.append(f"leave {node}")
+
+        # Every node class of the grammar is resolved up front
+        classes = {*grammar.nodes.values(), *grammar.terminals.values()}
+        self.assertEqual(set(Counter.table), classes)
+
+        tree = grammar.AdditionExpression(
+            [grammar.ConstNum("1"), grammar.Identifier("x")]
+        )
+        counter = Counter()
+        counter.visit(tree)
+
+        self.assertEqual(Counter.table[grammar.BitAnd][0], Counter.enterMath)
+        self.assertEqual(
+            counter.order,
+            [
+                "enter AdditionExpression",
+                "leave ConstNum",
+                "leave Identifier",
+                "leave AdditionExpression",
+            ],
+        )
+
+
+class DeepNestingTestCase(unittest.TestCase):
+    """Test compiling code nested deeper than the Python recursion limit."""
+
+    @classmethod
+    def setUpClass(cls):
+        depth = 1200
+        code = "int one() {\nreturn 1;\n}\n\nint main() {\nint x = 0;\n"
+        code += "if (x < 5) {\nwhile (x < 3) {\n" * (depth // 2)
+        code += "x++;\n" + "}\n" * depth + "return x;\n}\n"
+
+        with tempfile.NamedTemporaryFile("w", suffix=".c", delete=False) as file:
+            file.write(code)
+            cls.filename = file.name
+
+        cls.compiler = Compiler({"filename": cls.filename})
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.filename)
+
+    def test_ir(self):
+        """Test generating an IR for the deeply nested program."""
+
+        self.compiler.tokenize()
+        self.compiler.parse()
+        self.compiler.buildSymbolTable()
+        self.assertTrue(self.compiler.generateIr())
+
+    def test_parallel(self):
+        """Test sending the deeply nested tree back from a worker process."""
+
+        sequential = Compiler({"filename": self.filename, "echo": False})
+        parallel = Compiler({"filename": self.filename, "echo": False, "jobs": 2})
+        for compiler in (sequential, parallel):
+            compiler.tokenize()
+            compiler.parse()
+
+        self.assertEqual(dumpTree(parallel.parseTree), dumpTree(sequential.parseTree))
+
+
+class NodeIndexTestCase(unittest.TestCase):
+    """Test the index of node classes recorded while parsing."""
+
+    @classmethod
+    def setUpClass(cls):
+        filename = "samples/arguments.c"
+        cls.compiler = Compiler({"filename": filename})
+        cls.compiler.tokenize()
+        cls.compiler.parse()
+
+    def test_function(self):
+        """Test finding the nodes of a class within one function."""
+
+        program = self.compiler.parseTree
+        calls = program.find(grammar.CallStatement, "main")
+        self.assertEqual([call.name for call in calls], ["sum"] * 5)
+        self.assertEqual(program.find(grammar.CallStatement, "sum"), [])
+
+    def test_program(self):
+        """Test finding the nodes of a class across the whole program."""
+
+        program = self.compiler.parseTree
+        functions = program.find(grammar.FunctionDeclaration)
+        self.assertEqual([function.name for function in functions], ["sum", "main"])
+        self.assertNotIn("global", program.index)
+
+
+class ScopeStackTestCase(unittest.TestCase):
+    """Test the shadow stacks of the symbol table."""
+
+    def test_shadowing(self):
+        """Test that inner declarations shadow outer ones until their scope ends."""
+
+        st = SymbolTable()
+        st.declareVariable("int", "a")
+        st.startScope("main")
+        self.assertEqual(st.find("a"), "global")
+        self.assertEqual(st.find("main"), "main")
+
+        st.declareVariable("int", "a")
+        self.assertEqual(st.find("a"), "main")
+
+        st.endScope()
+        self.assertEqual(st.find("a"), "global")
+        self.assertEqual(st.find("main"), "global")
+        self.assertIsNone(st.find("b"))
+
+    def test_reservedNames(self):
+        """Test that keys of the dict view can be used as names."""
+
+        st = SymbolTable()
+        st.startScope("variables")
+        st.declareVariable("int", "labels")
+        st.endScope()
+
+        self.assertEqual(st.variables("variables"), {"labels": "int"})
+        self.assertEqual(st.find("variables"), "global")
+        self.assertEqual(st.scopes[0].variables, {})
+
+    def test_table(self):
+        """Test that the nested dicts are rebuilt only after a change."""
+
+        st = SymbolTable()
+        st.startScope("main")
+        st.useLabel("out")
+
+        table = st.table
+        self.assertIs(st.table, table)
+        self.assertEqual(table["main"]["labels"], {"out": False})
+
+        st.declareLabel("out")
+        self.assertIsNot(st.table, table)
+        self.assertEqual(st.table["main"]["labels"], {"out": True})
+
+        st.declareVariable("int", "x")
+        self.assertEqual(st.table["main"]["variables"], {"x": "int"})
+
+    def test_duplicates(self):
+        """Test that duplicate scopes and variables are rejected."""
+
+        st = SymbolTable()
+        st.startScope("main")
+        st.declareVariable("int", "a")
+        with self.assertRaises(CompilerMessage):
+            st.declareVariable("int", "a")
+
+        st.endScope()
+        with self.assertRaises(CompilerMessage):
+            st.startScope("main")
+
+
+class InternerTestCase(unittest.TestCase):
+    """Test interning the names of a compilation."""
+
+    def test_unique(self):
+        """Test that new temps and labels are interned in their compilation."""
+
+        context = CompilationContext()
+        label = context.unique.new("_L")
+        temp = context.unique.new()
+
+        self.assertIs(context.interner.intern("".join(["_L", "1"])), label)
+        self.assertIs(context.interner.intern("".join(["r", "1"])), temp)
+        self.assertEqual(len(context.interner), 2)
+
+        # Compilations do not share their names
+        self.assertEqual(len(CompilationContext().interner), 0)
+
+    def test_tokens(self):
+        """Test that identifiers share their strings across tokens."""
+
+        compiler = Compiler({"filename": "samples/basic_math.c"})
+        compiler.tokenize()
+
+        identifiers = {}
+        for token in compiler.tokens:
+            if token.kind is tokens.identifier:
+                name = identifiers.setdefault(token.content, token.content)
+                self.assertIs(token.content, name)
+                self.assertIs(compiler.context.interner.intern(token.content), name)
+
+        self.assertTrue(identifiers)
+
+    def test_labels(self):
+        """Test that jump targets are the interned names of their labels."""
+
+        for sample in ["samples/while.c", "samples/switch.c", "samples/continue.c"]:
+            compiler = compileFile(sample)
+            interner = compiler.context.interner
+
+            for function in compiler.ir.ir.values():
+                for ins in instructionsOf(function):
+                    if ins[0] == "if":
+                        names = [ins[3], ins[6]]
+                    elif ins[0] in ("goto", "label"):
+                        names = [ins[1]]
+                    else:
+                        continue
+
+                    for name in names:
+                        self.assertIs(interner.intern(name), name)
+
+
+class SymbolIndexTestCase(unittest.TestCase):
+    """Test checking calls against the cross-file symbol index."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index = os.path.join(self.directory.name, "index.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def compile(self, name, code):
+        """Build the symbol table of a file, using the symbol index."""
+
+        filename = os.path.join(self.directory.name, name)
+        with open(filename, "w") as file:
+            file.write(code)
+
+        compiler = Compiler({"filename": filename, "index": self.index})
+        compiler.tokenize()
+        compiler.parse()
+        return compiler.buildSymbolTable()
+
+    def test_externals(self):
+        """Test that functions of other files are visible and recorded."""
+
+        self.compile("add.c", "int add(int x, int y) {\n\treturn x + y;\n}\n")
+        self.compile("main.c", "int main() {\n\treturn add(1, 2);\n}\n")
+
+        with SymbolIndex(self.index) as index:
+            self.assertEqual(index.find("add")[0], 2)
+            self.assertEqual(index.find("main")[0], 0)
+            self.assertEqual(
+                index.externals(os.path.join(self.directory.name, "main.c")),
+                {"add": 2},
+            )
+
+    def test_arity(self):
+        """Test that calls with the wrong number of arguments are rejected."""
+
+        self.compile("add.c", "int add(int x, int y) {\n\treturn x + y;\n}\n")
+        with self.assertRaises(CompilerMessage):
+            self.compile("main.c", "int main() {\n\treturn add(1);\n}\n")
+
+    def test_duplicates(self):
+        """Test that a function cannot be defined in two files."""
+
+        self.compile("add.c", "int add(int x, int y) {\n\treturn x + y;\n}\n")
+        with self.assertRaises(CompilerMessage):
+            self.compile("other.c", "int add(int x, int y) {\n\treturn x;\n}\n")
+
+
+class CompilationContextTestCase(unittest.TestCase):
+    """Test that compilations in one process do not interfere."""
+
+    @staticmethod
+    def compile(filename):
+        """Compile a file to assembly."""
+
+        compiler = compileFile(filename)
+        compiler.assemble()
+
+        return compiler
+
+    def test_repeated(self):
+        """Test that compiling a file twice gives the same output."""
+
+        first = self.compile("samples/while.c")
+        second = self.compile("samples/while.c")
+
+        for function in first.ir.ir:
+            self.assertEqual(
+                [block.instructions for block in first.ir.ir[function]["blocks"]],
+                [block.instructions for block in second.ir.ir[function]["blocks"]],
+            )
+        self.assertEqual(first.asm, second.asm)
+        self.assertEqual(first.ir.ir["main"]["blocks"][0].label, "_L1")
+
+    def test_threads(self):
+        """Test compiling files from a thread pool."""
+
+        filenames = ["samples/while.c", "samples/switch.c", "samples/if_else.c"] * 2
+        expected = [self.compile(filename).asm for filename in filenames]
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            compilers = list(pool.map(self.compile, filenames))
+
+        self.assertEqual([compiler.asm for compiler in compilers], expected)
+
+    def test_messages(self):
+        """Test that messages are collected per compilation."""
+
+        compiler = self.compile("samples/while.c")
+        self.assertTrue(compiler.context.messages.messages)
+        self.assertIsNot(current(), compiler.context)
+
+
+class InstructionsTestCase(unittest.TestCase):
+    """Test converting IR instructions between list form and typed form."""
+
+    def test_roundtrip(self):
+        """Test that every instruction of a program converts back unchanged."""
+
+        for filename in ["samples/while.c", "samples/switch.c", "samples/call.c"]:
+            for function in compileFile(filename).ir.ir.values():
+                for ins in instructionsOf(function):
+                    self.assertEqual(fromList(ins).toList(), ins)
+
+    def test_typed(self):
+        """Test the opcodes and operand kinds of typed instructions."""
+
+        ins = fromList(["r3", "=", "a", "+", "2"])
+        self.assertEqual(ins.opcode, Opcode.BINARY)
+        self.assertEqual(ins.dest, Operand(Kind.TEMP, "r3"))
+        self.assertEqual(
+            ins.uses(), (Operand(Kind.VARIABLE, "a"), Operand(Kind.CONSTANT, "2"))
+        )
+        self.assertEqual(
+            ins,
+            Binary(Operand(Kind.TEMP, "r3"), "+", ins.lhs, Operand(Kind.CONSTANT, "2")),
+        )
+
+        branch = fromList(["if", "r1", "GOTO", "_L2", "else", "GOTO", "_L3"])
+        self.assertEqual(branch.opcode, Opcode.BRANCH)
+        self.assertEqual(branch.otherwise, Operand(Kind.LABEL, "_L3"))
+
+        call = fromList(["call", "r4", "=", "sum", ["a", "1"]])
+        self.assertEqual(call.function.kind, Kind.FUNCTION)
+        self.assertEqual(len(call.uses()), 2)
+
+        # Variables named like keywords are still assignments
+        self.assertEqual(fromList(["label", "=", "1"]).opcode, Opcode.COPY)
+
+        # Unknown shapes are rejected, not passed through
+        with self.assertRaises(CompilerMessage):
+            fromList(["break"])
+        with self.assertRaises(CompilerMessage):
+            fromList(["r1", "=", "a", "+", "b", "c"])
+
+        with self.assertRaises(TypeError):
+            Instruction()
+
+    def test_tagged(self):
+        """Test that instructions store their opcode when they are built."""
+
+        for options in [None, {"optimization": 2}, {"optimization": 2, "ssa": True}]:
+            for filename in ["samples/while.c", "samples/switch.c", "samples/call.c"]:
+                for function in compileFile(filename, options).ir.ir.values():
+                    for ins in instructionsOf(function):
+                        self.assertIs(ins.__class__, Tagged)
+                        self.assertEqual(ins.opcode, opcodeOf(list(ins)))
+
+        # Rewriting an instruction in place changes its opcode too
+        ins = Tagged(["r1", "=", "a", "*", "4"])
+        self.assertEqual(ins.opcode, Opcode.BINARY)
+        rewrite(ins, ["r1", "=", "r2"])
+        self.assertEqual(ins.opcode, Opcode.COPY)
+        self.assertEqual(ins, ["r1", "=", "r2"])
+
+        with self.assertRaises(CompilerMessage):
+            Tagged(["break"])
+
+
+class BackpatchTestCase(unittest.TestCase):
+    """Test patching the targets of jumps out of if, while and switch statements."""
+
+    @staticmethod
+    def compile(code):
+        """Generate the IR of a program and return the blocks of main."""
+
+        return compileCode(code).ir.ir["main"]["blocks"]
+
+    def test_nested(self):
+        """Test that break and continue jump out of their innermost loop."""
+
+        blocks = self.compile(
+            "int main() {\n\tint i = 0;\n\twhile (i < 5) {\n"
+            "\t\tif (i == 4) {\n\t\t\tbreak;\n\t\t}\n"
+            "\t\tint j = 0;\n\t\twhile (j < 3) {\n\t\t\tj++;\n"
+            "\t\t\tif (j == 2) {\n\t\t\t\tcontinue;\n\t\t\t}\n\t\t}\n"
+            "\t\ti++;\n\t}\n\treturn i;\n}\n"
+        )
+
+        blocks = {block.label: block.instructions for block in blocks}
+
+        # The outer condition and the break leave the outer loop
+        self.assertEqual(blocks["_L2"][-1][-1], "_L12")
+        self.assertEqual(blocks["_L4"], [["label", "_L4"], ["goto", "_L12"]])
+
+        # The inner condition leaves the inner loop, the continue goes back to it
+        self.assertEqual(blocks["_L6"][-1][-1], "_L11")
+        self.assertEqual(blocks["_L9"], [["label", "_L9"], ["goto", "_L6"]])
+
+    def test_else(self):
+        """Test that an else body of several blocks is entered at its first block."""
+
+        code = (
+            "int main() {\n\tint a = 0;\n\tint y = 0;\n"
+            "\tif (a) {\n\t\ty = 1;\n\t} else {\n\t\tint i = 0;\n"
+            "\t\twhile (i < 3) {\n\t\t\ti++;\n\t\t}\n\t\ty = i + 10;\n\t}\n"
+            "\treturn y;\n}\n"
+        )
+        ir = compileCode(code).ir.ir
+        blocks = {block.label: block.instructions for block in ir["main"]["blocks"]}
+
+        # The condition jumps to the start of the else body,
+        # and the if body skips every block of the else body
+        self.assertEqual(
+            blocks["_L2"][-1], ["if", "a", "GOTO", "_L3", "else", "GOTO", "_L4"]
+        )
+        self.assertEqual(blocks["_L3"][-1], ["goto", "_L8"])
+        self.assertEqual(blocks["_L4"][1], ["i", "=", "0"])
+        self.assertEqual(interpret(ir, "main", []), 13)
+
+    def test_outside(self):
+        """Test that break and continue outside of a loop are rejected."""
+
+        with self.assertRaises(CompilerMessage):
+            self.compile("int main() {\n\tbreak;\n\treturn 0;\n}\n")
+
+        with self.assertRaises(CompilerMessage):
+            self.compile("int main() {\n\tcontinue;\n\treturn 0;\n}\n")
+
+
+class ControlFlowGraphTestCase(unittest.TestCase):
+    """Test the control flow graph built on the basic blocks of a function."""
+
+    def test_while(self):
+        """Test the edges and the block order of a loop."""
+
+        graph = compileFile("samples/while.c").ir.ir["main"]["cfg"]
+        blocks = {block.label: block for block in graph.blocks}
+
+        self.assertIs(graph.entry, blocks["_L1"])
+        self.assertEqual(blocks["_L1"].successors, [blocks["_L2"]])
+        self.assertEqual(blocks["_L2"].successors, [blocks["_L3"], blocks["_L4"]])
+        self.assertEqual(blocks["_L2"].predecessors, [blocks["_L1"], blocks["_L3"]])
+        self.assertEqual(blocks["_L4"].successors, [graph.exit])
+
+        # Every block comes before its successors, except along back edges
+        order = graph.order
+        self.assertEqual(order[0], blocks["_L1"])
+        self.assertNotIn(blocks["_L5"], order)
+        self.assertIsNone(blocks["_L5"].order)
+        for source, target in graph.edges():
+            if target is not blocks["_L2"] and source.order is not None:
+                self.assertLess(source.order, target.order)
+
+    def test_goto(self):
+        """Test that goto labels inside a block are jump targets."""
+
+        graph = compileFile("samples/simple_goto.c").ir.ir["main"]["cfg"]
+
+        for label, block in graph.labels.items():
+            self.assertIn(["label", label], block.instructions)
+
+    def test_update(self):
+        """Test that inserting and removing blocks keeps the edges up to date."""
+
+        graph = compileFile("samples/while.c").ir.ir["main"]["cfg"]
+        blocks = {block.label: block for block in graph.blocks}
+        order = graph.order
+
+        # A block that falls through, inserted between the first two blocks
+        block = BasicBlock([["j", "=", "1"]], "_L9")
+        graph.insertBlock(1, block)
+
+        self.assertEqual(blocks["_L1"].successors, [block])
+        self.assertEqual(block.successors, [blocks["_L2"]])
+        self.assertIn(block, blocks["_L2"].predecessors)
+        self.assertIsNot(graph.order, order)
+        self.assertEqual(graph.order[:3], [blocks["_L1"], block, blocks["_L2"]])
+
+        graph.removeBlock(block)
+
+        self.assertEqual(blocks["_L1"].successors, [blocks["_L2"]])
+        self.assertNotIn(block, blocks["_L2"].predecessors)
+        self.assertNotIn("_L9", graph.labels)
+        self.assertIsNone(block.order)
+
+
+class SsaTestCase(unittest.TestCase):
+    """Test converting the IR to SSA form and back."""
+
+    @staticmethod
+    def compile(filename):
+        """Generate the IR of a file in SSA form."""
+
+        return compileFile(filename, {"ssa": True}).ir.ir
+
+    def test_dominators(self):
+        """Test the dominator tree and the dominance frontiers of a loop."""
+
+        graph = self.compile("samples/while.c")["main"]["cfg"]
+        blocks = {block.label: block for block in graph.blocks}
+        tree = DominatorTree(graph)
+
+        self.assertIsNone(tree.idom[blocks["_L1"]])
+        self.assertIs(tree.idom[blocks["_L3"]], blocks["_L2"])
+        self.assertIs(tree.idom[blocks["_L4"]], blocks["_L2"])
+        self.assertEqual(tree.frontiers[blocks["_L3"]], [blocks["_L2"]])
+        self.assertTrue(tree.dominates(blocks["_L1"], blocks["_L4"]))
+        self.assertFalse(tree.dominates(blocks["_L3"], blocks["_L4"]))
+
+    def test_phis(self):
+        """Test that loops get phis and every variable is assigned once."""
+
+        ir = self.compile("samples/continue.c")
+        blocks = {block.label: block for block in ir["main"]["blocks"]}
+
+        self.assertEqual(
+            phis(blocks["_L2"]),
+            [["phi", "i.2", "=", [["_L1", "i.1"], ["_L4", "i.4"], ["_L5", "i.3"]]]],
+        )
+        self.assertEqual(blocks["_L6"].instructions[-1], ["ret", "i.2"])
+
+        for filename in ["samples/switch.c", "samples/arguments.c", "samples/goto.c"]:
+            assigned = []
+            for block in self.compile(filename)["main"]["blocks"]:
+                for ins in block.instructions:
+                    if len(ins) > 2 and ins[1] == "=" or ins[0] == "phi":
+                        assigned.append(ins[1] if ins[0] == "phi" else ins[0])
+            self.assertEqual(len(assigned), len(set(assigned)))
+
+    def test_entry(self):
+        """Test that a loop at the start of a function gets a new entry block."""
+
+        ir = compileCode(
+            "int main(int n) {\n\twhile (n > 0) {\n\t\tn--;\n\t}\n\treturn n;\n}\n",
+            {"ssa": True},
+        ).ir.ir
+
+        entry, header = ir["main"]["blocks"][:2]
+        self.assertEqual(entry.instructions, [["label", "_S1"]])
+        self.assertIn([entry.label, "n"], phis(header)[0][3])
+
+    def test_destruct(self):
+        """Test that phis are replaced with copies on the edges into their block."""
+
+        compiler = compileFile("samples/switch.c", {"ssa": True})
+        ir = compiler.ir.ir
+        with compiler.context.activate():
+            destructSsa(ir["main"])
+        blocks = {block.label: block for block in ir["main"]["blocks"]}
+
+        self.assertEqual(phis(blocks["_L8"]), [])
+        self.assertEqual(
+            blocks["_L3"].instructions[-2:], [["i.5", "=", "i.4"], ["goto", "_L8"]]
+        )
+
+        # The conditional jump to the end gets a block for its copy
+        self.assertEqual(
+            blocks["_L6"].instructions[-1][3:], ["_S1", "else", "GOTO", "_S2"]
+        )
+        self.assertEqual(blocks["_S1"].instructions[1:], [["goto", "_L7"]])
+        self.assertEqual(
+            blocks["_S2"].instructions[1:], [["i.5", "=", "i.1"], ["goto", "_L8"]]
+        )
+        self.assertIn(blocks["_S2"], blocks["_L8"].predecessors)
+
+    def test_sequentialize(self):
+        """Test ordering parallel copies, including a swap."""
+
+        self.assertEqual(
+            sequentialize([("a", "b"), ("b", "c"), ("d", "d")]),
+            [["a", "=", "b"], ["b", "=", "c"]],
+        )
+        self.assertEqual(
+            sequentialize([("a", "b"), ("b", "a")]),
+            [["a.swap", "=", "a"], ["a", "=", "b"], ["b", "=", "a.swap"]],
+        )
+
+    def test_roundtrip(self):
+        """Test that IR in SSA form written with -o reads back with -i unchanged."""
+
+        code = (
+            "int main() {\n\tint a = 3;\n\tint s = 30;\n"
+            "\tif (a > 2) {\n\t\tgoto out;\n\t}\n\ts = s + 10;\n"
+            "out:\n\ts = s + 2;\n\tif (a > 1) {\n\t\ts = s + 1;\n\t}\n"
+            "\treturn s;\n}\n"
+        )
+
+        compiler = compileCode(code, {"ssa": True})
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "ir.json")
+            compiler.ir.write(filename)
+            ir = readJson(filename).ir
+
+        blocks = compiler.ir.ir["main"]["blocks"]
+        self.assertTrue(any(len(blockLabels(block)) > 1 for block in blocks))
+        self.assertEqual(
+            [block.instructions for block in ir["main"]["blocks"]],
+            [block.instructions for block in blocks],
+        )
+        self.assertEqual(
+            interpret(ir, "main", []), interpret(compiler.ir.ir, "main", [])
+        )
+
+        # Phis keep their predecessors, so the copies land on the right edges
+        destructSsa(ir["main"])
+        destructSsa(compiler.ir.ir["main"])
+        self.assertEqual(
+            interpret(ir, "main", []), interpret(compiler.ir.ir, "main", [])
+        )
+
+
+class ConstantFoldingTestCase(unittest.TestCase):
+    """Test propagating and folding constants in the IR."""
+
+    @staticmethod
+    def fold(code, extra=None):
+        """Generate the IR of a program and fold its constants."""
+
+        compiler = compileCode(code, extra)
+        for function in compiler.ir.ir.values():
+            foldConstants(function)
+
+        return compiler
+
+    def test_evaluate(self):
+        """Test that operators follow the semantics of 32-bit C ints."""
+
+        self.assertEqual(wrap(2**31), -(2**31))
+        self.assertEqual(evaluate("+", 2147483647, 1), -2147483648)
+        self.assertEqual(evaluate("*", 65536, 65536), 0)
+        self.assertEqual(evaluate("/", -7, 2), -3)
+        self.assertEqual(evaluate("%", -7, 2), -1)
+        self.assertEqual(evaluate("%", 7, -2), 1)
+        self.assertEqual(evaluate(">>", -7, 1), -4)
+        self.assertEqual(evaluate("<<", 1, 31), -2147483648)
+        self.assertEqual(evaluate("&&", 2, 3), 1)
+        self.assertEqual(evaluate("<=", 3, 3), 1)
+
+        # Undefined results are left to run
+        self.assertIsNone(evaluate("/", 1, 0))
+        self.assertIsNone(evaluate("%", -2147483648, -1))
+        self.assertIsNone(evaluate("<<", 1, 32))
+
+    def test_identities(self):
+        """Test simplifying operations with a single constant operand."""
+
+        self.assertEqual(simplify(["r1", "=", "a", "+", "0"], {}), ["r1", "=", "a"])
+        self.assertEqual(simplify(["r1", "=", "1", "*", "a"], {}), ["r1", "=", "a"])
+        self.assertEqual(simplify(["r1", "=", "a", "*", "0"], {}), ["r1", "=", "0"])
+        self.assertEqual(simplify(["r1", "=", "a", "-", "a"], {}), ["r1", "=", "0"])
+        self.assertEqual(simplify(["r1", "=", "a", "^", "a"], {}), ["r1", "=", "0"])
+        self.assertEqual(
+            simplify(["r1", "=", "a", "/", "b"], {"b": 1}), ["r1", "=", "a"]
+        )
+
+        unchanged = ["r1", "=", "0", "-", "a"]
+        self.assertEqual(simplify(unchanged, {}), unchanged)
+
+    def test_propagate(self):
+        """Test that constants are propagated through temps, locals and branches."""
+
+        compiler = self.fold(
+            "int main() {\n\tint x = 2;\n\tint y = x * 4;\n"
+            "\tif (y > 3) {\n\t\ty = y + 1;\n\t} else {\n\t\ty = 0;\n\t}\n"
+            "\treturn y;\n}\n"
+        )
+        blocks = compiler.ir.ir["main"]["blocks"]
+        instructions = [ins for block in blocks for ins in block.instructions]
+
+        self.assertIn(["y", "=", "8"], instructions)
+        self.assertIn(["ret", "9"], instructions)
+        self.assertNotIn(["y", "=", "0"], instructions)
+        self.assertFalse([ins for ins in instructions if ins[0] == "if"])
+
+    def test_reassociate(self):
+        """Test combining the constants of chains of additions and multiplications."""
+
+        compiler = self.fold(
+            "int main(int a) {\n\tint x = a + 2;\n\tint y = x + 3;\n"
+            "\tint z = y - 10;\n\tint m = z * 3;\n\tint n = m * 5;\n"
+            "\treturn n;\n}\n"
+        )
+        instructions = compiler.ir.ir["main"]["blocks"][0].instructions
+
+        self.assertIn(["r2", "=", "a", "+", "5"], instructions)
+        self.assertIn(["r3", "=", "a", "-", "5"], instructions)
+        self.assertIn(["r5", "=", "z", "*", "15"], instructions)
+
+    def test_loop(self):
+        """Test that variables changed in a loop are not constant in it."""
+
+        for options in [{}, {"ssa": True}]:
+            compiler = self.fold(
+                "int main() {\n\tint i = 0;\n\twhile (i < 4) {\n\t\ti++;\n\t}\n"
+                "\treturn i;\n}\n",
+                options,
+            )
+            blocks = compiler.ir.ir["main"]["blocks"]
+            self.assertEqual(blocks[1].instructions[-1][0], "if")
+
+    def test_guarded_division(self):
+        """Test that a division by a zero constant on a path not taken compiles."""
+
+        code = (
+            "int f(int n) {\n\tint d = 0;\n\tint x = 1;\n"
+            "\tif (n > 5) {\n\t\tx = 100 / d;\n\t}\n\treturn x;\n}\n\n"
+            "int main() {\n\tint r = f(1);\n\treturn r;\n}\n"
+        )
+
+        for options in [{}, {"ssa": True}]:
+            for level in (1, 2, 3):
+                compiler = compileCode(code, {"optimization": level, **options})
+                compiler.assemble()
+
+                self.assertEqual(interpret(compiler.ir.ir, "main", []), 1)
+                divisions = [
+                    ins for ins in instructionsOf(compiler.ir.ir["f"]) if "/" in ins
+                ]
+                self.assertEqual(len(divisions), 1)
+                self.assertFalse(isConstant(divisions[0][4]))
+
+        self.assertIsNone(evaluate("/", 100, 0))
+        kept = ["x", "=", "100", "/", "d"]
+        self.assertEqual(simplify(kept, {"d": 0}), kept)
+
+    def test_level(self):
+        """Test that invalid optimization levels are rejected."""
+
+        for level in ["-1", "x"]:
+            with mock.patch("sys.argv", ["main.py", "-O", level, "file.c"]):
+                with contextlib.redirect_stdout(io.StringIO()) as output:
+                    with self.assertRaises(SystemExit) as exit:
+                        parseArguments()
+
+            self.assertEqual(exit.exception.code, 2)
+            self.assertIn(f"Invalid optimization level: {level}", output.getvalue())
+
+
+class DeadCodeTestCase(unittest.TestCase):
+    """Test removing assignments whose value is never read."""
+
+    @staticmethod
+    def compile(code, extra=None):
+        """Generate the IR of a program at optimization level 1."""
+
+        return compileCode(code, {"optimization": 1, **(extra or {})})
+
+    def test_liveness(self):
+        """Test the names live at the end of the blocks of a loop."""
+
+        graph = compileFile("samples/while.c").ir.ir["main"]["cfg"]
+        blocks = {block.label: block for block in graph.blocks}
+        liveness = Liveness(graph)
+
+        self.assertEqual(liveness.outs[blocks["_L1"]], {"i"})
+        self.assertEqual(liveness.outs[blocks["_L2"]], {"i"})
+        self.assertEqual(liveness.outs[blocks["_L4"]], set())
+
+    def test_dead_store(self):
+        """Test that a value overwritten before it is read is removed."""
+
+        compiler = self.compile(
+            "int main(int n) {\n\tint x = n;\n\tx = n + 1;\n\treturn x;\n}\n"
+        )
+        instructions = instructionsOf(compiler.ir.ir["main"])
+
+        self.assertNotIn(["x", "=", "n"], instructions)
+        self.assertEqual(instructions[-1][0], "ret")
+
+        messages = [message.message for message in compiler.context.messages.messages]
+        self.assertIn("Dead code elimination changed", " ".join(messages))
+
+    def test_calls(self):
+        """Test that calls are kept when their result is not used."""
+
+        # f calls itself, so it is not inlined
+        compiler = self.compile(
+            "int f() {\n\treturn f();\n}\n\n"
+            "int main() {\n\tint x = f();\n\treturn 0;\n}\n"
+        )
+        instructions = instructionsOf(compiler.ir.ir["main"])
+
+        self.assertEqual([ins[0] for ins in instructions], ["label", "call", "ret"])
+
+    def test_cycle(self):
+        """Test that a variable that only feeds itself in a loop is removed."""
+
+        for extra in [{}, {"ssa": True}]:
+            compiler = self.compile(
+                "int main(int n) {\n\tint a = 0;\n\tint i = 0;\n"
+                "\twhile (i < n) {\n\t\ta = a + 1;\n\t\ti++;\n\t}\n"
+                "\treturn i;\n}\n",
+                extra,
+            )
+
+            for ins in instructionsOf(compiler.ir.ir["main"]):
+                self.assertFalse([part for part in ins if str(part).startswith("a")])
+
+
+class CopyPropagationTestCase(unittest.TestCase):
+    """Test coalescing temps and propagating copies."""
+
+    @staticmethod
+    def propagate(code):
+        """Generate the IR of a program, propagate its copies and return main."""
+
+        function = compileCode(code).ir.ir["main"]
+        propagateCopies(function)
+
+        return instructionsOf(function)
+
+    def test_coalesce(self):
+        """Test that expressions are assigned to variables without a temp."""
+
+        instructions = self.propagate(
+            "int main(int a) {\n\tint x = a;\n\tint y = x + 1;\n\treturn y;\n}\n"
+        )
+
+        self.assertIn(["x", "=", "a"], instructions)
+        self.assertIn(["y", "=", "a", "+", "1"], instructions)
+        self.assertIn(["ret", "y"], instructions)
+
+    def test_kill(self):
+        """Test that a copy stops holding once its source is assigned."""
+
+        instructions = self.propagate(
+            "int main(int a) {\n\tint x = a;\n\ta = 5;\n\treturn x;\n}\n"
+        )
+
+        self.assertIn(["ret", "x"], instructions)
+
+    def test_loop(self):
+        """Test that copies changed in a loop do not hold in it."""
+
+        instructions = self.propagate(
+            "int main(int a) {\n\tint x = a;\n\tint i = 0;\n"
+            "\twhile (i < 3) {\n\t\ti = i + x;\n\t\tx = i;\n\t}\n"
+            "\treturn x;\n}\n"
+        )
+
+        self.assertIn(["i", "=", "i", "+", "x"], instructions)
+        self.assertIn(["ret", "x"], instructions)
+
+
+class ValueNumberingTestCase(unittest.TestCase):
+    """Test replacing redundant expressions with value numbering."""
+
+    @staticmethod
+    def number(code, extra=None):
+        """Generate the IR of a program and number the values of main."""
+
+        function = compileCode(code, extra).ir.ir["main"]
+        replaced = numberValues(function)
+
+        return replaced, instructionsOf(function)
+
+    @staticmethod
+    def operators(instructions, op):
+        """Count the binary instructions of an operator."""
+
+        return sum(1 for ins in instructions if len(ins) == 5 and ins[3] == op)
+
+    def test_local(self):
+        """Test that an expression repeated in a block is computed once."""
+
+        replaced, instructions = self.number(
+            "int main(int a, int b) {\n\treturn (a * b) + (b * a);\n}\n"
+        )
+
+        self.assertEqual(replaced, 1)
+        self.assertEqual(self.operators(instructions, "*"), 1)
+
+    def test_dominator(self):
+        """Test that a block reuses the expressions of its dominators."""
+
+        replaced, instructions = self.number(
+            "int main(int a, int b) {\n\tint y = 0;\n"
+            "\tif (a < b) {\n\t\ty = 1;\n\t}\n"
+            "\tif (b > a) {\n\t\ty = y + 2;\n\t}\n\treturn y;\n}\n"
+        )
+
+        self.assertEqual(replaced, 1)
+        self.assertEqual(self.operators(instructions, "<"), 1)
+        self.assertEqual(self.operators(instructions, ">"), 0)
+
+    def test_reassigned(self):
+        """Test that expressions stop holding once an operand is assigned."""
+
+        replaced, instructions = self.number(
+            "int main(int a, int b) {\n\tint x = a + b;\n"
+            "\tif (b) {\n\t\ta = 1;\n\t}\n\tint y = a + b;\n"
+            "\ta = 2;\n\tint z = a + b;\n\treturn x + y + z;\n}\n"
+        )
+
+        self.assertEqual(replaced, 0)
+        self.assertEqual(self.operators(instructions, "+"), 5)
+
+    def test_ssa(self):
+        """Test that versions of a variable keep their value across blocks."""
+
+        replaced, instructions = self.number(
+            "int main(int a, int b) {\n\tint x = a + b;\n"
+            "\tif (b) {\n\t\tx = a + b;\n\t}\n\treturn x;\n}\n",
+            {"ssa": True},
+        )
+
+        self.assertEqual(replaced, 1)
+
+    def test_remarks(self):
+        """Test that the pass reports what it replaced in every function."""
+
+        compiler = compileCode(
+            "int main(int a, int b) {\n\treturn a * b - a * b;\n}\n",
+            {"optimization": 2},
+        )
+
+        messages = [message.message for message in compiler.context.messages.messages]
+        self.assertIn("Value numbering changed 1 instructions in main.", messages)
+
+
+class LoopInvariantTestCase(unittest.TestCase):
+    """Test finding natural loops and hoisting their invariant instructions."""
+
+    nested = (
+        "int main(int a, int b) {\n\tint s = 0;\n\tint i = 0;\n"
+        "\twhile (i < b) {\n\t\tint j = 0;\n"
+        "\t\twhile (j < b) {\n\t\t\ts = s + a * b;\n\t\t\tj = j + 1;\n\t\t}\n"
+        "\t\ti = i + 1;\n\t}\n\treturn s;\n}\n"
+    )
+
+    @staticmethod
+    def loops(function):
+        """Return the natural loops of a function."""
+
+        graph = function["cfg"]
+        return naturalLoops(graph, DominatorTree(graph))
+
+    def hoist(self, code, extra=None):
+        """Generate the IR of a program and hoist the invariants of main."""
+
+        compiler = compileCode(code, extra)
+        function = compiler.ir.ir["main"]
+        hoisted = hoistInvariants(function)
+
+        return hoisted, function
+
+    def test_loops(self):
+        """Test that nested loops are found, inner loops first."""
+
+        compiler = compileCode(self.nested)
+        inner, outer = self.loops(compiler.ir.ir["main"])
+
+        self.assertLess(inner.blocks, outer.blocks)
+        self.assertEqual(len(inner.latches), 1)
+        self.assertIn(inner.header, outer.blocks)
+
+    def test_hoist(self):
+        """Test that invariants leave every loop they do not depend on."""
+
+        hoisted, function = self.hoist(self.nested)
+        outer = self.loops(function)[-1]
+
+        self.assertEqual(hoisted, 2)
+        for block in outer.blocks:
+            for ins in block.instructions:
+                self.assertNotEqual(ins[2:], ["a", "*", "b"])
+
+    def test_exit(self):
+        """Test that values read after the loop are not computed when it is skipped."""
+
+        hoisted, function = self.hoist(
+            "int main(int a, int b) {\n\tint x = 0;\n\tint i = 0;\n"
+            "\twhile (i < b) {\n\t\tx = a * b;\n\t\ti = i + 1;\n\t}\n"
+            "\treturn x;\n}\n"
+        )
+
+        (loop,) = self.loops(function)
+        assigned = [ins[0] for block in loop.blocks for ins in block.instructions]
+
+        self.assertEqual(hoisted, 2)
+        self.assertIn("x", assigned)
+
+    def test_division(self):
+        """Test that divisions that can trap stay in the loop."""
+
+        hoisted, function = self.hoist(
+            "int main(int a, int b) {\n\tint s = 0;\n"
+            "\twhile (s < 10) {\n\t\ts = s + a / b + a / 2;\n\t}\n"
+            "\treturn s;\n}\n"
+        )
+
+        self.assertEqual(hoisted, 1)
+
+    def test_preheader(self):
+        """Test that a preheader is inserted when the loop is entered twice."""
+
+        for extra in (None, {"ssa": True}):
+            hoisted, function = self.hoist(
+                "int main(int a, int b) {\n\tint s = 0;\n"
+                "\tif (a > 2) {\n\t\ts = 7;\n\t}\n"
+                "\twhile (s < b) {\n\t\ts = s + a * 3;\n\t}\n\treturn s;\n}\n",
+                extra,
+            )
+            (loop,) = self.loops(function)
+            outside = [p for p in loop.header.predecessors if p not in loop.blocks]
+
+            self.assertEqual(hoisted, 1)
+            self.assertEqual(len(outside), 1)
+            self.assertTrue(outside[0].label.startswith("_S"))
+            self.assertEqual(outside[0].successors, [loop.header])
+
+
+class StrengthReductionTestCase(unittest.TestCase):
+    """Test replacing expensive operators with shifts, masks and additions."""
+
+    loop = (
+        "int main(int a, int n) {\n\tint s = 0;\n\tint i = a;\n"
+        "\twhile (i < n) {\n\t\ts = s + i * 12;\n\t\ti = i + 3;\n\t}\n"
+        "\treturn s;\n}\n"
+    )
+
+    @staticmethod
+    def execute(instructions, value):
+        """Evaluate straight line IR that computes y from x."""
+
+        values = {"x": value}
+        for dest, _, lhs, op, rhs in instructions:
+            operands = [values[n] if n in values else int(n) for n in (lhs, rhs)]
+            values[dest] = evaluate(op, *operands)
+
+        return values["y"]
+
+    def test_powers(self):
+        """Test that shifts and masks follow the semantics of C ints."""
+
+        values = [-(2**31), -(2**31) + 1, 2**31 - 1, 2**30]
+        values += list(range(-70, 70)) + [wrap(v * 7919) for v in range(-999, 999)]
+
+        for op in ("*", "/", "%"):
+            for shift in (1, 2, 3, 5, 16, 30):
+                divisor = str(2**shift)
+                instructions = reducePower(["y", "=", "x", op, divisor])
+                self.assertNotIn(op, [ins[3] for ins in instructions])
+
+                for value in values:
+                    self.assertEqual(
+                        self.execute(instructions, value),
+                        evaluate(op, value, 2**shift),
+                        f"{value} {op} {divisor}",
+                    )
+
+    def test_ignored(self):
+        """Test that other constants and constant operands are left alone."""
+
+        self.assertIsNone(reducePower(["y", "=", "x", "*", "6"]))
+        self.assertIsNone(reducePower(["y", "=", "x", "/", "-4"]))
+        self.assertIsNone(reducePower(["y", "=", "4", "/", "x"]))
+        self.assertEqual(
+            reducePower(["y", "=", "8", "*", "x"]), [["y", "=", "x", "<<", "3"]]
+        )
+
+    def test_induction(self):
+        """Test that multiplying an induction variable becomes a running sum."""
+
+        for extra in (None, {"ssa": True}):
+            compiler = compileCode(self.loop, extra)
+            function = compiler.ir.ir["main"]
+            with compiler.context.activate():
+                propagateCopies(function)
+                replaced = reduceStrength(function)
+
+            graph = function["cfg"]
+            (loop,) = naturalLoops(graph, DominatorTree(graph))
+            body = [ins for block in loop.blocks for ins in block.instructions]
+
+            self.assertEqual(replaced, 1)
+            self.assertNotIn("*", [ins[3] for ins in body if len(ins) == 5])
+            self.assertIn("36", [ins[4] for ins in body if len(ins) == 5])
+
+    def test_assigned_phi(self):
+        """Test that a phi whose name the loop also assigns is not an induction."""
+
+        blocks = [
+            BasicBlock([], "_L1"),
+            BasicBlock(
+                [
+                    ["phi", "i", "=", [["_L1", "0"], ["_L3", "j"]]],
+                    ["c", "=", "i", "<", "10"],
+                    ["if", "c", "GOTO", "_L3", "else", "GOTO", "_L4"],
+                ],
+                "_L2",
+            ),
+            BasicBlock(
+                [
+                    ["i", "=", "i", "+", "5"],
+                    ["x", "=", "i", "*", "4"],
+                    ["j", "=", "i", "+", "1"],
+                    ["goto", "_L2"],
+                ],
+                "_L3",
+            ),
+            BasicBlock([["ret", "x"]], "_L4"),
+        ]
+        ir = {
+            "main": {
+                "blocks": blocks,
+                "arguments": [],
+                "declarations": 4,
+                "cfg": ControlFlowGraph(blocks),
+            }
+        }
+
+        graph = ir["main"]["cfg"]
+        (loop,) = naturalLoops(graph, DominatorTree(graph))
+        self.assertEqual(inductionVariables(loop), {})
+
+        with CompilationContext().activate():
+            reduceStrength(ir["main"])
+        self.assertEqual(interpret(ir, "main", []), 44)
+
+
+class MagicDivisionTestCase(unittest.TestCase):
+    """Test dividing by constants with multiplications."""
+
+    @staticmethod
+    def divide(dividend, divisor):
+        """Compute a quotient the way the assembled code does."""
+
+        if divisor in (1, -1):
+            return wrap(dividend * divisor)
+
+        shift = powerOfTwo(str(divisor))
+        if shift is not None:
+            # Negative dividends are biased by divisor - 1
+            return wrap(dividend + (dividend >> 31 & divisor - 1)) >> shift
+
+        multiplier, shift = magicNumber(divisor)
+
+        quotient = (dividend * multiplier) >> 32
+        if divisor > 0 and multiplier < 0:
+            quotient = wrap(quotient + dividend)
+        elif divisor < 0 and multiplier > 0:
+            quotient = wrap(quotient - dividend)
+
+        quotient >>= shift
+        return quotient + (quotient >> 31 & 1)
+
+    def remainder(self, dividend, divisor):
+        """Compute a remainder the way the assembled code does."""
+
+        shift = powerOfTwo(str(abs(divisor)))
+        if shift is not None:
+            mask = 2**shift - 1
+            return wrap(dividend - (wrap(dividend + (dividend >> 31 & mask)) & ~mask))
+
+        return wrap(dividend - wrap(self.divide(dividend, divisor) * divisor))
+
+    def test_magic(self):
+        """Test the multipliers of a few well known divisors."""
+
+        self.assertEqual(magicNumber(3), (1431655766, 0))
+        self.assertEqual(magicNumber(5), (1717986919, 1))
+        self.assertEqual(magicNumber(7), (-1840700269, 2))
+        self.assertEqual(magicNumber(-5), (-1717986919, 1))
+
+    def test_quotients(self):
+        """Test that quotients truncate towards zero like C for many divisors."""
+
+        divisors = [d for d in range(-300, 301) if d not in (-1, 0, 1)]
+        divisors += [641, 1000, 6700417, 2**30, 2**31 - 1, -(2**31), -(2**31) + 1]
+
+        dividends = [-(2**31), -(2**31) + 1, 2**31 - 1, 2**30, -1, 0, 1]
+        dividends += [wrap(v * 2654435761) for v in range(-60, 60)]
+
+        for divisor in divisors:
+            for dividend in dividends + [divisor, divisor - 1, 7 * divisor + 1]:
+                dividend = wrap(dividend)
+                self.assertEqual(
+                    self.divide(dividend, divisor),
+                    evaluate("/", dividend, divisor),
+                    f"{dividend} / {divisor}",
+                )
+                self.assertEqual(
+                    self.remainder(dividend, divisor),
+                    evaluate("%", dividend, divisor),
+                    f"{dividend} % {divisor}",
+                )
+
+    def test_powers(self):
+        """Test powers of two, which shift and mask, with negative dividends."""
+
+        dividends = [-(2**31), -(2**31) + 1, -65, -9, -8, -7, -1, 0, 1, 7, 8, 9]
+        dividends += [2**31 - 1, wrap(-123456789), wrap(987654321)]
+
+        for shift in (1, 2, 3, 10, 30):
+            for divisor in (2**shift, -(2**shift)):
+                for dividend in dividends:
+                    if divisor > 0:
+                        self.assertEqual(
+                            self.divide(dividend, divisor),
+                            evaluate("/", dividend, divisor),
+                            f"{dividend} / {divisor}",
+                        )
+                    self.assertEqual(
+                        self.remainder(dividend, divisor),
+                        evaluate("%", dividend, divisor),
+                        f"{dividend} % {divisor}",
+                    )
+
+    def test_asm(self):
+        """Test that only divisions by variables use idivl."""
+
+        compiler = compileCode(
+            "int main(int a, int b) {\n\tint x = a / 10;\n"
+            "\tint y = a % -7;\n\tint z = a / b;\n\treturn x + y + z;\n}\n"
+        )
+        compiler.assemble()
+
+        self.assertEqual(compiler.asm.count("idivl %ecx"), 1)
+        self.assertIn("movl $1717986919, %eax", compiler.asm)
+        self.assertIn("imull $-7, %edx, %edx", compiler.asm)
+
+    def test_asm_powers(self):
+        """Test that powers of two divide with shifts and take remainders with masks."""
+
+        compiler = compileCode(
+            "int main(int a) {\n\tint x = a / 8;\n"
+            "\tint y = a % 16;\n\tint z = a % -4;\n\treturn x + y + z;\n}\n"
+        )
+        compiler.assemble()
+
+        self.assertNotIn("idivl %ecx", compiler.asm)
+        self.assertFalse([line for line in compiler.asm if "imull" in line])
+        self.assertIn("sarl $3, %edx", compiler.asm)
+        self.assertIn("andl $-16, %edx", compiler.asm)
+        self.assertIn("andl $-4, %edx", compiler.asm)
+
+
+class InliningTestCase(unittest.TestCase):
+    """Test replacing calls with the bodies of the functions they call."""
+
+    clamp = (
+        "int clamp(int v, int lo, int hi) {\n\tif (v < lo) {\n\t\treturn lo;\n\t}\n"
+        "\tif (v > hi) {\n\t\treturn hi;\n\t}\n\treturn v;\n}\n\n"
+    )
+
+    @staticmethod
+    def chain(length):
+        """Return a program whose main calls a function of a number of steps."""
+
+        steps = "".join(f"\tx = x * {k};\n" for k in range(2, length + 2))
+        return (
+            f"int steps(int x) {{\n{steps}\treturn x;\n}}\n\n"
+            "int main() {\n\tint a = 5;\n\treturn steps(a);\n}\n"
+        )
+
+    def inline(self, code, level, extra=None):
+        """Generate the IR of a program and inline its calls at a level."""
+
+        compiler = compileCode(code, extra)
+        with compiler.context.activate():
+            inlineCalls(compiler.ir.ir, level)
+
+        return compiler.ir.ir
+
+    def test_graph(self):
+        """Test the call graph, its recursive functions and its bottom up order."""
+
+        graph = {"main": {"a", "b"}, "a": {"c"}, "b": {"b"}, "c": {"d"}, "d": {"c"}}
+
+        self.assertEqual(recursiveFunctions(graph), {"b", "c", "d"})
+
+        order = bottomUp(graph)
+        self.assertEqual(sorted(order), sorted(graph))
+        self.assertGreater(order.index("main"), order.index("a"))
+        self.assertGreater(order.index("a"), order.index("c"))
+
+        code = self.clamp + "int main() {\n\tint a = 1;\n\treturn clamp(a, 2, 3);\n}\n"
+        ir = compileCode(code).ir.ir
+        self.assertEqual(callGraph(ir), {"clamp": set(), "main": {"clamp"}})
+
+    def test_inline(self):
+        """Test that every copy of a body gets its own names and labels."""
+
+        code = self.clamp + (
+            "int main() {\n\tint a = 1;\n\tint b = 80;\n"
+            "\tint x = clamp(a, 4, 50);\n\tint y = clamp(b, 4, 50);\n"
+            "\treturn x + y;\n}\n"
+        )
+
+        for extra in (None, {"ssa": True}):
+            ir = self.inline(code, 1, extra)
+            main = ir["main"]
+            self.assertEqual(callsOf(main), [])
+
+            labels = [label for block in main["blocks"] for label in blockLabels(block)]
+            self.assertEqual(len(labels), len(set(labels)))
+
+            params = [
+                ins[0]
+                for block in main["blocks"]
+                for ins in block.instructions
+                if len(ins) == 3 and ins[0].startswith("clamp.")
+            ]
+            self.assertEqual(len(params), 6)
+            self.assertEqual(len(set(params)), 6)
+
+            self.assertIs(main["cfg"].blocks, main["blocks"])
+            self.assertEqual(callsOf(ir["clamp"]), [])
+
+    def test_recursive(self):
+        """Test that functions that can call themselves are never inlined."""
+
+        code = (
+            "int down(int n) {\n\tif (n == 0) {\n\t\treturn 0;\n\t}\n"
+            "\tn--;\n\treturn down(n);\n}\n\n"
+            "int main() {\n\tint a = 3;\n\treturn down(a);\n}\n"
+        )
+
+        ir = self.inline(code, 3)
+        self.assertEqual(callsOf(ir["main"]), ["down"])
+        self.assertEqual(callsOf(ir["down"]), ["down"])
+
+    def test_levels(self):
+        """Test that higher levels inline larger functions."""
+
+        for length, inlined in ((1, 1), (6, 2), (16, 3)):
+            for level in (1, 2, 3):
+                ir = self.inline(self.chain(length), level)
+                expected = [] if level >= inlined else ["steps"]
+                self.assertEqual(callsOf(ir["main"]), expected, (length, level))
+
+
+class TailCallTestCase(unittest.TestCase):
+    """Test replacing calls in tail position with jumps."""
+
+    count = (
+        "int count(int n, int acc) {\n\tint m;\n\tint b;\n"
+        "\tif (n == 0) {\n\t\treturn acc;\n\t}\n"
+        "\tm = n - 1;\n\tb = acc + 3;\n\treturn count(m, b);\n}\n\n"
+    )
+
+    def test_recursion(self):
+        """Test that a function calling itself in tail position becomes a loop."""
+
+        code = self.count + "int main() {\n\tint a = 4;\n\treturn count(a, 0);\n}\n"
+
+        for extra in (None, {"ssa": True}):
+            compiler = compileCode(code, extra)
+            ir = compiler.ir.ir
+            with compiler.context.activate():
+                self.assertEqual(eliminateTailCalls(ir), 1)
+
+            function = ir["count"]
+            self.assertEqual(callsOf(function), [])
+            self.assertEqual(callsOf(ir["main"]), ["count"])
+
+            # The parameters merge the values on entry with the arguments
+            header = function["blocks"][1]
+            self.assertEqual(
+                [len(phi[3]) for phi in phis(header)], [2, 2], header.instructions
+            )
+            self.assertEqual(function["cfg"].entry.predecessors, [])
+            self.assertIn(header, header.predecessors[0].successors)
+
+    def test_reassigned(self):
+        """Test that parameters assigned before the tail call are copied, not merged."""
+
+        code = (
+            "int f(int n, int acc) {\n\tif (n <= 0) {\n\t\treturn acc;\n\t}\n"
+            "\tint m = n - 1;\n\tn = n + 5;\n\tacc = acc + n * 4;\n"
+            "\treturn f(m, acc);\n}\n\n"
+            "int main() {\n\tint a = 3;\n\treturn f(a, 0);\n}\n"
+        )
+
+        for extra in (None, {"ssa": True}):
+            for level in (0, 1, 2, 3):
+                options = {"optimization": level}
+                options.update(extra or {})
+                ir = compileCode(code, options).ir.ir
+
+                self.assertEqual(interpret(ir, "main", []), 84, (extra, level))
+                if level:
+                    self.assertEqual(callsOf(ir["f"]), [])
+
+        compiler = compileCode(code)
+        with compiler.context.activate():
+            eliminateTailCalls(compiler.ir.ir)
+
+        blocks = compiler.ir.ir["f"]["blocks"]
+        self.assertEqual([phi for block in blocks for phi in phis(block)], [])
+
+    def test_ignored(self):
+        """Test that calls whose result is used before returning are kept."""
+
+        code = (
+            "int fact(int n) {\n\tint m;\n\tint r;\n"
+            "\tif (n < 2) {\n\t\treturn 1;\n\t}\n"
+            "\tm = n - 1;\n\tr = fact(m);\n\treturn n * r;\n}\n\n"
+            "int main() {\n\treturn 0;\n}\n"
+        )
+
+        compiler = compileCode(code)
+        with compiler.context.activate():
+            self.assertEqual(eliminateTailCalls(compiler.ir.ir), 0)
+
+    def test_asm(self):
+        """Test that optimized code jumps to the functions of tail calls."""
+
+        code = self.count + (
+            "int main() {\n\tint a = 4;\n\tint b = count(a, 0);\n"
+            "\tint c = b * 2;\n\treturn count(c, b);\n}\n"
+        )
+
+        for optimization, jumps in ((0, 0), (1, 1)):
+            compiler = compileCode(code, {"optimization": optimization})
+            compiler.assemble()
+
+            self.assertEqual(compiler.asm.count("jmp _count"), jumps)
+            self.assertEqual(compiler.asm.count("callq _count"), 3 - 2 * jumps)
+
+
+class TreeWriterTestCase(unittest.TestCase):
+    """Test serializing the parse tree."""
+
+    @classmethod
+    def setUpClass(cls):
+        filename = "samples/if_else.c"
+        cls.compiler = Compiler({"filename": filename})
+        cls.compiler.tokenize()
+        cls.compiler.parse()
+
+    def test_text(self):
+        """Test that the text format matches Node.print."""
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.compiler.parseTree.print()
+
+        self.assertEqual(dumpTree(self.compiler.parseTree), output.getvalue())
+
+    def test_arguments(self):
+        """Test a node built from several arguments, which Node.print supports."""
+
+        statements = [grammar.Identifier("x"), grammar.ConstNum("1")]
+        tree = grammar.Program([grammar.StatementList(statements, [])])
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            tree.print()
+
+        self.assertEqual(dumpTree(tree), output.getvalue())
+        self.assertEqual(
+            dumpTree(tree, "sexp"),
+            '(Program (StatementList (Identifier "x") (ConstNum "1")))\n',
+        )
+
+    def test_sexp(self):
+        """Test the S-expression format."""
+
+        tree = dumpTree(self.compiler.parseTree, "sexp")
+        self.assertTrue(tree.startswith("(Program (DeclarationList (Declaration"))
+        self.assertEqual(tree.count("("), tree.count(")"))
+
+    def test_json(self):
+        """Test the JSON format."""
+
+        tree = json.loads(dumpTree(self.compiler.parseTree, "json"))
+        function = tree["children"][0]["children"][0]["children"][0]
+        self.assertEqual(function["kind"], "FunctionDeclaration")
+        self.assertEqual(
+            function["children"][1], {"kind": "Identifier", "value": "main"}
+        )
+
+
+class FusedTestCase(unittest.TestCase):
+    """Test building the symbol table and IR in a single traversal."""
+
+    def compile(self, filename, fused):
+        """Compile a sample up to the IR, with or without the fused pass."""
+
+        flags = ["-u"] if fused else []
+        compiler = Compiler({"filename": filename, "flags": flags})
+        compiler.tokenize()
+        compiler.parse()
+        if not fused:
+            compiler.buildSymbolTable()
+        compiler.generateIr()
+
+        return compiler
+
+    def test_switch(self):
+        """Test that both ways build the same symbol table and instructions."""
+
+        separate = self.compile("samples/switch.c", fused=False)
+        fused = self.compile("samples/switch.c", fused=True)
+
+        self.assertEqual(str(fused.symbolTable), str(separate.symbolTable))
+
+        # Temps and labels are numbered differently, so name them by first use
+        def normalize(compiler):
+            names = {}
+
+            def rename(x):
+                if x[0] in "r_" and x[-1].isdigit():
+                    return names.setdefault(x, f"#{len(names)}")
+                return x
+
+            instructions = []
+            for block in compiler.ir.ir["main"]["blocks"]:
+                for instruction in block.instructions:
+                    instructions.append([rename(x) for x in instruction])
+            return instructions
+
+        self.assertEqual(normalize(fused), normalize(separate))
+
+    def test_undeclaredLabel(self):
+        """Test that labels used but never declared are reported."""
+
+        compiler = Compiler({"filename": "samples/goto.c"})
+        compiler.tokenize()
+        compiler.parse()
+
+        # Remove the statement that declares the even and odd labels
+        function = compiler.parseTree.children[0].children[0].children[0]
+        statements = function.children[3]
+        statements.children = statements.children[:-1]
+
+        with self.assertRaises(CompilerMessage):
+            generateFused(compiler.parseTree)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,78 @@
+.globl	_f
+_f:
+pushq %rbp
+movq %rsp, %rbp
+subq $36, %rsp
+		 # Moving parameters out of registers
+movl %r8d, -4(%rbp)
+movl %r9d, -8(%rbp)
+_S1:
+		 # Shift operation n << 2
+movl -4(%rbp), %eax
+shll $2, %eax
+movl %eax, -12(%rbp)
+		 # Moving n into n.tail.1
+movl -4(%rbp), %eax
+movl %eax, -16(%rbp)
+		 # Moving r10 into r11
+movl -12(%rbp), %eax
+movl %eax, -20(%rbp)
+		 # Moving acc into acc.tail.1
+movl -8(%rbp), %eax
+movl %eax, -24(%rbp)
+_L1:
+movl -16(%rbp), %eax
+cmpl $0, %eax
+setle %cl
+andb $1, %cl
+movzbl %cl, %edx
+movl %edx, -28(%rbp)
+cmpl $0, -28(%rbp)
+je _L3
+_L2:
+		 # Return acc.tail.1
+movl -24(%rbp), %eax
+addq $36, %rsp
+popq %rbp
+retq
+_L3:
+		 # Math expression n.tail.1 - 1
+movl -16(%rbp), %eax
+subl $1, %eax
+movl %eax, -32(%rbp)
+		 # Math expression r11 + -4
+movl -20(%rbp), %eax
+addl $-4, %eax
+movl %eax, -36(%rbp)
+		 # Math expression acc.tail.1 + r11
+movl -24(%rbp), %eax
+addl -20(%rbp), %eax
+movl %eax, -24(%rbp)
+		 # Moving m into n.tail.1
+movl -32(%rbp), %eax
+movl %eax, -16(%rbp)
+		 # Moving r12 into r11
+movl -36(%rbp), %eax
+movl %eax, -20(%rbp)
+jmp _L1
+movl $0, %eax
+addq $36, %rsp
+popq %rbp
+retq
+.globl	main
+main:
+pushq %rbp
+movq %rsp, %rbp
+subq $0, %rsp
+_L5:
+		 # Moving arguments into registers
+movl $3, %r8d
+movl $0, %r9d
+		 # Tail call to f
+addq $0, %rsp
+popq %rbp
+jmp _f
+movl $0, %eax
+addq $0, %rsp
+popq %rbp
+retq
\ No newline at end of file